@@ -0,0 +1,10 @@
+"""
+Offline benchmarks for the Digital Twin backend.
+
+Each module in this package can be run from the `backend/` directory, e.g.:
+
+    uv run python -m benchmarks.concurrency
+
+Benchmarks replace the AWS clients used by `server.py` with the local
+stand-ins in `benchmarks.fakes`, so no AWS credentials are required.
+"""
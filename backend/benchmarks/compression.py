@@ -0,0 +1,171 @@
+"""
+Compression benchmark for stored conversations and API responses.
+
+For synthetic histories of several lengths, stores one compacted session in
+the in-memory S3 stand-in (`benchmarks.fakes.FakeS3Client`) with each
+`MEMORY_COMPRESSION` setting:
+
+- none : plain JSON Lines (the format before compression)
+- gzip : block-compressed base log, gzip
+- zstd : block-compressed base log, zstandard (if installed)
+
+and reports the stored size, the time to rewrite the base (`s3_compact`), and the
+bytes read from S3 and time taken by a full load, a 20-message tail (as
+used for the Bedrock history window) and a 50-message page from the middle
+(as `/conversation` pagination reads it).
+
+It also reports how much `GZipMiddleware` shrinks the `/conversation` JSON
+page at `RESPONSE_COMPRESSION_LEVEL` and what that costs per response.
+
+Results are printed and appended as JSON lines (tagged with the current git
+commit) to `--output`.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.compression --lengths 100,1000,10000
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Dict, Tuple
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+def transfer(client, func: Callable, budget: float) -> Tuple[int, float]:
+    """Bytes read from `client` by one `func()` call, and its median milliseconds."""
+    from benchmarks.serialization import measure
+
+    before = client.bytes_out
+    func()
+    read = client.bytes_out - before
+    return read, measure(lambda _: func(), None, budget) * 1000
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="100,1000,10000", help="comma-separated history lengths")
+    parser.add_argument("--budget", type=float, default=0.3, help="seconds of sampling per measurement")
+    parser.add_argument("--level", type=int, default=6, help="response gzip level")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "compression.jsonl"))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+
+    import codec
+    import memory
+    from benchmarks.fakes import FakeS3Client
+    from benchmarks.serialization import make_history, measure
+    from benchmarks.startup import git_commit
+
+    settings = ["none", "gzip"]
+    try:
+        memory.check_compression("zstd")
+        settings.append("zstd")
+    except ImportError:
+        pass
+
+    commit, dirty = git_commit()
+    timestamp = datetime.now(timezone.utc).isoformat()
+    records = []
+
+    print(f"commit={commit[:12]}{' (dirty)' if dirty else ''} codec={codec.CODEC}")
+    print(f"{'messages':>8} {'format':>6} {'stored_kb':>10} {'compact_ms':>10} "
+          f"{'load_kb':>8} {'load_ms':>8} {'tail_kb':>8} {'tail_ms':>8} {'page_kb':>8} {'page_ms':>8}")
+
+    for length in [int(n) for n in args.lengths.split(",") if n.strip()]:
+        history = make_history(length)
+        middle = length // 2
+
+        for setting in settings:
+            compression = memory.check_compression(setting)
+            client = FakeS3Client()
+            memory.s3_append(client, "bench", "s", history, 0, compression)
+            memory.s3_compact(client, "bench", "s", compression)
+
+            if memory.s3_load(client, "bench", "s") != history:
+                raise SystemExit(f"{setting}: round trip changed the history")
+
+            compact_ms = measure(lambda _: memory.s3_compact(client, "bench", "s", compression),
+                                 None, args.budget) * 1000
+            load_b, load_ms = transfer(client, lambda: memory.s3_load(client, "bench", "s"), args.budget)
+            tail_b, tail_ms = transfer(client, lambda: memory.s3_tail(client, "bench", "s", 20), args.budget)
+            page_b, page_ms = transfer(
+                client,
+                lambda: list(itertools.islice(memory.s3_iter(client, "bench", "s", middle), 50)),
+                args.budget,
+            )
+
+            record = {
+                "commit": commit,
+                "dirty": dirty,
+                "timestamp": timestamp,
+                "kind": "storage",
+                "messages": length,
+                "compression": setting,
+                "stored_bytes": len(client.objects[memory.log_key("s")]),
+                "compact_ms": round(compact_ms, 4),
+                "load_bytes": load_b,
+                "load_ms": round(load_ms, 4),
+                "tail_bytes": tail_b,
+                "tail_ms": round(tail_ms, 4),
+                "page_bytes": page_b,
+                "page_ms": round(page_ms, 4),
+            }
+            records.append(record)
+
+            print(f"{length:>8} {setting:>6} {record['stored_bytes'] / 1024:>10.1f} {compact_ms:>10.2f} "
+                  f"{load_b / 1024:>8.1f} {load_ms:>8.2f} {tail_b / 1024:>8.1f} {tail_ms:>8.2f} "
+                  f"{page_b / 1024:>8.1f} {page_ms:>8.2f}")
+
+    print(f"\n{'messages':>8} {'json_kb':>8} {'gzip_kb':>8} {'ratio':>6} {'gzip_ms':>8}")
+
+    for page in (10, 50, 200):
+        history = make_history(page)
+        body = codec.dumpb({"session_id": "s", "messages": history})
+        compressed = gzip.compress(body, compresslevel=args.level)
+        gzip_ms = measure(lambda data: gzip.compress(data, compresslevel=args.level), body, args.budget) * 1000
+
+        record: Dict = {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": timestamp,
+            "kind": "response",
+            "messages": page,
+            "level": args.level,
+            "json_bytes": len(body),
+            "gzip_bytes": len(compressed),
+            "gzip_ms": round(gzip_ms, 4),
+        }
+        records.append(record)
+
+        print(f"{page:>8} {len(body) / 1024:>8.1f} {len(compressed) / 1024:>8.1f} "
+              f"{len(body) / len(compressed):>6.1f} {gzip_ms:>8.3f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Concurrency benchmark for the `/chat` route.
+
+Drives the FastAPI app in-process over ASGI with a fake Bedrock client and
+local-disk memory, and reports how throughput scales with the number of
+simultaneous sessions for a range of I/O executor sizes (`IO_MAX_WORKERS`).
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.concurrency --sessions 1,4,16,64 --workers 4,16,64
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+async def run_sessions(app, sessions: int, turns: int) -> float:
+    """Run `sessions` concurrent conversations of `turns` turns; return elapsed seconds."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def session(i: int) -> None:
+            session_id = f"bench-{sessions}-{i}"
+            for turn in range(turns):
+                # Distinct per session, so coalescing and the response cache do not apply
+                message = f"session {i} turn {turn}"
+                r = await client.post("/chat", json={"message": message, "session_id": session_id})
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(i) for i in range(sessions)))
+        return time.perf_counter() - start
+
+
+def parse_ints(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=parse_ints, default=[1, 4, 16, 64])
+    parser.add_argument("--workers", type=parse_ints, default=[4, 16, 64])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Bedrock latency (s)")
+    args = parser.parse_args()
+
+    # Configure local memory before `server` reads its environment
+    os.environ.setdefault("MEMORY_DIR", tempfile.mkdtemp(prefix="twin-bench-"))
+    os.environ["USE_S3"] = "false"
+    sys.path.insert(0, os.getcwd())
+
+    import server
+    from benchmarks.fakes import FakeBedrockClient
+
+    server.bedrock_client = FakeBedrockClient(latency=args.latency)
+
+    print(f"fake latency={args.latency:.3f}s turns/session={args.turns}")
+    print(f"{'workers':>8} {'sessions':>9} {'requests':>9} {'elapsed_s':>10} {'req/s':>8} {'speedup':>8}")
+
+    for workers in args.workers:
+        server.io_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="twin-io")
+        baseline = None
+
+        for sessions in args.sessions:
+            elapsed = asyncio.run(run_sessions(server.app, sessions, args.turns))
+            requests = sessions * args.turns
+            rps = requests / elapsed
+            baseline = baseline or rps
+            print(f"{workers:>8} {sessions:>9} {requests:>9} {elapsed:>10.3f} {rps:>8.1f} {rps / baseline:>7.1f}x")
+
+        server.io_executor.shutdown(wait=True)
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
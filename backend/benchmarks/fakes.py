@@ -0,0 +1,367 @@
+"""
+Local stand-ins for the AWS clients used by the Digital Twin backend.
+
+These fakes implement just enough of the boto3 client surface used by
+`server.py` to run the FastAPI app offline with controllable latency:
+
+- FakeBedrockClient  : `converse` and `converse_stream` with a fixed delay,
+                       optionally throttling like a service quota
+- FakeS3Client       : an in-memory bucket for `memory.S3MemoryBackend`,
+                       including ranged GETs and conditional writes
+- FakeDynamoDBClient : an in-memory table for `memory.DynamoDBMemoryBackend`
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import bisect
+import hashlib
+import io
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+
+def _client_error(code: str, operation: str, status: int = 400) -> ClientError:
+    """Build a botocore `ClientError` the way a real client would raise it."""
+    return ClientError(
+        {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        operation,
+    )
+
+
+# ============================================================
+# Bedrock Runtime
+# ============================================================
+
+class FakeBedrockClient:
+    """
+    Minimal Bedrock runtime client that sleeps instead of calling AWS.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds to block for each `converse` call (simulating model time).
+    jitter : float
+        Extra random delay of up to this many seconds per call.
+    reply : str
+        Text returned as the assistant message.
+    chunks : int
+        Number of deltas `converse_stream` splits the reply into; the
+        latency is spread evenly across them.
+    quota_rps : float
+        If positive, requests beyond this rate (token bucket, bursts of up to
+        one second's worth) fail with `ThrottlingException`, like an account
+        quota.
+    throttle_rate : float
+        Probability of failing any request with `ThrottlingException`.
+    """
+
+    def __init__(self, latency: float = 0.2, reply: str = "Hello from the fake twin.", chunks: int = 8,
+                 jitter: float = 0.0, quota_rps: float = 0.0, throttle_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.reply = reply
+        self.chunks = max(1, chunks)
+        self.quota_rps = quota_rps
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self.throttled = 0
+        self._tokens = max(1.0, quota_rps)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _admit(self, operation: str) -> None:
+        """Count the call and raise `ThrottlingException` if it is over quota."""
+        with self._lock:
+            self.calls += 1
+            throttled = random.random() < self.throttle_rate
+
+            if self.quota_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(max(1.0, self.quota_rps), self._tokens + (now - self._updated) * self.quota_rps)
+                self._updated = now
+                if self._tokens >= 1 and not throttled:
+                    self._tokens -= 1
+                else:
+                    throttled = True
+
+            if throttled:
+                self.throttled += 1
+                raise _client_error("ThrottlingException", operation, 429)
+
+    def _usage(self, messages: List[Dict]) -> Dict[str, int]:
+        """Rough token usage based on character counts."""
+        chars = sum(len(block.get("text", "")) for m in messages for block in m["content"])
+        return {
+            "inputTokens": chars // 4,
+            "outputTokens": len(self.reply) // 4,
+            "totalTokens": (chars + len(self.reply)) // 4,
+        }
+
+    def converse(self, **kwargs: Any) -> Dict[str, Any]:
+        """Block for `latency` seconds and return a fixed reply."""
+        self._admit("Converse")
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": self.reply}]}},
+            "stopReason": "end_turn",
+            "usage": self._usage(kwargs.get("messages", [])),
+            "metrics": {"latencyMs": int(self.latency * 1000)},
+        }
+
+    def converse_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return an event stream that yields the reply in evenly timed deltas."""
+        self._admit("ConverseStream")
+        usage = self._usage(kwargs.get("messages", []))
+        return {"stream": self._events(usage)}
+
+    def _events(self, usage: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        step = max(1, -(-len(self.reply) // self.chunks))
+        delay = self.latency / self.chunks
+
+        yield {"messageStart": {"role": "assistant"}}
+        for i in range(0, len(self.reply), step):
+            time.sleep(delay)
+            yield {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": self.reply[i:i + step]}}}
+        yield {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": usage, "metrics": {"latencyMs": int(self.latency * 1000)}}}
+
+
+# ============================================================
+# S3
+# ============================================================
+
+class FakeS3Client:
+    """
+    In-memory stand-in for an S3 client.
+
+    Supports the subset used by `memory.S3MemoryBackend`: `get_object`
+    (optionally with a `bytes=a-b`, `bytes=a-` or suffix `bytes=-n` range and
+    `IfMatch=<etag>`), `put_object`
+    with `IfNoneMatch="*"` / `IfMatch=<etag>`, paginated `list_objects_v2`
+    and `delete_objects`. The bucket name is ignored.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds to block for each call (simulating a network round trip).
+    page_size : int
+        Maximum keys returned per `list_objects_v2` page.
+    """
+
+    def __init__(self, latency: float = 0.0, page_size: int = 1000):
+        self.latency = latency
+        self.page_size = page_size
+        self.objects: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # ETag per key (with the body it was computed for), so large objects are not rehashed on every read
+        self._etags: Dict[str, Tuple[bytes, str]] = {}
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _etag(self, key: str, body: bytes) -> str:
+        cached = self._etags.get(key)
+        if cached is None or cached[0] is not body:
+            cached = (body, f'"{hashlib.md5(body).hexdigest()}"')
+            self._etags[key] = cached
+        return cached[1]
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None,
+                   **kwargs: Any) -> Dict[str, Any]:
+        self._call("get_object")
+        with self._lock:
+            body = self.objects.get(Key)
+
+        if body is None:
+            raise _client_error("NoSuchKey", "GetObject", 404)
+        if IfMatch is not None and self._etag(Key, body) != IfMatch:
+            raise _client_error("PreconditionFailed", "GetObject", 412)
+
+        response = {"ETag": self._etag(Key, body), "ContentType": "application/octet-stream"}
+        data = body
+
+        if Range:
+            first, _, last = Range.split("=", 1)[1].partition("-")
+            if first == "":
+                start = max(0, len(body) - int(last))
+                end = len(body) - 1
+            else:
+                start = int(first)
+                end = min(len(body) - 1, int(last)) if last else len(body) - 1
+
+            if start >= len(body):
+                raise _client_error("InvalidRange", "GetObject", 416)
+
+            data = body[start:end + 1]
+            response["ContentRange"] = f"bytes {start}-{end}/{len(body)}"
+
+        self.bytes_out += len(data)
+        response["ContentLength"] = len(data)
+        response["Body"] = StreamingBody(io.BytesIO(data), len(data))
+        return response
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, IfNoneMatch: str = None, IfMatch: str = None,
+                   **kwargs: Any) -> Dict[str, Any]:
+        self._call("put_object")
+        body = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+
+        with self._lock:
+            current = self.objects.get(Key)
+
+            if IfNoneMatch == "*" and current is not None:
+                raise _client_error("PreconditionFailed", "PutObject", 412)
+            if IfMatch is not None and (current is None or self._etag(Key, current) != IfMatch):
+                raise _client_error("PreconditionFailed", "PutObject", 412)
+
+            self.objects[Key] = body
+            etag = self._etag(Key, body)
+
+        self.bytes_in += len(body)
+        return {"ETag": etag}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", StartAfter: str = "", ContinuationToken: str = None,
+                        MaxKeys: int = 1000, **kwargs: Any) -> Dict[str, Any]:
+        self._call("list_objects_v2")
+        after = ContinuationToken or StartAfter
+
+        with self._lock:
+            keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > after)
+
+        size = min(MaxKeys, self.page_size)
+        page = keys[:size]
+        response = {
+            "Contents": [{"Key": k, "Size": len(self.objects.get(k, b""))} for k in page],
+            "KeyCount": len(page),
+            "IsTruncated": len(keys) > size,
+        }
+
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+
+        return response
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any]) -> Dict[str, Any]:
+        self._call("delete_objects")
+        with self._lock:
+            for obj in Delete["Objects"]:
+                self.objects.pop(obj["Key"], None)
+                self._etags.pop(obj["Key"], None)
+        return {}
+
+
+# ============================================================
+# DynamoDB
+# ============================================================
+
+class FakeDynamoDBClient:
+    """
+    In-memory stand-in for a low-level DynamoDB client.
+
+    Supports the subset used by `memory.DynamoDBMemoryBackend`: `query` on
+    `session_id = :s AND seq > :start` (either direction, with `Limit` and
+    pagination), `get_item`, `put_item` and all-or-nothing `transact_write_items` with
+    `attribute_not_exists(seq)`. Items are kept sorted by `seq` per session.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds to block for each call (simulating a network round trip).
+    page_size : int
+        Maximum items returned per `query` page.
+    """
+
+    def __init__(self, latency: float = 0.0, page_size: int = 100):
+        self.latency = latency
+        self.page_size = page_size
+        self._items: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _exists(self, item: Dict[str, Any]) -> bool:
+        rows = self._items.get(item["session_id"]["S"], [])
+        seq = int(item["seq"]["N"])
+        i = bisect.bisect_left(rows, seq, key=lambda row: row[0])
+        return i < len(rows) and rows[i][0] == seq
+
+    def _put(self, item: Dict[str, Any], must_not_exist: bool = False) -> None:
+        rows = self._items.setdefault(item["session_id"]["S"], [])
+        seq = int(item["seq"]["N"])
+        i = bisect.bisect_left(rows, seq, key=lambda row: row[0])
+
+        if i < len(rows) and rows[i][0] == seq:
+            if must_not_exist:
+                raise _client_error("ConditionalCheckFailedException", "PutItem")
+            rows[i] = (seq, item)
+        else:
+            rows.insert(i, (seq, item))
+
+    def get_item(self, TableName: str, Key: Dict[str, Any], **kwargs: Any) -> Dict:
+        self._call("get_item")
+        seq = int(Key["seq"]["N"])
+        with self._lock:
+            for row_seq, item in self._items.get(Key["session_id"]["S"], []):
+                if row_seq == seq:
+                    return {"Item": item}
+        return {}
+
+    def put_item(self, TableName: str, Item: Dict[str, Any], ConditionExpression: str = "", **kwargs: Any) -> Dict:
+        self._call("put_item")
+        with self._lock:
+            self._put(Item, must_not_exist="attribute_not_exists" in ConditionExpression)
+        return {}
+
+    def transact_write_items(self, TransactItems: List[Dict[str, Any]], **kwargs: Any) -> Dict:
+        self._call("transact_write_items")
+        with self._lock:
+            puts = [entry["Put"] for entry in TransactItems]
+            for put in puts:
+                if "attribute_not_exists" in put.get("ConditionExpression", "") and self._exists(put["Item"]):
+                    raise _client_error("TransactionCanceledException", "TransactWriteItems")
+            for put in puts:
+                self._put(put["Item"])
+        return {}
+
+    def query(self, TableName: str, ExpressionAttributeValues: Dict[str, Any], ScanIndexForward: bool = True,
+              Limit: int = 0, ExclusiveStartKey: Dict[str, Any] = None, **kwargs: Any) -> Dict:
+        self._call("query")
+        session_id = ExpressionAttributeValues[":s"]["S"]
+        start = int(ExpressionAttributeValues[":start"]["N"])
+
+        with self._lock:
+            rows = [row for row in self._items.get(session_id, []) if row[0] > start]
+
+        if not ScanIndexForward:
+            rows.reverse()
+
+        if ExclusiveStartKey:
+            last = int(ExclusiveStartKey["seq"]["N"])
+            rows = [row for row in rows if (row[0] > last if ScanIndexForward else row[0] < last)]
+
+        size = min(Limit or self.page_size, self.page_size)
+        page = rows[:size]
+        response = {"Items": [item for _, item in page], "Count": len(page)}
+
+        if len(rows) > size:
+            response["LastEvaluatedKey"] = {"session_id": {"S": session_id}, "seq": {"N": str(page[-1][0])}}
+
+        return response
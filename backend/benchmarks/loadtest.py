@@ -0,0 +1,345 @@
+"""
+Offline load test for the Digital Twin API.
+
+Runs realistic multi-turn sessions against the FastAPI `app` in-process,
+with the AWS clients replaced by the stand-ins from `benchmarks.fakes`
+(Bedrock with configurable latency, jitter and streaming chunks; S3 with
+configurable latency), and reports for every combination of
+
+- memory mode : `local` (a temporary `MEMORY_DIR`) or `s3` (`FakeS3Client`)
+- transport   : `asgi` (httpx over ASGI, one event loop, like uvicorn) or
+                `mangum` (API Gateway v2 events through
+                `lambda_handler.handler`, one thread per concurrent session,
+                like concurrent Lambda invocations sharing one process)
+- sessions    : number of sessions running at the same time
+
+the throughput (requests/s), p50/p99 request latency and memory: the
+traced peak and what is still held after the run (session cache, response
+cache, ...) per session. Memory is measured in a second, identical pass
+under `tracemalloc`, so tracing does not distort the timings.
+
+Each session sends `--turns` turns; the first message is one of a few
+common openers (so the response cache and coalescing see realistic
+repeats), later ones are follow-up questions. A `--stream-fraction` of
+turns use `/chat/stream`. Message choice is seeded, so runs are comparable.
+
+Results are appended as JSON lines (tagged with the git commit) to
+`--output`, and each row is compared with the most recent earlier record
+of the same configuration, so a change can be checked against a baseline.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.loadtest --sessions 1,8,32 --turns 6 --modes local,s3
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.startup import git_commit
+
+
+# ============================================================
+# Workload
+# ============================================================
+
+OPENERS = [
+    "Hi! What do you do?",
+    "What's your background?",
+    "Tell me about yourself.",
+    "Hello",
+]
+
+FOLLOW_UPS = [
+    "Where did you study?",
+    "What projects are you most proud of?",
+    "Which programming languages do you use day to day?",
+    "How did you get into data science?",
+    "Can you explain how you deploy machine learning models?",
+    "What kind of roles are you looking for?",
+    "What do you enjoy outside of work?",
+    "How would you describe your working style?",
+    "What was the hardest technical problem you solved recently?",
+    "Are you open to remote work?",
+]
+
+
+def session_script(seed: int, turns: int, stream_fraction: float) -> List[Tuple[str, str]]:
+    """The (path, message) pairs one session sends, chosen deterministically from `seed`."""
+    rng = random.Random(seed)
+    script = []
+    for turn in range(turns):
+        message = rng.choice(OPENERS) if turn == 0 else rng.choice(FOLLOW_UPS)
+        path = "/chat/stream" if rng.random() < stream_fraction else "/chat"
+        script.append((path, message))
+    return script
+
+
+def session_id_from(path: str, body: str) -> str:
+    """Extract the session id from a `/chat` JSON body or a `/chat/stream` SSE body."""
+    if path == "/chat":
+        return json.loads(body)["session_id"]
+    for line in body.splitlines():
+        if line.startswith("data: ") and "session_id" in line:
+            return json.loads(line[len("data: "):])["session_id"]
+    raise ValueError("no session id in stream")
+
+
+# ============================================================
+# Transports
+# ============================================================
+
+async def run_asgi(app, scripts: List[List[Tuple[str, str]]]) -> List[float]:
+    """Run every session concurrently over ASGI; return per-request latencies."""
+    import httpx
+
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+
+        async def session(script: List[Tuple[str, str]]) -> None:
+            session_id: Optional[str] = None
+            for path, message in script:
+                began = time.perf_counter()
+                r = await client.post(path, json={"message": message, "session_id": session_id})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - began)
+                session_id = session_id_from(path, r.text)
+
+        await asyncio.gather(*(session(script) for script in scripts))
+
+    return latencies
+
+
+def api_event(path: str, body: str) -> Dict:
+    """An API Gateway (HTTP API v2) POST event."""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost", "content-type": "application/json"},
+        "requestContext": {
+            "accountId": "000000000000",
+            "apiId": "load",
+            "domainName": "localhost",
+            "requestId": "load",
+            "routeKey": "$default",
+            "stage": "$default",
+            "time": "01/Jan/2025:00:00:00 +0000",
+            "timeEpoch": 0,
+            "http": {"method": "POST", "path": path, "protocol": "HTTP/1.1",
+                     "sourceIp": "127.0.0.1", "userAgent": "loadtest"},
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def run_mangum(handler: Callable, scripts: List[List[Tuple[str, str]]]) -> List[float]:
+    """Run every session on its own thread through the Lambda handler; return per-request latencies."""
+    latencies: List[float] = []
+
+    def session(script: List[Tuple[str, str]]) -> None:
+        # Mangum runs the app on the thread's event loop, as on the Lambda main thread
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            run_script(script)
+        finally:
+            loop.close()
+
+    def run_script(script: List[Tuple[str, str]]) -> None:
+        session_id: Optional[str] = None
+        for path, message in script:
+            began = time.perf_counter()
+            response = handler(api_event(path, json.dumps({"message": message, "session_id": session_id})), None)
+            if response["statusCode"] != 200:
+                raise RuntimeError(f"{path} returned {response['statusCode']}: {response['body'][:200]}")
+            latencies.append(time.perf_counter() - began)
+            session_id = session_id_from(path, response["body"])
+
+    with ThreadPoolExecutor(max_workers=len(scripts)) as pool:
+        for future in [pool.submit(session, script) for script in scripts]:
+            future.result()
+
+    return latencies
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def parse_ints(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(v) for v in value.split(",") if v]
+
+
+def previous_records(path: str) -> List[Dict]:
+    """Records already in the results file (oldest first)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=parse_ints, default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--modes", default="local,s3")
+    parser.add_argument("--transports", default="asgi,mangum")
+    parser.add_argument("--bedrock-latency", type=float, default=0.05, help="fake Bedrock latency (s)")
+    parser.add_argument("--bedrock-jitter", type=float, default=0.02, help="extra random Bedrock latency (s)")
+    parser.add_argument("--chunks", type=int, default=8, help="deltas per streamed reply")
+    parser.add_argument("--stream-fraction", type=float, default=0.25)
+    parser.add_argument("--storage-latency", type=float, default=0.005, help="fake S3 latency (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "loadtest.jsonl"))
+    args = parser.parse_args()
+
+    # Configure local memory before `server` reads its environment
+    os.environ.setdefault("MEMORY_DIR", tempfile.mkdtemp(prefix="twin-load-"))
+    os.environ["USE_S3"] = "false"
+    os.environ["MEMORY_BACKEND"] = "local"
+    os.environ.setdefault("IO_MAX_WORKERS", str(max(16, 2 * max(args.sessions))))
+    sys.path.insert(0, os.getcwd())
+
+    import lambda_handler
+    import memory
+    import server
+    from benchmarks.fakes import FakeBedrockClient, FakeS3Client
+
+    server.bedrock_client = FakeBedrockClient(latency=args.bedrock_latency, jitter=args.bedrock_jitter,
+                                              chunks=args.chunks)
+    # Load the persona before timing anything
+    server.build_converse_request([], "warm-up")
+
+    backends = {
+        "local": lambda: memory.LocalMemoryBackend(tempfile.mkdtemp(prefix="twin-load-")),
+        "s3": lambda: memory.S3MemoryBackend(FakeS3Client(latency=args.storage_latency), "load",
+                                             server.MEMORY_COMPACT_SEGMENTS, server.MEMORY_COMPRESSION),
+    }
+
+    def reset() -> None:
+        """Fresh storage and in-process caches, so runs do not share state."""
+        server.memory_backend = backends[mode]()
+        server.session_cache = server.SessionCache(
+            server.SESSION_CACHE_MAX_SESSIONS, server.SESSION_CACHE_MAX_BYTES, server.SESSION_CACHE_TTL)
+        server.response_cache = server.ResponseCache(
+            server.RESPONSE_CACHE_MAX_ENTRIES, server.RESPONSE_CACHE_TTL, server.RESPONSE_CACHE_SIMILARITY)
+
+    def run(transport: str, scripts: List[List[Tuple[str, str]]]) -> List[float]:
+        if transport == "asgi":
+            return asyncio.run(run_asgi(server.app, scripts))
+        return run_mangum(lambda_handler.handler, scripts)
+
+    workload = {
+        "turns": args.turns,
+        "stream_fraction": args.stream_fraction,
+        "bedrock_latency": args.bedrock_latency,
+        "bedrock_jitter": args.bedrock_jitter,
+        "storage_latency": args.storage_latency,
+        "seed": args.seed,
+    }
+    history = previous_records(args.output)
+    commit, dirty = git_commit()
+    records = []
+
+    print(" ".join(f"{k}={v}" for k, v in workload.items()))
+    print(f"{'mode':>6} {'transport':>9} {'sessions':>8} {'requests':>8} {'req/s':>8} {'p50_ms':>8} "
+          f"{'p99_ms':>8} {'peak_mb':>8} {'kb/sess':>8}   vs baseline")
+
+    for mode in args.modes.split(","):
+        for transport in args.transports.split(","):
+            for sessions in args.sessions:
+                scripts = [session_script(args.seed * 1000 + i, args.turns, args.stream_fraction)
+                           for i in range(sessions)]
+
+                reset()
+                start = time.perf_counter()
+                latencies = run(transport, scripts)
+                elapsed = time.perf_counter() - start
+
+                peak_mb = retained_kb = None
+                if not args.no_memory:
+                    reset()
+                    gc.collect()
+                    tracemalloc.start()
+                    before = tracemalloc.get_traced_memory()[0]
+                    run(transport, scripts)
+                    gc.collect()
+                    current, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    peak_mb = round((peak - before) / 2 ** 20, 2)
+                    retained_kb = round((current - before) / 1024 / sessions, 1)
+
+                record = {
+                    "commit": commit,
+                    "dirty": dirty,
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "mode": mode,
+                    "transport": transport,
+                    "sessions": sessions,
+                    **workload,
+                    "requests": len(latencies),
+                    "rps": round(len(latencies) / elapsed, 2),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                    "peak_mb": peak_mb,
+                    "retained_kb_per_session": retained_kb,
+                }
+                records.append(record)
+
+                # Most recent earlier run of the same configuration
+                same = [r for r in history
+                        if all(r.get(k) == record[k] for k in ("mode", "transport", "sessions", *workload))]
+                delta = ""
+                if same:
+                    base = same[-1]
+                    delta = (f"rps {100 * (record['rps'] / base['rps'] - 1):+.0f}%  "
+                             f"p99 {100 * (record['p99_ms'] / base['p99_ms'] - 1):+.0f}%  "
+                             f"({base['commit'][:8]})")
+
+                print(f"{mode:>6} {transport:>9} {sessions:>8} {len(latencies):>8} {record['rps']:>8.1f} "
+                      f"{record['p50_ms']:>8.1f} {record['p99_ms']:>8.1f} "
+                      f"{peak_mb if peak_mb is not None else '-':>8} "
+                      f"{retained_kb if retained_kb is not None else '-':>8}   {delta}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"\nappended {len(records)} records to {args.output}")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
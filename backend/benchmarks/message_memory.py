@@ -0,0 +1,137 @@
+"""
+Memory benchmark for the in-memory message representation.
+
+Decodes a stored history (JSON Lines, as `memory.py` reads it) and measures
+with `tracemalloc` how much memory stays allocated per 1,000 messages when
+the history is held:
+
+- as dicts        : the stored schema, with an ISO 8601 timestamp string
+                    (the representation used before `messages.py`)
+- as ChatMessage  : slotted dataclass, integer role, epoch timestamp
+
+The message text is the same in both and is reported separately, so the
+per-message overhead can be compared directly. The cost of converting at the
+storage/API boundary (`ChatMessage.from_dict` / `to_dict`) is also reported.
+
+Results are printed and appended as JSON lines (tagged with the current git
+commit) to `--output`.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.message_memory --messages 1000,10000
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, List
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+def retained_bytes(build: Callable[[], List]) -> int:
+    """Bytes still allocated after `build()` while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def per_message_us(func: Callable, items: List) -> float:
+    """Mean microseconds per item of `func(item)` over `items`."""
+    began = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - began) / len(items) * 1e6
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="1000,10000", help="comma-separated history lengths")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "message_memory.jsonl"))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+
+    import memory
+    from benchmarks.serialization import make_history
+    from benchmarks.startup import git_commit
+    from messages import ChatMessage, from_records
+
+    commit, dirty = git_commit()
+    timestamp = datetime.now(timezone.utc).isoformat()
+    records = []
+
+    print(f"commit={commit[:12]}{' (dirty)' if dirty else ''}")
+    print(f"{'messages':>8} {'text_kb/1k':>10} {'dicts_kb/1k':>12} {'objects_kb/1k':>14} {'overhead':>10} "
+          f"{'decode_us':>10} {'encode_us':>10}")
+
+    for count in [int(n) for n in args.messages.split(",") if n.strip()]:
+        # Timestamps as written by the server (naive local time)
+        history = [{**m, "timestamp": datetime.fromisoformat(m["timestamp"]).replace(tzinfo=None).isoformat(),
+                    "tokens": len(m["content"]) // 4 + 4} for m in make_history(count)]
+        data = memory.encode_lines(history)
+
+        text = retained_bytes(lambda: [m["content"] for m in memory.decode_lines(data)[1]])
+        dicts = retained_bytes(lambda: memory.decode_lines(data)[1])
+        objects = retained_bytes(lambda: from_records(memory.decode_lines(data)[1]))
+
+        decoded = from_records(history)
+        decode_us = per_message_us(ChatMessage.from_dict, history)
+        encode_us = per_message_us(ChatMessage.to_dict, decoded)
+
+        scale = 1000 / count
+        record = {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": timestamp,
+            "messages": count,
+            "text_kb_per_1k": round(text * scale / 1024, 1),
+            "dicts_kb_per_1k": round(dicts * scale / 1024, 1),
+            "objects_kb_per_1k": round(objects * scale / 1024, 1),
+            "dict_overhead_b": round((dicts - text) / count),
+            "object_overhead_b": round((objects - text) / count),
+            "from_dict_us": round(decode_us, 3),
+            "to_dict_us": round(encode_us, 3),
+        }
+        records.append(record)
+
+        print(f"{count:>8} {record['text_kb_per_1k']:>10.1f} {record['dicts_kb_per_1k']:>12.1f} "
+              f"{record['objects_kb_per_1k']:>14.1f} "
+              f"{record['dict_overhead_b']:>4}->{record['object_overhead_b']:<4}B "
+              f"{decode_us:>10.2f} {encode_us:>10.2f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
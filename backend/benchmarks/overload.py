@@ -0,0 +1,136 @@
+"""
+Overload benchmark for the Bedrock rate limiter and retries.
+
+Drives `/chat` in-process over ASGI with more concurrent clients than the
+fake Bedrock quota can serve (`FakeBedrockClient(quota_rps=...)` throttles
+like an account quota) and compares three policies from `throttling.py`:
+
+- none    : one attempt, no limiter (every throttle is an error)
+- retry   : jittered exponential backoff only
+- limited : backoff plus a token bucket at the quota and a bounded queue
+            that sheds excess load with 503
+
+For each it reports goodput (successful responses per second), the status
+code mix, latency percentiles of successful requests, and how many calls
+Bedrock throttled. The response cache is disabled and every request uses a
+new session and a distinct message, so coalescing does not apply either.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.overload --clients 32 --quota 10 --duration 5
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+POLICIES = {
+    "none": {"rps": 0, "max_attempts": 1},
+    "retry": {"rps": 0},
+    "limited": {},
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def drive(app, clients: int, duration: float) -> Dict:
+    """Run `clients` closed-loop clients for `duration` seconds; return status counts and latencies."""
+    import httpx
+
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    stop = time.perf_counter() + duration
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def worker(i: int) -> None:
+            n = 0
+            while time.perf_counter() < stop:
+                began = time.perf_counter()
+                r = await client.post("/chat", json={"message": f"client {i} request {n}"})
+                statuses[r.status_code] += 1
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - began)
+                elif r.status_code in (429, 503):
+                    # Honour Retry-After (capped so the run still ends on time)
+                    await asyncio.sleep(min(float(r.headers.get("retry-after", 1)), 1.0))
+                n += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {"elapsed": elapsed, "statuses": statuses, "latencies": latencies}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--quota", type=float, default=10.0, help="fake Bedrock quota (requests/s)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per policy")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Bedrock latency (s)")
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Configure local memory before `server` reads its environment
+    os.environ.setdefault("MEMORY_DIR", tempfile.mkdtemp(prefix="twin-overload-"))
+    os.environ["USE_S3"] = "false"
+    os.environ["MEMORY_BACKEND"] = "local"
+    os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+    os.environ.setdefault("IO_MAX_WORKERS", str(max(16, args.clients + 4)))
+    sys.path.insert(0, os.getcwd())
+
+    import server
+    import throttling
+    from benchmarks.fakes import FakeBedrockClient
+
+    print(f"clients={args.clients} quota={args.quota:g}/s latency={args.latency:.3f}s duration={args.duration:g}s")
+    print(f"{'policy':>8} {'requests':>9} {'ok':>6} {'429':>5} {'503':>5} {'5xx':>5} "
+          f"{'goodput/s':>10} {'p50_ms':>8} {'p99_ms':>8} {'throttled':>10}")
+
+    for name, policy in POLICIES.items():
+        fake = FakeBedrockClient(latency=args.latency, quota_rps=args.quota)
+        server.bedrock_client = fake
+        settings = {"rps": args.quota, "burst": args.quota, "max_queue": args.max_queue,
+                    "queue_timeout": args.queue_timeout, **policy}
+        throttling.configure(server.BEDROCK_MODEL_ID, **settings)
+
+        result = asyncio.run(drive(server.app, args.clients, args.duration))
+        statuses = result["statuses"]
+        latencies = result["latencies"]
+        other = sum(n for code, n in statuses.items() if code >= 500 and code != 503)
+
+        print(f"{name:>8} {sum(statuses.values()):>9} {statuses[200]:>6} {statuses[429]:>5} {statuses[503]:>5} "
+              f"{other:>5} {statuses[200] / result['elapsed']:>10.1f} "
+              f"{percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+              f"{fake.throttled:>10}")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Serialization benchmark for conversation storage.
+
+Encodes and decodes synthetic conversation histories of several lengths with:
+
+- json-array   : the original format, one pretty-printed JSON array
+                 (`json.dumps(messages, indent=2)`)
+- json-lines   : compact JSON Lines with the standard library
+- orjson-lines : compact JSON Lines with orjson (if installed)
+- msgpack      : one MessagePack array, for reference (if installed)
+- memory       : `memory.encode_lines` / `memory.decode_lines`, i.e. whatever
+                 `codec.py` selected (see `JSON_CODEC`)
+
+For each it reports the encoded size and the median time to encode and decode
+the whole history, relative to `json-array`.
+
+The median results are printed and appended as JSON lines (tagged with the
+current git commit) to `--output`, so results can be compared across commits.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.serialization --lengths 10,100,1000,10000
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+
+# ============================================================
+# Workload
+# ============================================================
+
+WORDS = (
+    "the twin answers questions about career projects education skills and "
+    "experience with data engineering machine learning cloud deployment "
+    "pipelines models evaluation monitoring café résumé naïve — “quoted” 🚀"
+).split()
+
+
+def make_history(length: int, seed: int = 0) -> List[Dict]:
+    """Alternating user/assistant messages of realistic length."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    history = []
+
+    for i in range(length):
+        role = "user" if i % 2 == 0 else "assistant"
+        words = rng.randint(5, 25) if role == "user" else rng.randint(40, 160)
+        history.append({
+            "role": role,
+            "content": " ".join(rng.choice(WORDS) for _ in range(words)),
+            "timestamp": (start + timedelta(seconds=30 * i)).isoformat(),
+        })
+
+    return history
+
+
+# ============================================================
+# Codecs
+# ============================================================
+
+Codec = Tuple[Callable[[List[Dict]], Any], Callable[[Any], List[Dict]]]
+
+
+def codecs() -> Dict[str, Codec]:
+    """Encoders/decoders to compare (optional libraries only if installed)."""
+    import memory
+
+    candidates: Dict[str, Codec] = {
+        "json-array": (
+            lambda messages: json.dumps(messages, indent=2),
+            json.loads,
+        ),
+        "json-lines": (
+            lambda messages: "".join(json.dumps(m, separators=(",", ":")) + "\n" for m in messages),
+            lambda text: [json.loads(line) for line in text.splitlines()],
+        ),
+    }
+
+    try:
+        import orjson
+
+        candidates["orjson-lines"] = (
+            lambda messages: b"".join(orjson.dumps(m) + b"\n" for m in messages),
+            lambda data: [orjson.loads(line) for line in data.splitlines()],
+        )
+    except ImportError:
+        pass
+
+    try:
+        import msgpack
+
+        candidates["msgpack"] = (msgpack.packb, msgpack.unpackb)
+    except ImportError:
+        pass
+
+    candidates["memory"] = (memory.encode_lines, lambda text: memory.decode_lines(text)[1])
+    return candidates
+
+
+def measure(func: Callable, arg: Any, budget: float) -> float:
+    """Median seconds per call of `func(arg)`, sampling for about `budget` seconds."""
+    samples = []
+    deadline = time.perf_counter() + budget
+
+    while len(samples) < 3 or (time.perf_counter() < deadline and len(samples) < 1000):
+        began = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - began)
+
+    return statistics.median(samples)
+
+
+def size_of(encoded: Any) -> int:
+    """Encoded size in bytes (text is measured as UTF-8)."""
+    return len(encoded.encode("utf-8")) if isinstance(encoded, str) else len(encoded)
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="10,100,1000,10000", help="comma-separated history lengths")
+    parser.add_argument("--budget", type=float, default=0.3, help="seconds of sampling per measurement")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "serialization.jsonl"))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+
+    import codec
+    from benchmarks.startup import git_commit
+
+    candidates = codecs()
+    lengths = [int(n) for n in args.lengths.split(",") if n.strip()]
+    commit, dirty = git_commit()
+    timestamp = datetime.now(timezone.utc).isoformat()
+    records = []
+
+    print(f"commit={commit[:12]}{' (dirty)' if dirty else ''} codec={codec.CODEC}")
+    print(f"{'messages':>8} {'format':>13} {'size_kb':>9} {'encode_ms':>10} {'decode_ms':>10} "
+          f"{'enc_x':>6} {'dec_x':>6}")
+
+    for length in lengths:
+        history = make_history(length)
+        baseline = None
+
+        for name, (encode, decode) in candidates.items():
+            encoded = encode(history)
+            if decode(encoded) != history:
+                raise SystemExit(f"{name}: round trip changed the history")
+
+            encode_s = measure(encode, history, args.budget)
+            decode_s = measure(decode, encoded, args.budget)
+            baseline = baseline or (encode_s, decode_s)
+
+            record = {
+                "commit": commit,
+                "dirty": dirty,
+                "timestamp": timestamp,
+                "codec": codec.CODEC,
+                "messages": length,
+                "format": name,
+                "bytes": size_of(encoded),
+                "encode_ms": round(encode_s * 1000, 4),
+                "decode_ms": round(decode_s * 1000, 4),
+            }
+            records.append(record)
+
+            print(f"{length:>8} {name:>13} {record['bytes'] / 1024:>9.1f} {encode_s * 1000:>10.3f} "
+                  f"{decode_s * 1000:>10.3f} {baseline[0] / encode_s:>6.1f} {baseline[1] / decode_s:>6.1f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
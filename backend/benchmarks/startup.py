@@ -0,0 +1,221 @@
+"""
+Startup benchmark for the Lambda handler.
+
+Each run starts a fresh interpreter with `-X importtime` and:
+
+1. imports `lambda_handler` (which pulls in `server`, FastAPI, Mangum, ...)
+2. sends a `GET /health` API Gateway (HTTP API v2) event through
+   `Mangum(app)`, then a second one, then a first `POST /chat`
+
+AWS clients are replaced with the stand-ins from `benchmarks.fakes` and memory
+goes to a temporary local directory, so no credentials are needed. The import
+time is broken down by top-level package from the interpreter's own
+`importtime` report.
+
+The median over all runs is printed and appended as one JSON line (tagged with
+the current git commit) to `--output`, so results can be compared across
+commits.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.startup --runs 5 --output benchmarks/results/startup.jsonl
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+
+# ============================================================
+# Child Process
+# ============================================================
+
+# Written to stderr after the handler import, to separate its importtime lines
+IMPORT_MARKER = "--- handler imported ---"
+
+# Runs in the fresh interpreter; prints one JSON object of timings to stdout
+CHILD_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import lambda_handler
+imported = time.perf_counter()
+sys.stderr.write("\\n%s\\n" % MARKER)
+sys.stderr.flush()
+
+import server
+from benchmarks.fakes import FakeBedrockClient
+
+server.bedrock_client = FakeBedrockClient(latency=0.0)
+
+
+def event(method, path, body=None):
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost", "content-type": "application/json"},
+        "requestContext": {
+            "accountId": "000000000000",
+            "apiId": "bench",
+            "domainName": "localhost",
+            "requestId": "bench",
+            "routeKey": "$default",
+            "stage": "$default",
+            "time": "01/Jan/2025:00:00:00 +0000",
+            "timeEpoch": 0,
+            "http": {"method": method, "path": path, "protocol": "HTTP/1.1",
+                     "sourceIp": "127.0.0.1", "userAgent": "startup-benchmark"},
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def timed(evt):
+    began = time.perf_counter()
+    response = lambda_handler.handler(evt, None)
+    assert response["statusCode"] == 200, response
+    return (time.perf_counter() - began) * 1000
+
+
+first_health = timed(event("GET", "/health"))
+warm_health = timed(event("GET", "/health"))
+first_chat = timed(event("POST", "/chat", json.dumps({"message": "hello"})))
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_health_ms": first_health,
+    "warm_health_ms": warm_health,
+    "first_chat_ms": first_chat,
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    Sum the self time (ms) of every module imported before the marker by top-level package.
+
+    Parameters
+    ----------
+    stderr : str
+        The child's stderr, containing `-X importtime` lines.
+
+    Returns
+    -------
+    Dict[str, float]
+        Top-level package name -> milliseconds spent importing its modules.
+    """
+    packages: Dict[str, float] = {}
+
+    for line in stderr.splitlines():
+        if line.strip() == IMPORT_MARKER:
+            break
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+
+    return packages
+
+
+def run_once(env: Dict[str, str]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Run the child script once; return (timings, per-package import times)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"MARKER = {IMPORT_MARKER!r}\n{CHILD_SCRIPT}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr[-2000:]}")
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def git_commit() -> Tuple[str, bool]:
+    """Return the current commit hash and whether the working tree is dirty."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def median_by_key(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    """Median of each key across samples (missing keys count as 0)."""
+    keys = sorted({key for sample in samples for key in sample})
+    return {key: round(statistics.median(s.get(key, 0.0) for s in samples), 3) for key in keys}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages shown in the breakdown")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "startup.jsonl"))
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["USE_S3"] = "false"
+    env["MEMORY_BACKEND"] = "local"
+    env["MEMORY_DIR"] = tempfile.mkdtemp(prefix="twin-startup-")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    timings, packages = [], []
+    for _ in range(args.runs):
+        run_timings, run_packages = run_once(env)
+        timings.append(run_timings)
+        packages.append(run_packages)
+
+    commit, dirty = git_commit()
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        **median_by_key(timings),
+        "import_breakdown_ms": dict(sorted(median_by_key(packages).items(), key=lambda kv: -kv[1])),
+    }
+
+    print(f"commit={commit[:12]}{' (dirty)' if dirty else ''} runs={args.runs}")
+    for key in ("import_ms", "first_health_ms", "warm_health_ms", "first_chat_ms"):
+        print(f"{key:>16}: {record[key]:>9.1f}")
+    print(f"\n{'package':>24} {'self_ms':>9}")
+    for package, ms in list(record["import_breakdown_ms"].items())[:args.top]:
+        print(f"{package:>24} {ms:>9.1f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"\nappended to {args.output}")
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
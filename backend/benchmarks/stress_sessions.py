@@ -0,0 +1,147 @@
+"""
+Concurrency stress test for same-session `/chat` turns.
+
+Many workers send turns to a small number of shared sessions at the same time
+(as happens with double-sends or several open tabs). Afterwards every
+session is read back from storage and checked:
+
+- every user message was stored exactly once (no lost or duplicated turns)
+- every user message is immediately followed by an assistant reply
+  (turns are never interleaved)
+
+Runs against the local, S3 and DynamoDB backends, using the in-memory
+stand-ins from `benchmarks.fakes` for the AWS services. The in-process
+per-session write lock in `server.py` is disabled, so every request behaves
+as if it were served by a different worker or Lambda container and only the
+storage-level concurrency control is exercised. Exits with status 1 if any
+message went missing.
+
+Usage (from `backend/`):
+
+    uv run python -m benchmarks.stress_sessions --workers 32 --sessions 2 --turns 5
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+
+# ============================================================
+# Stress Run
+# ============================================================
+
+async def hammer(app, workers: int, sessions: int, turns: int) -> None:
+    """Send `turns` turns from each worker, spread over `sessions` sessions."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=None) as client:
+
+        async def worker(w: int) -> None:
+            for t in range(turns):
+                session_id = f"stress-{(w + t) % sessions}"
+                r = await client.post("/chat", json={"message": f"w{w}-t{t}", "session_id": session_id})
+                r.raise_for_status()
+
+        await asyncio.gather(*(worker(w) for w in range(workers)))
+
+
+def check(histories: Dict[str, List[Dict]], workers: int, turns: int) -> List[str]:
+    """Return a list of problems found in the stored histories."""
+    problems = []
+    expected = {f"w{w}-t{t}" for w in range(workers) for t in range(turns)}
+    seen = Counter()
+
+    for session_id, messages in histories.items():
+        for i, message in enumerate(messages):
+            if message["role"] != "user":
+                continue
+
+            seen[message["content"]] += 1
+            if i + 1 >= len(messages) or messages[i + 1]["role"] != "assistant":
+                problems.append(f"{session_id}: turn {message['content']!r} is not followed by its reply")
+
+    missing = expected - set(seen)
+    duplicated = [m for m, n in seen.items() if n > 1]
+
+    if missing:
+        problems.append(f"{len(missing)} user messages missing, e.g. {sorted(missing)[:3]}")
+    if duplicated:
+        problems.append(f"{len(duplicated)} user messages duplicated, e.g. {sorted(duplicated)[:3]}")
+
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--storage-latency", type=float, default=0.002, help="fake S3/DynamoDB latency (s)")
+    parser.add_argument("--backends", default="local,s3,dynamodb")
+    parser.add_argument("--compression", default="gzip", help="S3/DynamoDB storage compression (gzip, zstd, none)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MEMORY_DIR", tempfile.mkdtemp(prefix="twin-stress-"))
+    os.environ["USE_S3"] = "false"
+    sys.path.insert(0, os.getcwd())
+
+    import memory
+    import server
+    from benchmarks.fakes import FakeBedrockClient, FakeDynamoDBClient, FakeS3Client
+
+    server.bedrock_client = FakeBedrockClient(latency=0.01, jitter=0.02)
+    server.session_write_lock = lambda session_id: contextlib.nullcontext()
+    server.io_executor = server.ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="twin-io")
+
+    backends = {
+        "local": lambda: memory.LocalMemoryBackend(tempfile.mkdtemp(prefix="twin-stress-")),
+        # Compact often so compaction races with appends
+        "s3": lambda: memory.S3MemoryBackend(FakeS3Client(latency=args.storage_latency), "stress", compact_after=3,
+                                             compression=args.compression),
+        "dynamodb": lambda: memory.DynamoDBMemoryBackend(FakeDynamoDBClient(latency=args.storage_latency), "stress",
+                                                         compression=args.compression),
+    }
+
+    failed = False
+    print(f"workers={args.workers} sessions={args.sessions} turns/worker={args.turns} "
+          f"compression={args.compression}")
+
+    for name in args.backends.split(","):
+        server.memory_backend = backends[name]()
+        server.session_cache = server.SessionCache(256, 32 * 1024 * 1024, 300)
+
+        start = time.perf_counter()
+        asyncio.run(hammer(server.app, args.workers, args.sessions, args.turns))
+        elapsed = time.perf_counter() - start
+
+        histories = {f"stress-{i}": server.memory_backend.load(f"stress-{i}") for i in range(args.sessions)}
+        problems = check(histories, args.workers, args.turns)
+        stored = sum(len(h) for h in histories.values())
+
+        status = "OK" if not problems else "FAIL"
+        print(f"{name:>9}: {status}  {stored} messages stored in {elapsed:.2f}s")
+        for problem in problems:
+            print(f"           - {problem}")
+
+        failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    main()
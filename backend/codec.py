@@ -0,0 +1,81 @@
+"""
+JSON encoding for conversation storage and API responses.
+
+Every stored message, summary, SSE event and JSON response goes through
+`dumps` / `dumpb` / `loads`. When `orjson` is installed (it is listed in
+`requirements.txt`, so Lambda builds include it) it is used: it encodes and
+decodes several times faster than the standard library. Without it, stdlib
+`json` with compact separators is used.
+
+Both produce plain compact JSON, so the storage format (JSON Lines, see
+`memory.py`) is the same either way: files written with one codec are read
+by the other, and no format marker or migration is needed. Select the codec
+with `JSON_CODEC`:
+
+- auto   : orjson if installed, otherwise json (default)
+- orjson : require orjson (fails at import if it is missing)
+- json   : always the standard library
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import json
+import os
+from typing import Any, Union
+
+# Optional fast JSON library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+
+if JSON_CODEC == "orjson" and orjson is None:
+    raise ImportError("JSON_CODEC=orjson but the orjson package is not installed")
+
+# Codec in use ("orjson" or "json")
+CODEC = "orjson" if orjson is not None and JSON_CODEC != "json" else "json"
+
+# Raised by `loads` for malformed input (orjson's error subclasses it)
+DecodeError = json.JSONDecodeError
+
+
+# ============================================================
+# Encoding / Decoding
+# ============================================================
+
+if CODEC == "orjson":
+
+    def dumpb(obj: Any, sort_keys: bool = False) -> bytes:
+        """Encode `obj` as compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        """Encode `obj` as a compact JSON string."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode("utf-8")
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode JSON from a string or UTF-8 bytes."""
+        return orjson.loads(data)
+
+else:
+
+    def dumpb(obj: Any, sort_keys: bool = False) -> bytes:
+        """Encode `obj` as compact UTF-8 JSON bytes."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        """Encode `obj` as a compact JSON string."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode JSON from a string or UTF-8 bytes."""
+        return json.loads(data)
@@ -11,7 +11,23 @@ to ensure the Digital Twin consistently represents Roger J. Campbell, using:
 - linkedin.pdf      (PDF-extracted text)
 
 The `prompt()` function returns a complete system prompt string containing all
-relevant persona data, communication rules, and guardrails. This prompt is
+relevant persona data, communication rules, and guardrails. The static persona
+block is rendered once and cached; only the current date/time is spliced in,
+at a granularity of `PROMPT_TIME_GRANULARITY` seconds (default 60). Call
+`invalidate_prompt_cache()` after the resources in `data/` change.
+
+`prompt_blocks()` returns the same content split into the static persona and
+the time-varying part, for callers that send the persona as a cacheable
+Bedrock `system` block. Both take `timed=False` to leave the date/time out,
+for answers that may be reused later (see the response cache in `server.py`). `persona_digest()` identifies the persona data in
+use, so derived caches can tell when it changes.
+
+With `PERSONA_RETRIEVAL` on (the default), callers pass the user's message as
+`query` and the facts, summary and LinkedIn text are replaced by the
+`PERSONA_TOP_K` most relevant chunks from `retrieval.py`; the retrieved
+background is then part of the per-turn (non-cached) content. Without a query
+the full resources are used. Nothing is rendered on import; the persona resources
+are loaded the first time a prompt is requested. This prompt is
 designed to ensure the Digital Twin behaves naturally, professionally, and
 faithfully in alignment with Roger’s real identity, with light use of Markdown
 for emphasis and readability.
@@ -21,26 +37,83 @@ for emphasis and readability.
 # Imports
 # ============================================================
 
-from resources import linkedin, summary, facts, style
+import hashlib
+import os
 from datetime import datetime
+from typing import Optional, Tuple
+
+import resources
+import retrieval
 
 
 # ============================================================
-# Core Identity Variables
+# Prompt Cache Configuration
 # ============================================================
 
-# Extract commonly used name fields from facts.json
-full_name: str = facts["full_name"]
-name: str = facts["name"]
+# Resolution of the timestamp embedded in the prompt, in seconds.
+# Within one interval `prompt()` returns the identical cached string;
+# 0 disables time bucketing and stamps every call to the second.
+PROMPT_TIME_GRANULARITY = int(os.getenv("PROMPT_TIME_GRANULARITY", "60"))
+
+# Include only the persona chunks relevant to the user's message
+PERSONA_RETRIEVAL = os.getenv("PERSONA_RETRIEVAL", "true").lower() == "true"
+
+# Number of chunks retrieved per turn
+PERSONA_TOP_K = int(os.getenv("PERSONA_TOP_K", "4"))
+
+# Placeholders used to split the rendered template around the dynamic sections
+_TIME_MARKER = "\x00CURRENT_DATETIME\x00"
+_KNOWLEDGE_MARKER = "\x00KNOWLEDGE\x00"
+
+# (head, tail) of the prompt on either side of the date/time section
+_static_parts: Optional[Tuple[str, str]] = None
+
+# Persona with the date/time section removed (head + tail)
+_static_persona: Optional[str] = None
+
+# Retrieval mode: the prompt split around the knowledge and date/time sections
+_retrieval_parts: Optional[Tuple[str, str, str]] = None
+
+# (time bucket, fully assembled prompt) for the current interval
+_rendered: Optional[Tuple[int, str]] = None
+
+# SHA-256 of the full static persona (identifies the persona data in use)
+_persona_digest: Optional[str] = None
 
 
 # ============================================================
 # Prompt Generation
 # ============================================================
 
-def prompt() -> str:
+def _time_section(current_datetime: str) -> str:
+    """Return the paragraph that grounds the model in the current date and time."""
+    return f"For reference, here is the current date and time:\n{current_datetime}\n"
+
+
+def _knowledge_section(name: str) -> str:
+    """Return the full background section: facts, summary and LinkedIn text."""
+    return f"""Here is some basic information about {name}:
+{resources.facts}
+
+Here are summary notes from {name}:
+{resources.summary}
+
+Here is the LinkedIn profile of {name}:
+{resources.linkedin}
+"""
+
+
+def _retrieved_section(query: str) -> str:
+    """Return the background section built from the chunks most relevant to `query`."""
+    name = resources.facts["name"]
+    chunks = retrieval.search(query, PERSONA_TOP_K)
+    body = "\n\n".join(chunk["text"] for chunk in chunks)
+    return f"Here is the background about {name} most relevant to this conversation:\n\n{body}\n"
+
+
+def _render_template(time_section: str, knowledge: Optional[str] = None) -> str:
     """
-    Construct and return the complete system prompt for the Digital Twin.
+    Render the complete system prompt for the Digital Twin.
 
     This prompt establishes:
     - The Digital Twin’s role
@@ -52,11 +125,27 @@ def prompt() -> str:
     - Guardrails for behaviour and safety
     - The current date and time (for temporal grounding)
 
+    Parameters
+    ----------
+    time_section : str
+        Date/time paragraph to embed in the prompt (see `_time_section`).
+    knowledge : str, optional
+        Background section to embed; by default the full resources
+        (see `_knowledge_section`).
+
     Returns
     -------
     str
         A fully assembled system prompt string to be passed to the LLM.
     """
+    facts = resources.facts
+    full_name = facts["full_name"]
+    name = facts["name"]
+    style = resources.style
+
+    if knowledge is None:
+        knowledge = _knowledge_section(name)
+
     return f"""
 # Your Role
 
@@ -68,21 +157,11 @@ Digital Twin of {name} and you should present yourself as {name}.
 
 ## Important Context
 
-Here is some basic information about {name}:
-{facts}
-
-Here are summary notes from {name}:
-{summary}
-
-Here is the LinkedIn profile of {name}:
-{linkedin}
-
+{knowledge}
 Here are some notes from {name} about their communication style:
 {style}
 
-For reference, here is the current date and time:
-{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
+{time_section}
 ## Formatting Guidelines
 
 You may use **light Markdown formatting** to make your responses clearer and more readable. In particular:
@@ -125,3 +204,159 @@ Please engage with the user.
 Avoid responding in a way that feels like a chatbot or generic AI assistant, and do not end every message with a question. 
 Aim for a natural, intelligent flow of conversation — a true reflection of {name}.
 """
+
+
+def _get_static_parts() -> Tuple[str, str]:
+    """Render the persona template once and split it around the date/time section."""
+    global _static_parts
+
+    if _static_parts is None:
+        head, tail = _render_template(_TIME_MARKER).split(_TIME_MARKER)
+        _static_parts = (head, tail)
+
+    return _static_parts
+
+
+def _get_static_persona() -> str:
+    """Return the full persona with the date/time section removed."""
+    global _static_persona
+
+    if _static_persona is None:
+        head, tail = _get_static_parts()
+        _static_persona = head + tail
+
+    return _static_persona
+
+
+def _get_retrieval_parts() -> Tuple[str, str, str]:
+    """Render the template once and split it around the knowledge and date/time sections."""
+    global _retrieval_parts
+
+    if _retrieval_parts is None:
+        head, rest = _render_template(_TIME_MARKER, _KNOWLEDGE_MARKER).split(_KNOWLEDGE_MARKER)
+        middle, tail = rest.split(_TIME_MARKER)
+        _retrieval_parts = (head, middle, tail)
+
+    return _retrieval_parts
+
+
+def _current_bucket() -> Tuple[int, str]:
+    """Return the current time bucket and its formatted date/time."""
+    now = datetime.now()
+
+    if PROMPT_TIME_GRANULARITY <= 0:
+        return int(now.timestamp()), now.strftime("%Y-%m-%d %H:%M:%S")
+
+    bucket = int(now.timestamp()) // PROMPT_TIME_GRANULARITY
+    stamp = datetime.fromtimestamp(bucket * PROMPT_TIME_GRANULARITY)
+    return bucket, stamp.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def prompt(query: Optional[str] = None, timed: bool = True) -> str:
+    """
+    Return the complete system prompt for the Digital Twin.
+
+    The static persona block is taken from the cache and the current date and
+    time is spliced in. With a positive `PROMPT_TIME_GRANULARITY` the time is
+    truncated to the interval, and the assembled string is reused for every
+    call within that interval.
+
+    Parameters
+    ----------
+    query : str, optional
+        The user's message. With `PERSONA_RETRIEVAL` on, only the background
+        chunks relevant to it are included.
+    timed : bool
+        Include the current date/time (False leaves the section out).
+
+    Returns
+    -------
+    str
+        A fully assembled system prompt string to be passed to the LLM.
+    """
+    global _rendered
+
+    if PERSONA_RETRIEVAL and query is not None:
+        head, middle, tail = _get_retrieval_parts()
+        time_section = _time_section(_current_bucket()[1]) if timed else ""
+        return head + _retrieved_section(query) + middle + time_section + tail
+
+    if not timed:
+        return _get_static_persona()
+
+    head, tail = _get_static_parts()
+    bucket, stamp = _current_bucket()
+
+    cached = _rendered
+    if PROMPT_TIME_GRANULARITY > 0 and cached is not None and cached[0] == bucket:
+        return cached[1]
+
+    text = head + _time_section(stamp) + tail
+    _rendered = (bucket, text)
+    return text
+
+
+def prompt_blocks(query: Optional[str] = None, timed: bool = True) -> Tuple[str, str]:
+    """
+    Return the system prompt split into its static and per-turn parts.
+
+    The first element is the persona with the date/time section removed; it is
+    byte-identical across turns and sessions, which makes it suitable for a
+    provider-side prompt cache. The second element is the date/time section,
+    preceded by the retrieved background when `PERSONA_RETRIEVAL` is on and a
+    `query` is given (the static persona then omits the background). With
+    `timed=False` the date/time section is left out, so the per-turn section
+    may be empty.
+
+    Returns
+    -------
+    Tuple[str, str]
+        (static persona, per-turn section)
+    """
+    time_section = _time_section(_current_bucket()[1]) if timed else ""
+
+    if PERSONA_RETRIEVAL and query is not None:
+        head, middle, tail = _get_retrieval_parts()
+        retrieved = _retrieved_section(query)
+        return head + middle + tail, (retrieved + "\n" + time_section) if timed else retrieved
+
+    return _get_static_persona(), time_section
+
+
+def persona_digest() -> str:
+    """
+    Return a digest of the rendered persona (all resources and the template).
+
+    Changes whenever anything in `data/` changes and `invalidate_prompt_cache()`
+    has been called; callers use it to key state derived from the persona.
+    """
+    global _persona_digest
+
+    if _persona_digest is None:
+        head, tail = _get_static_parts()
+        _persona_digest = hashlib.sha256((head + tail).encode("utf-8")).hexdigest()
+
+    return _persona_digest
+
+
+def invalidate_prompt_cache(reload_resources: bool = True) -> None:
+    """
+    Discard the cached prompt so the next `prompt()` call re-renders it.
+
+    Parameters
+    ----------
+    reload_resources : bool, optional
+        Re-read the files in `data/` via `resources.reload()` first,
+        by default True.
+    """
+    global _static_parts, _static_persona, _rendered, _retrieval_parts, _persona_digest
+
+    if reload_resources:
+        resources.reload()
+
+    retrieval.invalidate()
+    _static_parts = None
+    _retrieval_parts = None
+    _static_persona = None
+    _rendered = None
+    _persona_digest = None
@@ -7,10 +7,30 @@ llmops-digital-twin backend. It performs the following steps:
 1. Cleans previous build artifacts
 2. Installs all Python dependencies inside a Docker container that matches the
    AWS Lambda Python 3.12 runtime
-3. Collects application files (`server.py`, `lambda_handler.py`, etc.)
+3. Collects application files (`server.py`, `lambda_handler.py`, etc.) and
+   `run.sh`, the uvicorn entry point of the streaming function
 4. Copies the `data/` directory used for contextual persona resources
-5. Builds a deployment ZIP (`lambda-deployment.zip`) suitable for uploading
+5. Pre-extracts the persona resources into `data/persona.json`, so the Lambda
+   never parses the PDF on a cold start, and builds the persona retrieval
+   index (`data/retrieval.json`)
+6. Measures cold-start import time with and without that artifact
+7. Builds a deployment ZIP (`lambda-deployment.zip`) suitable for uploading
    to AWS Lambda or for use in a Lambda Layer
+8. Reports the size of every installed distribution inside the ZIP
+
+Optional flags:
+
+- `--slim`  : prune tests, typing stubs, C sources and install metadata, and
+              ship precompiled bytecode (`/var/task` is read-only, so Python
+              cannot cache `.pyc` files itself on Lambda)
+- `--drop-boto3` : leave out the AWS SDK and use the copy bundled with the
+              Lambda runtime instead. Only safe when that botocore supports
+              S3 conditional writes (`IfNoneMatch` / `IfMatch` on
+              `put_object`); otherwise the S3 backend refuses to start
+- `--layer` : put the dependencies in `lambda-layer.zip` (under `python/`, for
+              a Lambda layer) and only the application in
+              `lambda-deployment.zip`
+- `--report PATH` : also write the size report as JSON
 
 Using Docker ensures full binary compatibility with Lambda's Linux environment.
 """
@@ -19,10 +39,322 @@ Using Docker ensures full binary compatibility with Lambda's Linux environment.
 # Imports
 # ============================================================
 
+import argparse
+import json
 import os
+import re
 import shutil
+import statistics
+import sys
 import zipfile
 import subprocess
+from typing import Dict, List, Set
+
+import resources
+import retrieval
+
+
+# ============================================================
+# Packaging Configuration
+# ============================================================
+
+# Build directory and output archives
+PACKAGE_DIR = "lambda-package"
+DEPLOYMENT_ZIP = "lambda-deployment.zip"
+LAYER_ZIP = "lambda-layer.zip"
+
+# Lambda runtime image used for installing and compiling
+LAMBDA_IMAGE = "public.ecr.aws/lambda/python:3.12"
+
+# Application files copied next to the dependencies
+source_files = ["server.py", "lambda_handler.py", "context.py", "resources.py", "memory.py", "retrieval.py", "response_cache.py", "throttling.py", "routing.py", "metrics.py", "codec.py", "messages.py"]
+
+# Entry point of the streaming function (Lambda Web Adapter runs it; must stay executable)
+script_files = ["run.sh"]
+
+# Distributions already on the Lambda Python runtime (boto3 and its dependencies),
+# dropped only with --drop-boto3: the runtime's copy may predate S3 conditional
+# writes. uvicorn is always bundled: the streaming function serves the app with it.
+RUNTIME_PROVIDED = {"boto3", "botocore", "s3transfer", "jmespath", "python-dateutil", "six", "urllib3"}
+
+# Directories removed from dependencies in slim mode
+PRUNE_DIRS = {"tests", "test", "__pycache__"}
+
+# File suffixes removed from dependencies in slim mode
+PRUNE_SUFFIXES = (".pyi", ".pyx", ".pxd", ".c", ".h", ".cpp")
+
+# Install metadata dropped from `*.dist-info` in slim mode (METADATA and
+# licences stay, as some packages read their own version at runtime)
+DIST_INFO_DROP = {"RECORD", "INSTALLER", "REQUESTED", "WHEEL", "direct_url.json"}
+
+
+# ============================================================
+# Cold Start Measurement
+# ============================================================
+
+# Location of the persona artifact and the retrieval index inside the package
+ARTIFACT_PATH = os.path.join(PACKAGE_DIR, "data", "persona.json")
+RETRIEVAL_INDEX_PATH = os.path.join(PACKAGE_DIR, "data", "retrieval.json")
+
+# Number of fresh interpreters timed per configuration
+COLD_START_RUNS = 3
+
+# Runs in a fresh interpreter: import the handler, then render the first prompt
+COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import lambda_handler
+imported = time.perf_counter()
+import context
+context.prompt()
+rendered = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_prompt_ms": (rendered - imported) * 1000}))
+"""
+
+
+def measure_cold_start(artifact_path: str) -> dict:
+    """
+    Time `import lambda_handler` plus the first prompt in fresh interpreters.
+
+    Runs against the local source tree and environment (not the Linux build in
+    `lambda-package/`), so the numbers are for comparison between builds, not
+    an exact prediction of Lambda init time.
+
+    Parameters
+    ----------
+    artifact_path : str
+        Persona artifact to load; an empty string forces the raw sources.
+
+    Returns
+    -------
+    dict
+        Median `import_ms` and `first_prompt_ms` over `COLD_START_RUNS` runs.
+    """
+    env = dict(os.environ, PERSONA_ARTIFACT_PATH=artifact_path)
+    runs = []
+
+    for _ in range(COLD_START_RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+# ============================================================
+# Dependency Inspection and Pruning
+# ============================================================
+
+def _normalise(name: str) -> str:
+    """Normalise a distribution name (PEP 503)."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _top_level(path: str) -> str:
+    """
+    Return the top-level entry a package-relative path belongs to.
+
+    Bytecode of top-level modules lives in a shared `__pycache__/`, so
+    `__pycache__/six.cpython-312.pyc` belongs to `six.py`.
+    """
+    head, _, rest = path.replace(os.sep, "/").partition("/")
+    if head == "__pycache__" and rest:
+        return rest.split(".", 1)[0] + ".py"
+    return head
+
+
+def list_files(package_dir: str) -> List[str]:
+    """Return every file in `package_dir` as a sorted, '/'-separated relative path."""
+    return sorted(
+        os.path.relpath(os.path.join(root, f), package_dir).replace(os.sep, "/")
+        for root, _, files in os.walk(package_dir)
+        for f in files
+    )
+
+
+def read_distributions(package_dir: str) -> Dict[str, Set[str]]:
+    """
+    Map every installed distribution to the top-level entries it owns.
+
+    Ownership is read from each `*.dist-info/RECORD`, so it must be called
+    before slim mode strips those files.
+
+    Parameters
+    ----------
+    package_dir : str
+        Directory populated by `pip install --target`.
+
+    Returns
+    -------
+    Dict[str, Set[str]]
+        Normalised distribution name -> top-level files and directories.
+    """
+    owners: Dict[str, Set[str]] = {}
+
+    for entry in os.listdir(package_dir):
+        if not entry.endswith(".dist-info"):
+            continue
+
+        name = _normalise(entry[: -len(".dist-info")].rsplit("-", 1)[0])
+        top_level = {entry}
+        record = os.path.join(package_dir, entry, "RECORD")
+
+        if os.path.exists(record):
+            with open(record, "r", encoding="utf-8") as f:
+                for line in f:
+                    path = line.split(",", 1)[0]
+                    if path and not path.startswith(".."):
+                        top_level.add(_top_level(path))
+
+        owners[name] = top_level
+
+    return owners
+
+
+def remove_distributions(package_dir: str, owners: Dict[str, Set[str]], names: Set[str]) -> List[str]:
+    """
+    Delete the files of the given distributions from the package.
+
+    Entries shared with a distribution that is kept are left in place.
+
+    Returns
+    -------
+    List[str]
+        The distributions that were removed.
+    """
+    kept = set().union(*(entries for name, entries in owners.items() if name not in names))
+    removed = []
+
+    for name in sorted(names & owners.keys()):
+        for entry in owners[name] - kept:
+            path = os.path.join(package_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        removed.append(name)
+
+    return removed
+
+
+def prune_files(package_dir: str) -> int:
+    """
+    Remove tests, caches, typing stubs, C sources, scripts and install metadata.
+
+    Returns
+    -------
+    int
+        Number of bytes removed.
+    """
+    removed = 0
+
+    def size_of(path: str) -> int:
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+    # Console scripts installed by pip are useless inside Lambda
+    scripts = os.path.join(package_dir, "bin")
+    if os.path.isdir(scripts):
+        removed += size_of(scripts)
+        shutil.rmtree(scripts)
+
+    for root, dirs, files in os.walk(package_dir):
+        for d in [d for d in dirs if d in PRUNE_DIRS]:
+            path = os.path.join(root, d)
+            removed += size_of(path)
+            shutil.rmtree(path)
+            dirs.remove(d)
+
+        in_dist_info = root.endswith(".dist-info")
+        for f in files:
+            if f.endswith(PRUNE_SUFFIXES) or (in_dist_info and f in DIST_INFO_DROP):
+                path = os.path.join(root, f)
+                removed += os.path.getsize(path)
+                os.remove(path)
+
+    return removed
+
+
+def compile_bytecode(layer: bool) -> None:
+    """
+    Precompile every module with the Lambda runtime's own interpreter.
+
+    Hash-based `.pyc` files (`unchecked-hash`) are used because ZIP archives
+    only keep timestamps to two seconds, which would make timestamp-based
+    caches look stale. Source paths are rewritten to where Lambda mounts the
+    code (`/var/task`, or `/opt/python` for layer dependencies) so tracebacks
+    stay accurate.
+    """
+    package = f"/var/task/{PACKAGE_DIR}"
+    deps_prefix = "/opt/python" if layer else "/var/task"
+    app_files = " ".join(f"{package}/{f}" for f in source_files)
+
+    subprocess.run(
+        [
+            "docker",
+            "run",
+            "--rm",
+            "-v",
+            f"{os.getcwd()}:/var/task",
+            "--platform",
+            "linux/amd64",
+            "--entrypoint",
+            "",
+            LAMBDA_IMAGE,
+            "/bin/sh",
+            "-c",
+            (
+                f"python -m compileall -q -j 0 --invalidation-mode unchecked-hash "
+                f"-s {package} -p {deps_prefix} {package} && "
+                f"python -m compileall -q -f --invalidation-mode unchecked-hash "
+                f"-s {package} -p /var/task {app_files}"
+            ),
+        ],
+        check=True,
+    )
+
+
+# ============================================================
+# Archives and Size Report
+# ============================================================
+
+def write_zip(zip_path: str, package_dir: str, files: List[str], prefix: str = "", level: int = 6) -> None:
+    """Zip the given package-relative files of `package_dir` under `prefix`."""
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+        for file in files:
+            zipf.write(os.path.join(package_dir, file), prefix + file)
+
+
+def size_report(zip_paths: List[str], owners: Dict[str, Set[str]], prefix: str = "python/") -> List[dict]:
+    """
+    Attribute every file in the archives to a distribution (or to the app).
+
+    Returns
+    -------
+    List[dict]
+        One row per distribution with file count and uncompressed and
+        compressed bytes, largest (compressed) first.
+    """
+    owner_of = {entry: name for name, entries in owners.items() for entry in entries}
+    rows: Dict[str, dict] = {}
+
+    for zip_path in zip_paths:
+        with zipfile.ZipFile(zip_path) as zipf:
+            for info in zipf.infolist():
+                name = info.filename[len(prefix):] if info.filename.startswith(prefix) else info.filename
+                owner = owner_of.get(_top_level(name), "(app)")
+                row = rows.setdefault(owner, {"package": owner, "files": 0, "bytes": 0, "compressed": 0})
+                row["files"] += 1
+                row["bytes"] += info.file_size
+                row["compressed"] += info.compress_size
+
+    return sorted(rows.values(), key=lambda row: -row["compressed"])
 
 
 # ============================================================
@@ -37,24 +369,38 @@ def main() -> None:
     - Remove old package folders and ZIP files
     - Build a clean `lambda-package/` directory
     - Install dependencies using the AWS Lambda Python 3.12 Docker image
+    - Optionally (`--slim`) prune the dependencies
     - Copy application source files and the `data/` folder
-    - Package the result as `lambda-deployment.zip`
+    - Build the persona artifact and retrieval index, and report cold-start
+      import time
+    - Optionally (`--slim`) precompile bytecode
+    - Package the result as `lambda-deployment.zip` (plus `lambda-layer.zip`
+      with `--layer`) and report the size per package
     """
+    parser = argparse.ArgumentParser(description="Build the Lambda deployment package.")
+    parser.add_argument("--slim", action="store_true", help="prune dependencies and ship precompiled bytecode")
+    parser.add_argument("--drop-boto3", action="store_true",
+                        help="rely on the Lambda runtime's boto3 (must support S3 conditional writes)")
+    parser.add_argument("--layer", action="store_true", help=f"put dependencies in {LAYER_ZIP}")
+    parser.add_argument("--report", help="write the size report as JSON to this path")
+    args = parser.parse_args()
+
     print("🚀 Creating Lambda deployment package...")
 
     # ------------------------------------------------------------
     # Cleanup previous artifacts
     # ------------------------------------------------------------
-    if os.path.exists("lambda-package"):
-        shutil.rmtree("lambda-package")
+    if os.path.exists(PACKAGE_DIR):
+        shutil.rmtree(PACKAGE_DIR)
 
-    if os.path.exists("lambda-deployment.zip"):
-        os.remove("lambda-deployment.zip")
+    for archive in (DEPLOYMENT_ZIP, LAYER_ZIP):
+        if os.path.exists(archive):
+            os.remove(archive)
 
     # ------------------------------------------------------------
     # Create fresh deployment directory
     # ------------------------------------------------------------
-    os.makedirs("lambda-package")
+    os.makedirs(PACKAGE_DIR)
     print("📁 Created clean lambda-package/ directory")
 
     # ------------------------------------------------------------
@@ -73,12 +419,12 @@ def main() -> None:
             "linux/amd64",  # Ensures x86_64 CPU architecture for Lambda compatibility
             "--entrypoint",
             "",  # Bypass Lambda's default entrypoint
-            "public.ecr.aws/lambda/python:3.12",
+            LAMBDA_IMAGE,
             "/bin/sh",
             "-c",
             (
                 "pip install "
-                "--target /var/task/lambda-package "
+                f"--target /var/task/{PACKAGE_DIR} "
                 "-r /var/task/requirements.txt "
                 "--platform manylinux2014_x86_64 "
                 "--only-binary=:all: "
@@ -88,42 +434,117 @@ def main() -> None:
         check=True,
     )
 
+    # Record which distribution owns what before slim mode strips RECORD files
+    owners = read_distributions(PACKAGE_DIR)
+
+    # ------------------------------------------------------------
+    # Drop the runtime-provided AWS SDK (opt-in)
+    # ------------------------------------------------------------
+    if args.drop_boto3:
+        removed = remove_distributions(PACKAGE_DIR, owners, RUNTIME_PROVIDED)
+        for name in removed:
+            owners.pop(name)
+        print(f"✂️  Removed runtime-provided distributions: {', '.join(removed) or 'none'}")
+
+    # ------------------------------------------------------------
+    # Prune dependencies (slim mode)
+    # ------------------------------------------------------------
+    if args.slim:
+        pruned = prune_files(PACKAGE_DIR)
+        print(f"✂️  Pruned {pruned / (1024 * 1024):.2f} MB of tests, stubs, sources and metadata")
+
+    dependency_entries = {_top_level(path) for path in list_files(PACKAGE_DIR)}
+
     # ------------------------------------------------------------
     # Copy application source files to the package
     # ------------------------------------------------------------
     print("📄 Copying backend source files...")
 
-    source_files = ["server.py", "lambda_handler.py", "context.py", "resources.py"]
-
-    for file in source_files:
+    for file in source_files + script_files:
         if os.path.exists(file):
-            shutil.copy2(file, "lambda-package/")
+            shutil.copy2(file, f"{PACKAGE_DIR}/")
             print(f"   • Copied {file}")
 
     # ------------------------------------------------------------
     # Copy the `data/` directory containing persona resources
     # ------------------------------------------------------------
     if os.path.exists("data"):
-        shutil.copytree("data", "lambda-package/data")
+        shutil.copytree("data", f"{PACKAGE_DIR}/data")
         print("📂 Copied data/ folder")
 
     # ------------------------------------------------------------
-    # Create the final ZIP file
+    # Pre-extract the persona resources (PDF text, summary, style, facts)
+    # ------------------------------------------------------------
+    resources.build_artifact(ARTIFACT_PATH)
+    size_kb = os.path.getsize(ARTIFACT_PATH) / 1024
+    print(f"🧠 Built persona artifact data/persona.json ({size_kb:.1f} KB)")
+
+    # ------------------------------------------------------------
+    # Build the persona retrieval index
+    # ------------------------------------------------------------
+    index = retrieval.build_artifact(RETRIEVAL_INDEX_PATH)
+    print(f"🔎 Built retrieval index data/retrieval.json ({len(index['chunks'])} chunks)")
+
+    # ------------------------------------------------------------
+    # Measure cold-start import time so regressions are visible
+    # ------------------------------------------------------------
+    try:
+        with_artifact = measure_cold_start(os.path.abspath(ARTIFACT_PATH))
+        without_artifact = measure_cold_start("")
+        print(
+            "⏱️  Cold start (import + first prompt): "
+            f"{with_artifact['import_ms']:.0f} + {with_artifact['first_prompt_ms']:.0f} ms with artifact, "
+            f"{without_artifact['import_ms']:.0f} + {without_artifact['first_prompt_ms']:.0f} ms from raw sources"
+        )
+    except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+        print(f"⚠️  Could not measure cold start locally: {e}")
+
+    # ------------------------------------------------------------
+    # Precompile bytecode (slim mode)
+    # ------------------------------------------------------------
+    if args.slim:
+        print("⚙️  Compiling bytecode inside Lambda runtime Docker image...")
+        compile_bytecode(args.layer)
+
+    # ------------------------------------------------------------
+    # Create the final ZIP file(s)
     # ------------------------------------------------------------
     print("📦 Creating zip file...")
 
-    with zipfile.ZipFile("lambda-deployment.zip", "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk("lambda-package"):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, "lambda-package")
-                zipf.write(file_path, arcname)
+    level = 9 if args.slim else 6
+    files = list_files(PACKAGE_DIR)
+
+    if args.layer:
+        dependency_files = [f for f in files if _top_level(f) in dependency_entries]
+        app_files = [f for f in files if _top_level(f) not in dependency_entries]
+        write_zip(DEPLOYMENT_ZIP, PACKAGE_DIR, app_files, level=level)
+        write_zip(LAYER_ZIP, PACKAGE_DIR, dependency_files, prefix="python/", level=level)
+        archives = [DEPLOYMENT_ZIP, LAYER_ZIP]
+    else:
+        write_zip(DEPLOYMENT_ZIP, PACKAGE_DIR, files, level=level)
+        archives = [DEPLOYMENT_ZIP]
+
+    # ------------------------------------------------------------
+    # Report size per package
+    # ------------------------------------------------------------
+    report = size_report(archives, owners)
+
+    print(f"\n{'package':>24} {'files':>6} {'size_kb':>9} {'zipped_kb':>10}")
+    for row in report:
+        print(f"{row['package']:>24} {row['files']:>6} {row['bytes'] / 1024:>9.0f} {row['compressed'] / 1024:>10.0f}")
+    print()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"slim": args.slim, "layer": args.layer, "drop_boto3": args.drop_boto3,
+                       "packages": report}, f, indent=2)
 
     # ------------------------------------------------------------
     # Output the final package size
     # ------------------------------------------------------------
-    size_mb = os.path.getsize("lambda-deployment.zip") / (1024 * 1024)
-    print(f"✅ Created lambda-deployment.zip ({size_mb:.2f} MB)")
+    for archive in archives:
+        size_mb = os.path.getsize(archive) / (1024 * 1024)
+        print(f"✅ Created {archive} ({size_mb:.2f} MB)")
 
 
 # ============================================================
@@ -9,6 +9,10 @@ When deployed, API Gateway forwards incoming HTTP requests to this Lambda
 function, which passes them into the FastAPI `app` object. Responses generated
 by FastAPI are then returned through API Gateway back to the client.
 
+Mangum buffers each response, so `POST /chat/stream` is not served here: the
+streaming function runs the same app under uvicorn (`run.sh`) behind the
+Lambda Web Adapter and a response-streaming Function URL.
+
 This file should be deployed alongside `server.py` in the backend directory.
 """
 
@@ -0,0 +1,1395 @@
+"""
+Conversation storage formats for the AI Digital Twin backend.
+
+This module implements the on-disk and S3 layout used to persist conversation
+history. Conversations are stored as JSON Lines (one compact JSON message per
+line) so that each turn only appends the two new messages instead of
+rewriting the whole history.
+
+Layout
+------
+Local (`MEMORY_DIR`):
+- {session_id}.jsonl           -> append-only message log (first line is a
+                                  fixed-width header with the message count,
+                                  rewritten in place after every append)
+- {session_id}.summary.json    -> rolling summary of the older messages
+
+S3 (`S3_BUCKET`), which has no append operation:
+- {session_id}.jsonl           -> compacted base log (first line is a header)
+- {session_id}/seg-NNNNNNNNNN.jsonl
+                               -> one segment object per turn, written after
+                                  the base and folded into it by compaction
+- {session_id}.summary.json    -> rolling summary of the older messages
+
+Messages are encoded with `codec.py` (orjson when installed, otherwise the
+standard library); both write the same compact JSON, so logs written by one
+are read by the other.
+
+Compression
+-----------
+With `compression` set ("gzip", or "zstd" when the `zstandard` package is
+installed), S3 and DynamoDB bodies are stored compressed; each compressed
+body starts with its format's magic number, which is the format marker, so
+plain objects written earlier (or below `COMPRESS_MIN_BYTES`) still load.
+Compressed S3 base logs keep a plain header line followed by independently
+compressed blocks of `BASE_BLOCK_MESSAGES` messages, whose byte offsets are
+listed in the header, so tail and forward reads still fetch only the blocks
+they need. Local logs stay plain: they are appended to in place and read
+backwards from the end.
+
+Legacy `{session_id}.json` files (a pretty-printed JSON array) are still read
+transparently, and are migrated to the new format the first time a session is
+appended to (locally) or compacted (on S3).
+
+Tail reads (`local_tail`, `s3_tail`) return only the last N messages without
+decoding the whole history: local logs are read backwards from the end of the
+file, and S3 base logs are read with ranged GETs from the end of the object.
+Both take the total message count from the log's header, so their cost does
+not grow with the session.
+
+Forward reads (`local_iter`, `s3_iter`) yield messages lazily from a given
+position; skipped lines are never decoded and the history is never held in
+memory as a whole. They back paginated and streamed conversation responses.
+
+Backends
+--------
+`server.py` talks to storage only through the `MemoryBackend` interface:
+
+- LocalMemoryBackend    -> JSON Lines files in a directory
+- S3MemoryBackend       -> JSON Lines base log + per-turn segments in a bucket
+- DynamoDBMemoryBackend -> one item per message (partition key `session_id`,
+                           sort key `seq`), so appends write only the new
+                           items and tails are a single reverse range query;
+                           the rolling summary is the item with `seq` 0
+
+A session's summary is a small JSON object
+`{"summary": str, "through": int, "updated": str}`: the text summarises
+messages `[0, through)`. It is written independently of the message log.
+
+Concurrency
+-----------
+Concurrent turns on the same session are merged rather than lost: every
+backend only ever appends, and each append is made safe against other writers
+(an OS lock on the log file locally, `If-None-Match` conditional segment writes on S3,
+conditional transactions on DynamoDB), retrying with the next free position on
+conflict. `append` reports whether it had to contend with another writer so
+callers can drop any cached copy of the session.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import gzip
+import os
+import random
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+# JSON encoding (orjson when installed)
+import codec
+
+# Optional zstd compression
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Advisory file locking (fcntl on POSIX, msvcrt on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+# ============================================================
+# Format
+# ============================================================
+
+# Header written as the first line of compacted S3 base logs and of local logs.
+# `segments` is the number of the last segment folded into the base and
+# `messages` the number of messages the base holds. Local logs record
+# `messages` and `bytes` instead: the count of messages in the first `bytes`
+# bytes of the log.
+FORMAT_NAME = "twin-jsonl"
+FORMAT_VERSION = 1
+
+# Width (bytes, including the newline) of the header line of local logs
+LOCAL_HEADER_SIZE = 128
+
+# Byte locked (far past any log's end) to hold a session's log on Windows
+WINDOWS_LOCK_OFFSET = 1 << 40
+
+# Initial block size for reading a log backwards from its end
+TAIL_BLOCK_SIZE = 16 * 1024
+
+# Initial range read for the header line of an S3 base log
+HEADER_READ_SIZE = 256
+
+# Messages per independently compressed block of an S3 base log
+BASE_BLOCK_MESSAGES = 64
+
+# Bodies smaller than this (bytes) are stored uncompressed
+COMPRESS_MIN_BYTES = 512
+
+# Supported compression formats and the magic numbers that mark them
+COMPRESSIONS = ("gzip", "zstd")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Attempts made by a conditional append before giving up, and the base delay
+# of the jittered exponential backoff between attempts (seconds)
+APPEND_MAX_ATTEMPTS = 16
+APPEND_RETRY_DELAY = 0.005
+
+
+class ConcurrentWriteError(Exception):
+    """Raised when an append keeps losing races with other writers."""
+
+
+def _retry_backoff(attempt: int) -> None:
+    """Sleep before retrying a conditional write (full jitter, capped at 1s)."""
+    time.sleep(random.uniform(0, min(1.0, APPEND_RETRY_DELAY * 2 ** attempt)))
+
+
+def legacy_key(session_id: str) -> str:
+    """Return the legacy (whole-document JSON) filename/key for a session."""
+    return f"{session_id}.json"
+
+
+def log_key(session_id: str) -> str:
+    """Return the JSON Lines log filename/key for a session."""
+    return f"{session_id}.jsonl"
+
+
+def segment_prefix(session_id: str) -> str:
+    """Return the S3 key prefix shared by all segments of a session."""
+    return f"{session_id}/seg-"
+
+
+def segment_key(session_id: str, number: int) -> str:
+    """Return the S3 key of a numbered segment (zero-padded so keys sort)."""
+    return f"{segment_prefix(session_id)}{number:010d}.jsonl"
+
+
+def segment_number(key: str) -> int:
+    """Parse the segment number back out of a segment key."""
+    return int(key.rsplit("seg-", 1)[1].split(".", 1)[0])
+
+
+def summary_key(session_id: str) -> str:
+    """Return the filename/key of a session's rolling summary."""
+    return f"{session_id}.summary.json"
+
+
+def encode_lines(messages: List[Dict]) -> bytes:
+    """Encode messages as compact UTF-8 JSON Lines (newline-terminated)."""
+    return b"".join(codec.dumpb(m) + b"\n" for m in messages)
+
+
+def encode_header(segments: int, messages: int, **fields: Any) -> bytes:
+    """Encode the header line of a compacted base log."""
+    header = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "segments": segments, "messages": messages, **fields}
+    return codec.dumpb(header) + b"\n"
+
+
+def encode_local_header(messages: int, size: int) -> bytes:
+    """
+    Encode the header line of a local log.
+
+    The line is padded with spaces to `LOCAL_HEADER_SIZE`, so it can be
+    rewritten in place as the log grows.
+    """
+    line = codec.dumpb({"format": FORMAT_NAME, "version": FORMAT_VERSION, "messages": messages, "bytes": size})
+    return line.ljust(LOCAL_HEADER_SIZE - 1) + b"\n"
+
+
+def decode_local_header(data: bytes) -> Optional[Dict[str, Any]]:
+    """Return the header at the start of a local log, or None if it has none."""
+    line, newline, _ = data[:LOCAL_HEADER_SIZE].partition(b"\n")
+    if not newline or not line.startswith(b'{"format"'):
+        return None
+
+    try:
+        header = codec.loads(line)
+    except codec.DecodeError:
+        return None
+
+    return header if header.get("format") == FORMAT_NAME and "bytes" in header else None
+
+
+def encode_base(segments: int, messages: List[Dict], compression: Optional[str] = None) -> bytes:
+    """
+    Encode a compacted base log: the header line, then the messages.
+
+    With `compression`, the messages are written as independently compressed
+    blocks of `BASE_BLOCK_MESSAGES`, and the header records the compression,
+    the block size and the absolute byte offset of every block.
+    """
+    if not compression:
+        return encode_header(segments, len(messages)) + encode_lines(messages)
+
+    blocks = [
+        compress(encode_lines(messages[i:i + BASE_BLOCK_MESSAGES]), compression, min_bytes=0)
+        for i in range(0, len(messages), BASE_BLOCK_MESSAGES)
+    ]
+
+    # Offsets include the header's own length, which depends on the offsets
+    header = b""
+    while True:
+        offsets = []
+        position = len(header)
+        for block in blocks:
+            offsets.append(position)
+            position += len(block)
+
+        encoded = encode_header(segments, len(messages), compression=compression,
+                                block_messages=BASE_BLOCK_MESSAGES, blocks=offsets)
+        if len(encoded) == len(header):
+            return encoded + b"".join(blocks)
+        header = encoded
+
+
+def decode_base(data: bytes) -> Tuple[Optional[Dict[str, Any]], List[Dict]]:
+    """Decode a base log, plain or block-compressed, into (header, messages)."""
+    line, _, body = data.partition(b"\n")
+
+    try:
+        header = codec.loads(line)
+    except codec.DecodeError:
+        header = None
+
+    if isinstance(header, dict) and header.get("format") == FORMAT_NAME and header.get("compression"):
+        return header, decode_lines(body)[1]
+
+    return decode_lines(data)
+
+
+def decode_lines(data: bytes) -> Tuple[Optional[Dict[str, Any]], List[Dict]]:
+    """
+    Decode a JSON Lines log into (header, messages).
+
+    The header is None when the log has none. A truncated final line (for
+    example from a crash mid-append) is ignored rather than failing the read.
+    Compressed data (gzip or zstd, recognised by its magic number) is
+    decompressed first.
+
+    Well-formed logs are decoded with a single `codec.loads` call over the
+    lines joined into one JSON array, which is much cheaper than one call per
+    line; only a log that fails that falls back to line-by-line decoding.
+    """
+    lines = [line for line in unpack(data).split(b"\n") if line.strip()]
+
+    try:
+        records = codec.loads(b"[" + b",".join(lines) + b"]")
+    except codec.DecodeError:
+        records = None
+
+    if records is not None:
+        if records and records[0].get("format") == FORMAT_NAME:
+            return records[0], records[1:]
+        return None, records
+
+    header = None
+    messages = []
+
+    for i, line in enumerate(lines):
+        try:
+            record = codec.loads(line)
+        except codec.DecodeError:
+            if i == len(lines) - 1:
+                break
+            raise
+
+        if i == 0 and record.get("format") == FORMAT_NAME:
+            header = record
+        else:
+            messages.append(record)
+
+    return header, messages
+
+
+def iter_line_records(chunks: Iterable[bytes], start: int = 0, has_header: bool = False) -> Iterator[Dict]:
+    """
+    Lazily decode JSON Lines from a stream of byte chunks.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        Raw bytes of the log, in order, split at arbitrary points.
+    start : int, optional
+        Number of message lines to skip (without decoding them), by default 0.
+    has_header : bool, optional
+        Whether the first line may be a format header, by default False.
+
+    A trailing line without a newline terminator that fails to decode is
+    treated as a torn write and dropped.
+    """
+    pending = b""
+    index = 0
+    first = True
+
+    def records(lines: List[bytes]) -> Iterator[Dict]:
+        nonlocal index, first
+        for line in lines:
+            if not line.strip():
+                continue
+
+            if first and has_header:
+                first = False
+                record = codec.loads(line)
+                if record.get("format") == FORMAT_NAME:
+                    continue
+                if index >= start:
+                    yield record
+                index += 1
+                continue
+
+            first = False
+            if index >= start:
+                yield codec.loads(line)
+            index += 1
+
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from records(lines)
+
+    if pending.strip():
+        try:
+            codec.loads(pending)
+        except codec.DecodeError:
+            return
+        yield from records([pending])
+
+
+# ============================================================
+# Compression
+# ============================================================
+
+def _zstd():
+    """Return the `zstandard` module, or fail with a clear error if it is missing."""
+    if zstandard is None:
+        raise ImportError("zstd compression requires the zstandard package")
+    return zstandard
+
+
+def check_compression(compression: Optional[str]) -> Optional[str]:
+    """Validate a compression setting; "none" or empty means no compression (None)."""
+    if not compression or compression == "none":
+        return None
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {COMPRESSIONS} or 'none'")
+    if compression == "zstd":
+        _zstd()
+    return compression
+
+
+def compress(data: bytes, compression: Optional[str], min_bytes: int = COMPRESS_MIN_BYTES) -> bytes:
+    """Compress `data`; returned unchanged without `compression` or when shorter than `min_bytes`."""
+    if not compression or len(data) < min_bytes:
+        return data
+    if compression == "gzip":
+        # mtime=0 keeps the output (and so the S3 ETag) deterministic
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return _zstd().ZstdCompressor().compress(data)
+
+
+def _decompressor(data: bytes) -> Any:
+    """Return a streaming decompressor for the format `data` starts with (None if plain)."""
+    if data.startswith(GZIP_MAGIC):
+        return zlib.decompressobj(wbits=31)
+    if data.startswith(ZSTD_MAGIC):
+        return _zstd().ZstdDecompressor().decompressobj()
+    return None
+
+
+def iter_decompressed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Lazily decompress a stream of byte chunks.
+
+    The stream may hold several concatenated compressed members (the blocks
+    of a base log), each recognised by its magic number; a stream that does
+    not start with one is passed through unchanged.
+    """
+    decompressor = None
+    plain = False
+    pending = b""
+
+    for chunk in chunks:
+        data = pending + chunk
+        pending = b""
+
+        while data:
+            if plain:
+                yield data
+                break
+
+            if decompressor is None:
+                # Wait for enough bytes to recognise the magic number
+                if len(data) < len(ZSTD_MAGIC):
+                    pending = data
+                    break
+                decompressor = _decompressor(data)
+                if decompressor is None:
+                    plain = True
+                    continue
+
+            yield decompressor.decompress(data)
+            if not decompressor.eof:
+                break
+            data = decompressor.unused_data
+            decompressor = None
+
+    if pending:
+        yield pending
+
+
+def unpack(data: bytes) -> bytes:
+    """Decompress `data` if it is compressed; plain data is returned as is."""
+    if not data.startswith((GZIP_MAGIC, ZSTD_MAGIC)):
+        return data
+    return b"".join(iter_decompressed([data]))
+
+
+# ============================================================
+# Local Filesystem Storage
+# ============================================================
+
+def _local_path(directory: str, name: str) -> str:
+    return os.path.join(directory, name)
+
+
+def local_load(directory: str, session_id: str) -> List[Dict]:
+    """
+    Load a session from `directory`.
+
+    Reads the JSON Lines log if present (and not empty), otherwise the
+    legacy JSON file, otherwise returns an empty list.
+    """
+    path = _local_path(directory, log_key(session_id))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data:
+            return decode_lines(data)[1]
+
+    legacy = _local_path(directory, legacy_key(session_id))
+    if os.path.exists(legacy):
+        with open(legacy, "rb") as f:
+            return codec.loads(f.read())
+
+    return []
+
+
+def _local_count(f: BinaryIO) -> Tuple[int, int]:
+    """
+    Count the messages of an open local log without decoding them.
+
+    Returns (message count, log size the count applies to). The count comes
+    from the header, plus any lines appended after it was last rewritten
+    (normally none, unless a writer crashed in between), so the cost does not
+    grow with the session. Logs written before logs had a header are counted
+    in full. The header is read before the size, so it never describes more
+    of the log than was counted.
+    """
+    f.seek(0)
+    head = f.read(LOCAL_HEADER_SIZE)
+    header = decode_local_header(head)
+    size = os.fstat(f.fileno()).st_size
+
+    if header:
+        start, count = header["bytes"], header["messages"]
+    else:
+        # A header caught mid-rewrite is skipped rather than counted as a message
+        start, count = (LOCAL_HEADER_SIZE if head.startswith(b'{"format"') else 0), 0
+
+    f.seek(start)
+    for block in iter(lambda: f.read(min(1024 * 1024, size - f.tell())), b""):
+        count += block.count(b"\n")
+
+    return count, size
+
+
+def _read_last_lines(f: BinaryIO, n: int, end: int) -> bytes:
+    """
+    Return (at most) the last `n` complete lines of the first `end` bytes of a file.
+
+    Reads fixed-size blocks backwards from `end` until enough newlines have
+    been seen, so only the tail is ever held in memory.
+    """
+    pos = end
+    buf = b""
+
+    # n + 1 newlines guarantee n whole lines plus a (possibly torn) last one
+    while pos > 0 and buf.count(b"\n") <= n:
+        size = min(TAIL_BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        buf = f.read(size) + buf
+
+    lines = buf.split(b"\n")
+    if pos > 0:
+        # The first line is cut off mid-way
+        lines = lines[1:]
+
+    torn = lines[-1]
+    return b"\n".join(lines[:-1][-n:] + [torn])
+
+
+def local_tail(directory: str, session_id: str, n: int) -> Tuple[List[Dict], int]:
+    """
+    Load only the last `n` messages of a session.
+
+    Returns (messages, total message count). For JSON Lines logs only the end
+    of the file is decoded, and the total comes from the log's header.
+    Legacy JSON files are read in full.
+    """
+    path = _local_path(directory, log_key(session_id))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            total, size = _local_count(f)
+            if size:
+                messages = decode_lines(_read_last_lines(f, n, size))[1]
+                return messages[-n:], total
+
+    messages = local_load(directory, session_id)
+    return messages[-n:], len(messages)
+
+
+def local_iter(directory: str, session_id: str, start: int = 0) -> Iterator[Dict]:
+    """Yield a session's messages lazily, beginning at position `start`."""
+    path = _local_path(directory, log_key(session_id))
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            yield from iter_line_records(iter(lambda: f.read(64 * 1024), b""), start, has_header=True)
+        return
+
+    yield from local_load(directory, session_id)[start:]
+
+
+@contextmanager
+def _local_lock(directory: str, session_id: str) -> Iterator[Tuple[BinaryIO, bool]]:
+    """
+    Open a session's log (creating it empty) and hold an exclusive lock on it.
+
+    Yields (file, contended): the log opened for reading and writing, and
+    True if another writer held the lock when it was requested. The lock is
+    taken on the log itself, so no lock files are left behind. A rewrite
+    renames a new log into place, so a writer that was waiting on the
+    replaced file reopens the log and locks it again.
+    """
+    path = _local_path(directory, log_key(session_id))
+    contended = False
+
+    while True:
+        f = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)), "r+b")
+
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                contended = True
+                fcntl.flock(f, fcntl.LOCK_EX)
+
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                break
+            f.close()
+            continue
+
+        if msvcrt is not None:
+            # Windows locks are mandatory, so lock a byte past any real data
+            # to keep the log readable by others
+            f.seek(WINDOWS_LOCK_OFFSET)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                contended = True
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        break
+
+    try:
+        f.seek(0)
+        yield f, contended
+    finally:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            f.seek(WINDOWS_LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+
+def _local_write_log(f: BinaryIO, directory: str, session_id: str, messages: List[Dict]) -> None:
+    """
+    Replace a session's log; `f` is the log as locked by `_local_lock`.
+
+    The new log is written to a temporary file and renamed into place, so
+    readers never see a partially written file. Windows cannot rename over
+    an open file, so there the locked log is rewritten in place. Any legacy
+    JSON file, and the `{session_id}.lock` file of earlier versions, is
+    removed afterwards. The caller must not write to `f` again.
+    """
+    path = _local_path(directory, log_key(session_id))
+    body = encode_lines(messages)
+    data = encode_local_header(len(messages), LOCAL_HEADER_SIZE + len(body)) + body
+
+    if fcntl is not None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    else:
+        f.seek(0)
+        f.truncate()
+        f.write(data)
+        f.flush()
+
+    for name in (legacy_key(session_id), f"{session_id}.lock"):
+        leftover = _local_path(directory, name)
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def local_load_summary(directory: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Return a session's rolling summary, or None if it has none."""
+    try:
+        with open(_local_path(directory, summary_key(session_id)), "rb") as f:
+            return codec.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def local_save_summary(directory: str, session_id: str, summary: Dict[str, Any]) -> None:
+    """Atomically replace a session's rolling summary."""
+    os.makedirs(directory, exist_ok=True)
+    path = _local_path(directory, summary_key(session_id))
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(codec.dumpb(summary))
+
+    os.replace(tmp_path, path)
+
+
+def local_append(directory: str, session_id: str, messages: List[Dict]) -> bool:
+    """
+    Append `messages` to a session's log.
+
+    Appends are serialized by the session lock, so concurrent turns are
+    written one after the other rather than interleaved. The new lines are
+    written first and the header's count is rewritten in place afterwards,
+    so a crash in between leaves lines the next count still finds. A torn
+    (unterminated) last line is cut off before appending. New sessions,
+    sessions still stored in the legacy format and logs written before logs
+    had a header are written out whole instead.
+
+    Returns True if another writer was holding the session at the time.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    with _local_lock(directory, session_id) as (f, contended):
+        if decode_local_header(f.read(LOCAL_HEADER_SIZE)) is None:
+            _local_write_log(f, directory, session_id, local_load(directory, session_id) + messages)
+            return contended
+
+        count, size = _local_count(f)
+        end = size
+
+        f.seek(size - 1)
+        if f.read(1) != b"\n":
+            end -= len(_read_last_lines(f, 1, size).rpartition(b"\n")[2])
+            f.truncate(end)
+
+        body = encode_lines(messages)
+        f.seek(end)
+        f.write(body)
+        f.flush()
+        f.seek(0)
+        f.write(encode_local_header(count + len(messages), end + len(body)))
+        f.flush()
+
+    return contended
+
+
+# ============================================================
+# S3 Storage
+# ============================================================
+
+# Error codes returned when a conditional S3 write loses a race
+S3_CONFLICT_CODES = ("PreconditionFailed", "ConditionalRequestConflict")
+
+
+def check_conditional_writes(client) -> None:
+    """
+    Fail clearly if an S3 client cannot send conditional writes.
+
+    Appends and compaction rely on `IfNoneMatch` / `IfMatch` on `put_object`,
+    which older botocore releases (such as the one bundled with the Lambda
+    runtime) reject in parameter validation, so every append would fail.
+    Clients without a service model (test stand-ins) are not checked.
+    """
+    meta = getattr(client, "meta", None)
+    if meta is None or not hasattr(meta, "service_model"):
+        return
+
+    members = meta.service_model.operation_model("PutObject").input_shape.members
+    missing = [name for name in ("IfNoneMatch", "IfMatch") if name not in members]
+    if missing:
+        import botocore
+        raise RuntimeError(
+            f"botocore {botocore.__version__} does not support {' / '.join(missing)} on S3 put_object; "
+            "bundle a recent boto3 with the deployment (deploy.py without --drop-boto3)"
+        )
+
+
+def _s3_get(client, bucket: str, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """Return (body, ETag) of an object, or (None, None) if it does not exist."""
+    try:
+        response = client.get_object(Bucket=bucket, Key=key)
+        return response["Body"].read(), response.get("ETag")
+
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return None, None
+        raise
+
+
+def _s3_get_body(client, bucket: str, key: str) -> Optional[bytes]:
+    """Return an object's body, or None if it does not exist."""
+    return _s3_get(client, bucket, key)[0]
+
+
+def _s3_base_head(client, bucket: str, session_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Return (header, ETag) of a session's base log, or (None, None) if there is no base.
+
+    Only the first bytes of the base are fetched (more only for the longer
+    header of a block-compressed base), so this stays cheap however long the
+    session grows. A base without a recognisable header yields {}.
+    """
+    size = HEADER_READ_SIZE
+
+    try:
+        while True:
+            response = client.get_object(Bucket=bucket, Key=log_key(session_id), Range=f"bytes=0-{size - 1}")
+            data = response["Body"].read()
+            if b"\n" in data or len(data) < size:
+                break
+            size *= 4
+
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return None, None
+        if e.response["Error"]["Code"] == "InvalidRange":
+            return {}, None
+        raise
+
+    try:
+        header = codec.loads(data.split(b"\n", 1)[0])
+    except codec.DecodeError:
+        return {}, response.get("ETag")
+
+    return (header if header.get("format") == FORMAT_NAME else {}), response.get("ETag")
+
+
+def _s3_base_header(client, bucket: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Return the header of a session's base log, or None if there is no base."""
+    return _s3_base_head(client, bucket, session_id)[0]
+
+
+def _s3_base_through(client, bucket: str, session_id: str) -> int:
+    """Return the last segment folded into the base log (0 if there is no base)."""
+    return (_s3_base_header(client, bucket, session_id) or {}).get("segments", 0)
+
+
+def _s3_segment_keys(client, bucket: str, session_id: str, after: int) -> List[str]:
+    """List segment keys numbered above `after`, in order."""
+    keys = []
+    kwargs = {
+        "Bucket": bucket,
+        "Prefix": segment_prefix(session_id),
+        "StartAfter": segment_key(session_id, after),
+    }
+
+    while True:
+        response = client.list_objects_v2(**kwargs)
+        keys.extend(obj["Key"] for obj in response.get("Contents", []))
+
+        if not response.get("IsTruncated"):
+            return keys
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+
+def _s3_load_base(client, bucket: str, session_id: str) -> Tuple[int, List[Dict], bool, Optional[str]]:
+    """
+    Load the compacted base of a session.
+
+    Returns (last folded segment number, messages, whether the messages came
+    from a legacy JSON object, ETag of the base log or None if it is absent).
+    """
+    data, etag = _s3_get(client, bucket, log_key(session_id))
+    if data is not None:
+        header, messages = decode_base(data)
+        return (header or {}).get("segments", 0), messages, False, etag
+
+    legacy = _s3_get_body(client, bucket, legacy_key(session_id))
+    if legacy is not None:
+        return 0, codec.loads(legacy), True, None
+
+    return 0, [], False, None
+
+
+def s3_load(client, bucket: str, session_id: str) -> List[Dict]:
+    """Load a session from S3: the base log followed by any newer segments."""
+    through, messages, _, _ = _s3_load_base(client, bucket, session_id)
+
+    for key in _s3_segment_keys(client, bucket, session_id, through):
+        data = _s3_get_body(client, bucket, key)
+        if data is not None:
+            messages.extend(decode_lines(data)[1])
+
+    return messages
+
+
+def _s3_read_last_lines(client, bucket: str, key: str, n: int, etag: Optional[str] = None) -> bytes:
+    """
+    Return (at most) the last `n` complete lines of an object.
+
+    Uses suffix-range GETs, doubling the range until it covers `n` lines or
+    the whole object. With `etag`, each read is conditional on it.
+    """
+    size = TAIL_BLOCK_SIZE
+    conditions = {"IfMatch": etag} if etag else {}
+
+    while True:
+        response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{size}", **conditions)
+        data = response["Body"].read()
+
+        # "bytes start-end/total"; absent when the whole object was returned
+        content_range = response.get("ContentRange", "")
+        total = int(content_range.rsplit("/", 1)[1]) if "/" in content_range else len(data)
+        whole = len(data) >= total
+
+        lines = data.split(b"\n")
+        if not whole:
+            lines = lines[1:]
+
+        if whole or len(lines) > n:
+            return b"\n".join(lines[-(n + 1):])
+
+        size *= 2
+
+
+def _s3_base_blocks(client, bucket: str, session_id: str, header: Dict[str, Any], etag: Optional[str],
+                    start: int) -> Tuple[Iterator[bytes], int]:
+    """
+    Stream the decompressed lines of a block-compressed base log.
+
+    Reads from the block holding message `start` to the end of the base, and
+    returns (chunks, position of the first message in them). The read is
+    conditional on `etag`, so a base replaced since its header was read
+    raises a precondition failure instead of being misread.
+    """
+    per_block = header["block_messages"]
+    block = min(max(start, 0) // per_block, len(header["blocks"]) - 1)
+
+    response = client.get_object(
+        Bucket=bucket,
+        Key=log_key(session_id),
+        Range=f"bytes={header['blocks'][block]}-",
+        **({"IfMatch": etag} if etag else {})
+    )
+    return iter_decompressed(response["Body"].iter_chunks(64 * 1024)), block * per_block
+
+
+def _s3_changed(e: ClientError) -> bool:
+    """True if a conditional read failed because the object was replaced."""
+    return e.response["Error"]["Code"] in ("PreconditionFailed", "InvalidRange")
+
+
+def s3_tail(client, bucket: str, session_id: str, n: int) -> Tuple[List[Dict], int]:
+    """
+    Load only the last `n` messages of a session.
+
+    Returns (messages, total message count). Pending segments (bounded by
+    compaction) are read in full; any remaining messages come from a ranged
+    read of the end of the base log (its last blocks, if it is compressed).
+    Legacy objects, bases written without a message count and bases
+    replaced mid-read fall back to a full read.
+    """
+    header, etag = _s3_base_head(client, bucket, session_id)
+
+    if header is None or "messages" not in header:
+        messages = s3_load(client, bucket, session_id)
+        return messages[-n:], len(messages)
+
+    recent = []
+    for key in _s3_segment_keys(client, bucket, session_id, header["segments"]):
+        data = _s3_get_body(client, bucket, key)
+        if data is not None:
+            recent.extend(decode_lines(data)[1])
+
+    total = header["messages"] + len(recent)
+    needed = n - len(recent)
+
+    if needed > 0 and header["messages"]:
+        try:
+            if header.get("compression"):
+                chunks, _ = _s3_base_blocks(client, bucket, session_id, header, etag, header["messages"] - needed)
+                data = b"".join(chunks)
+            else:
+                data = _s3_read_last_lines(client, bucket, log_key(session_id), needed, etag)
+        except ClientError as e:
+            if not _s3_changed(e):
+                raise
+            messages = s3_load(client, bucket, session_id)
+            return messages[-n:], len(messages)
+        recent = decode_lines(data)[1][-needed:] + recent
+
+    return recent[-n:], total
+
+
+def s3_iter(client, bucket: str, session_id: str, start: int = 0) -> Iterator[Dict]:
+    """
+    Yield a session's messages lazily, beginning at position `start`.
+
+    The base log is streamed from S3 rather than buffered (from the block
+    holding `start`, if it is compressed), and is skipped entirely when its
+    header shows that `start` lies beyond it. Legacy objects and bases
+    without a message count are read in full.
+    """
+    header, etag = _s3_base_head(client, bucket, session_id)
+
+    if header is None or "messages" not in header:
+        yield from s3_load(client, bucket, session_id)[start:]
+        return
+
+    if start < header["messages"]:
+        try:
+            if header.get("compression"):
+                chunks, first = _s3_base_blocks(client, bucket, session_id, header, etag, start)
+            else:
+                response = client.get_object(
+                    Bucket=bucket, Key=log_key(session_id), **({"IfMatch": etag} if etag else {})
+                )
+                chunks, first = response["Body"].iter_chunks(64 * 1024), 0
+        except ClientError as e:
+            if not _s3_changed(e):
+                raise
+            yield from s3_load(client, bucket, session_id)[start:]
+            return
+        # Compressed blocks hold message lines only; a plain base starts with its header
+        yield from iter_line_records(chunks, start - first, has_header=not header.get("compression"))
+        start = 0
+    else:
+        start -= header["messages"]
+
+    for key in _s3_segment_keys(client, bucket, session_id, header["segments"]):
+        data = _s3_get_body(client, bucket, key)
+        if data is None:
+            continue
+
+        messages = decode_lines(data)[1]
+        if start >= len(messages):
+            start -= len(messages)
+            continue
+
+        yield from messages[start:]
+        start = 0
+
+
+def s3_load_summary(client, bucket: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Return a session's rolling summary, or None if it has none."""
+    data = _s3_get_body(client, bucket, summary_key(session_id))
+    return codec.loads(unpack(data)) if data is not None else None
+
+
+def s3_save_summary(client, bucket: str, session_id: str, summary: Dict[str, Any],
+                    compression: Optional[str] = None) -> None:
+    """Replace a session's rolling summary."""
+    client.put_object(
+        Bucket=bucket,
+        Key=summary_key(session_id),
+        Body=compress(codec.dumpb(summary), compression),
+        ContentType="application/json"
+    )
+
+
+def _s3_put_base(client, bucket: str, session_id: str, segments: int, messages: List[Dict],
+                 compression: Optional[str] = None, **conditions: str) -> None:
+    client.put_object(
+        Bucket=bucket,
+        Key=log_key(session_id),
+        Body=encode_base(segments, messages, compression),
+        ContentType="application/x-ndjson",
+        **conditions
+    )
+
+
+def _s3_delete(client, bucket: str, keys: List[str]) -> None:
+    """Delete keys in batches of 1000 (the DeleteObjects limit)."""
+    for i in range(0, len(keys), 1000):
+        client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]], "Quiet": True}
+        )
+
+
+def s3_compact(client, bucket: str, session_id: str, compression: Optional[str] = None) -> bool:
+    """
+    Fold all segments (and any legacy JSON object) into the base log.
+
+    The new base records the last folded segment number in its header before
+    the segments are deleted, so concurrent readers never double-count them.
+    The base is written conditionally on the ETag it was read with; if another
+    compaction got there first, nothing is changed.
+
+    Returns True if the base log was rewritten.
+    """
+    through, messages, from_legacy, etag = _s3_load_base(client, bucket, session_id)
+    keys = _s3_segment_keys(client, bucket, session_id, through)
+
+    for key in keys:
+        data = _s3_get_body(client, bucket, key)
+        if data is not None:
+            messages.extend(decode_lines(data)[1])
+
+    if keys:
+        through = segment_number(keys[-1])
+
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+
+    try:
+        _s3_put_base(client, bucket, session_id, through, messages, compression, **condition)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in S3_CONFLICT_CODES:
+            return False
+        raise
+
+    _s3_delete(client, bucket, keys + ([legacy_key(session_id)] if from_legacy else []))
+    return True
+
+
+def s3_append(client, bucket: str, session_id: str, messages: List[Dict], compact_after: int = 16,
+              compression: Optional[str] = None) -> bool:
+    """
+    Append `messages` to a session as a new segment object.
+
+    The segment is created with `If-None-Match: *`, so two writers can never
+    claim the same segment number; the loser backs off and retries with the
+    next one.
+    Segments are listed before the base header is read: compaction writes the
+    new base before deleting the segments it folded, so this order always sees
+    either the segments or the base that replaced them.
+
+    Once more than `compact_after` segments are pending, they are folded
+    into the base log (0 disables automatic compaction).
+
+    Returns True if the append had to retry because of another writer.
+    """
+    contended = False
+
+    for attempt in range(APPEND_MAX_ATTEMPTS):
+        keys = _s3_segment_keys(client, bucket, session_id, 0)
+        through = _s3_base_through(client, bucket, session_id)
+
+        pending = [k for k in keys if segment_number(k) > through]
+        number = max([through] + [segment_number(k) for k in keys]) + 1
+
+        try:
+            client.put_object(
+                Bucket=bucket,
+                Key=segment_key(session_id, number),
+                Body=compress(encode_lines(messages), compression),
+                ContentType="application/x-ndjson",
+                IfNoneMatch="*"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in S3_CONFLICT_CODES:
+                contended = True
+                _retry_backoff(attempt)
+                continue
+            raise
+
+        if compact_after and len(pending) + 1 > compact_after:
+            s3_compact(client, bucket, session_id, compression)
+
+        return contended
+
+    raise ConcurrentWriteError(f"Could not append to session {session_id} after {APPEND_MAX_ATTEMPTS} attempts")
+
+
+# ============================================================
+# DynamoDB Storage
+# ============================================================
+
+def _dynamodb_item(session_id: str, seq: int, message: Dict, compression: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Encode one message as a DynamoDB item (low-level attribute format).
+
+    The message is a string attribute, or a binary one when it is stored
+    compressed.
+    """
+    data = codec.dumpb(message)
+    packed = compress(data, compression)
+
+    return {
+        "session_id": {"S": session_id},
+        "seq": {"N": str(seq)},
+        "message": {"B": packed} if packed is not data else {"S": data.decode("utf-8")},
+    }
+
+
+def _dynamodb_message(item: Dict[str, Any]) -> Dict:
+    """Decode a DynamoDB item back into a message dictionary."""
+    value = item["message"]
+    return codec.loads(unpack(value["B"]) if "B" in value else value["S"])
+
+
+def _dynamodb_query(client, table: str, session_id: str, start: int = 0, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+    """Yield a session's items with `seq > start`, following query pagination."""
+    query = {
+        "TableName": table,
+        "KeyConditionExpression": "session_id = :s AND seq > :start",
+        "ExpressionAttributeValues": {":s": {"S": session_id}, ":start": {"N": str(start)}},
+        **kwargs,
+    }
+
+    while True:
+        response = client.query(**query)
+        yield from response.get("Items", [])
+
+        if "LastEvaluatedKey" not in response or "Limit" in kwargs:
+            return
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def dynamodb_last_seq(client, table: str, session_id: str) -> int:
+    """Return the sequence number of a session's newest message (0 if empty)."""
+    items = list(_dynamodb_query(client, table, session_id, ScanIndexForward=False, Limit=1))
+    return int(items[0]["seq"]["N"]) if items else 0
+
+
+def dynamodb_iter(client, table: str, session_id: str, start: int = 0) -> Iterator[Dict]:
+    """Yield a session's messages lazily, beginning at position `start`."""
+    for item in _dynamodb_query(client, table, session_id, start):
+        yield _dynamodb_message(item)
+
+
+def dynamodb_tail(client, table: str, session_id: str, n: int) -> Tuple[List[Dict], int]:
+    """
+    Load only the last `n` messages of a session.
+
+    A single descending range query; the newest sequence number doubles as
+    the total message count, since sequence numbers are contiguous from 1.
+    """
+    items = list(_dynamodb_query(client, table, session_id, ScanIndexForward=False, Limit=n))
+    total = int(items[0]["seq"]["N"]) if items else 0
+    return [_dynamodb_message(item) for item in reversed(items)], total
+
+
+def dynamodb_append(client, table: str, session_id: str, messages: List[Dict],
+                    compression: Optional[str] = None) -> bool:
+    """
+    Append `messages` as new items after the session's newest message.
+
+    All items of a turn are written in one transaction, each conditioned on
+    `attribute_not_exists(seq)`: a sequence number can never be overwritten,
+    and a turn is never interleaved with another writer's. If another writer
+    claims the positions first, the transaction is retried after them
+    (with backoff).
+
+    Returns True if the append had to retry because of another writer.
+    """
+    contended = False
+
+    for attempt in range(APPEND_MAX_ATTEMPTS):
+        seq = dynamodb_last_seq(client, table, session_id)
+
+        try:
+            client.transact_write_items(TransactItems=[
+                {
+                    "Put": {
+                        "TableName": table,
+                        "Item": _dynamodb_item(session_id, seq + i + 1, message, compression),
+                        "ConditionExpression": "attribute_not_exists(seq)",
+                    }
+                }
+                for i, message in enumerate(messages)
+            ])
+            return contended
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            contended = True
+            _retry_backoff(attempt)
+
+    raise ConcurrentWriteError(f"Could not append to session {session_id} after {APPEND_MAX_ATTEMPTS} attempts")
+
+
+def dynamodb_load_summary(client, table: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """Return a session's rolling summary (the item with `seq` 0), or None."""
+    response = client.get_item(
+        TableName=table,
+        Key={"session_id": {"S": session_id}, "seq": {"N": "0"}},
+    )
+    item = response.get("Item")
+    return _dynamodb_message(item) if item else None
+
+
+def dynamodb_save_summary(client, table: str, session_id: str, summary: Dict[str, Any],
+                          compression: Optional[str] = None) -> None:
+    """
+    Replace a session's rolling summary.
+
+    Stored at `seq` 0, which message queries (`seq > start`) never return.
+    """
+    client.put_item(TableName=table, Item=_dynamodb_item(session_id, 0, summary, compression))
+
+
+# ============================================================
+# Backend Interface
+# ============================================================
+
+class MemoryBackend(ABC):
+    """
+    Interface implemented by every conversation storage backend.
+
+    All methods are blocking; `server.py` runs them on its I/O executor.
+    """
+
+    # Short identifier reported by the API
+    name = "base"
+
+    @abstractmethod
+    def load(self, session_id: str) -> List[Dict]:
+        """Return the full history of a session (empty list if unknown)."""
+
+    @abstractmethod
+    def tail(self, session_id: str, n: int) -> Tuple[List[Dict], int]:
+        """Return (last `n` messages, total message count)."""
+
+    @abstractmethod
+    def iter(self, session_id: str, start: int = 0) -> Iterator[Dict]:
+        """Yield messages lazily from position `start`."""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict]) -> bool:
+        """
+        Append the messages of a new turn without losing concurrent turns.
+
+        Returns True if another writer was detected on the session.
+        """
+
+    @abstractmethod
+    def load_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the session's rolling summary, or None if it has none."""
+
+    @abstractmethod
+    def save_summary(self, session_id: str, summary: Dict[str, Any]) -> None:
+        """Replace the session's rolling summary."""
+
+
+class LocalMemoryBackend(MemoryBackend):
+    """JSON Lines logs in a local directory (`MEMORY_DIR`)."""
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def load(self, session_id: str) -> List[Dict]:
+        return local_load(self.directory, session_id)
+
+    def tail(self, session_id: str, n: int) -> Tuple[List[Dict], int]:
+        return local_tail(self.directory, session_id, n)
+
+    def iter(self, session_id: str, start: int = 0) -> Iterator[Dict]:
+        return local_iter(self.directory, session_id, start)
+
+    def append(self, session_id: str, messages: List[Dict]) -> bool:
+        return local_append(self.directory, session_id, messages)
+
+    def load_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return local_load_summary(self.directory, session_id)
+
+    def save_summary(self, session_id: str, summary: Dict[str, Any]) -> None:
+        local_save_summary(self.directory, session_id, summary)
+
+
+class S3MemoryBackend(MemoryBackend):
+    """JSON Lines base logs plus per-turn segment objects in an S3 bucket."""
+
+    name = "S3"
+
+    def __init__(self, client, bucket: str, compact_after: int = 16, compression: Optional[str] = None):
+        check_conditional_writes(client)
+        self.client = client
+        self.bucket = bucket
+        self.compact_after = compact_after
+        self.compression = check_compression(compression)
+
+    def load(self, session_id: str) -> List[Dict]:
+        return s3_load(self.client, self.bucket, session_id)
+
+    def tail(self, session_id: str, n: int) -> Tuple[List[Dict], int]:
+        return s3_tail(self.client, self.bucket, session_id, n)
+
+    def iter(self, session_id: str, start: int = 0) -> Iterator[Dict]:
+        return s3_iter(self.client, self.bucket, session_id, start)
+
+    def append(self, session_id: str, messages: List[Dict]) -> bool:
+        return s3_append(self.client, self.bucket, session_id, messages, self.compact_after, self.compression)
+
+    def load_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return s3_load_summary(self.client, self.bucket, session_id)
+
+    def save_summary(self, session_id: str, summary: Dict[str, Any]) -> None:
+        s3_save_summary(self.client, self.bucket, session_id, summary, self.compression)
+
+
+class DynamoDBMemoryBackend(MemoryBackend):
+    """
+    One DynamoDB item per message.
+
+    The table needs a string partition key `session_id` and a numeric sort
+    key `seq`. Works against AWS, DynamoDB Local (via `endpoint_url` on the
+    client) or the in-memory stand-in in `benchmarks.fakes`.
+    """
+
+    name = "DynamoDB"
+
+    def __init__(self, client, table: str, compression: Optional[str] = None):
+        self.client = client
+        self.table = table
+        self.compression = check_compression(compression)
+
+    def load(self, session_id: str) -> List[Dict]:
+        return list(dynamodb_iter(self.client, self.table, session_id))
+
+    def tail(self, session_id: str, n: int) -> Tuple[List[Dict], int]:
+        return dynamodb_tail(self.client, self.table, session_id, n)
+
+    def iter(self, session_id: str, start: int = 0) -> Iterator[Dict]:
+        return dynamodb_iter(self.client, self.table, session_id, start)
+
+    def append(self, session_id: str, messages: List[Dict]) -> bool:
+        return dynamodb_append(self.client, self.table, session_id, messages, self.compression)
+
+    def load_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return dynamodb_load_summary(self.client, self.table, session_id)
+
+    def save_summary(self, session_id: str, summary: Dict[str, Any]) -> None:
+        dynamodb_save_summary(self.client, self.table, session_id, summary, self.compression)
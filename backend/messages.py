@@ -0,0 +1,117 @@
+"""
+Compact in-memory representation of conversation messages.
+
+Stored and returned messages keep the JSON schema
+
+    {"role": "user" | "assistant", "content": str, "timestamp": ISO 8601 str, "tokens": int}
+
+but inside the chat path (session cache, history windows, Bedrock request
+building, summaries) each message is a `ChatMessage`: a slotted dataclass with
+an integer `Role` and an epoch timestamp. Besides the message text, it
+takes about 90 bytes instead of about 290 for the equivalent dict with its
+ISO timestamp string (`benchmarks/message_memory.py`).
+
+Conversion happens only at the boundaries: `from_records` on what the storage
+backend returns, `to_records` before appending or saving, and `to_dict` when
+messages are sent to API clients.
+
+Timestamps are naive local times, as written by `datetime.now().isoformat()`;
+converting to epoch seconds and back reproduces the same string.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# ============================================================
+# Roles
+# ============================================================
+
+class Role(IntEnum):
+    """Author of a message."""
+    USER = 0
+    ASSISTANT = 1
+
+
+# Wire names, indexed by `Role`
+ROLE_NAMES = ("user", "assistant")
+
+# Wire name -> `Role`
+ROLES = {name: Role(i) for i, name in enumerate(ROLE_NAMES)}
+
+
+# ============================================================
+# Message Type
+# ============================================================
+
+@dataclass(slots=True)
+class ChatMessage:
+    """
+    One conversation message.
+
+    Attributes
+    ----------
+    role : Role
+        Author of the message.
+    content : str
+        Message text.
+    timestamp : float, optional
+        Creation time in epoch seconds (None for legacy messages without one).
+    tokens : int, optional
+        Cached base token estimate (see `server.TokenEstimator`).
+    """
+    role: Role
+    content: str
+    timestamp: Optional[float] = None
+    tokens: Optional[int] = None
+
+    @classmethod
+    def now(cls, role: Role, content: str, tokens: Optional[int] = None) -> "ChatMessage":
+        """Create a message stamped with the current time."""
+        return cls(role, content, time.time(), tokens)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "ChatMessage":
+        """Decode a message from its stored / API dictionary form."""
+        timestamp = record.get("timestamp")
+        return cls(
+            ROLES[record["role"]],
+            record["content"],
+            datetime.fromisoformat(timestamp).timestamp() if timestamp else None,
+            record.get("tokens"),
+        )
+
+    @property
+    def role_name(self) -> str:
+        """Wire name of the role ("user" or "assistant")."""
+        return ROLE_NAMES[self.role]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Encode the message in its stored / API dictionary form."""
+        record: Dict[str, Any] = {"role": ROLE_NAMES[self.role], "content": self.content}
+        if self.timestamp is not None:
+            record["timestamp"] = datetime.fromtimestamp(self.timestamp).isoformat()
+        if self.tokens is not None:
+            record["tokens"] = self.tokens
+        return record
+
+
+# ============================================================
+# Boundary Conversion
+# ============================================================
+
+def from_records(records: Iterable[Dict[str, Any]]) -> List[ChatMessage]:
+    """Decode stored message dictionaries."""
+    return [ChatMessage.from_dict(record) for record in records]
+
+
+def to_records(messages: Iterable[ChatMessage]) -> List[Dict[str, Any]]:
+    """Encode messages as dictionaries for storage or API responses."""
+    return [message.to_dict() for message in messages]
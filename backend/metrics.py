@@ -0,0 +1,358 @@
+"""
+Request metrics for the Digital Twin backend.
+
+Three outputs from the same measurements:
+
+- histograms : Prometheus-style cumulative histograms (and a few counters),
+               rendered in the text exposition format by `render()` for the
+               `/metrics` endpoint
+- percentiles: rolling p50/p95/p99 over the last `METRICS_WINDOW`
+               observations of each request phase, for `/health`
+- log lines  : one JSON object per request (route, status, phase timings,
+               payload sizes, history length, Bedrock usage), printed to
+               stdout so CloudWatch Logs Insights can query it under Lambda
+
+A `Trace` follows one request. Route handlers create it with `start()`,
+time phases with `trace.phase(name)` and finish it with `trace.finish()`.
+Code running deeper in the call stack (including on the I/O executor, which
+`server.run_blocking` runs in the caller's context) adds fields to the
+current trace through `current()`.
+
+Metrics are per process; under Lambda each instance exposes its own.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+# Collect metrics at all (false turns every observation into a no-op)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Print one JSON log line per request (default: on under Lambda)
+METRICS_LOG = os.getenv("METRICS_LOG", "true" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "false").lower() == "true"
+
+# Observations kept per phase for the rolling percentiles on /health
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+MESSAGES_BUCKETS = (0, 2, 5, 10, 20, 40, 80, 160)
+
+
+# ============================================================
+# Instruments
+# ============================================================
+
+def _labels(names: Sequence[str], values: Tuple[str, ...]) -> str:
+    """Render a label set as `{a="x",b="y"}` (empty for no labels)."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with a fixed label set.
+
+    Parameters
+    ----------
+    name : str
+        Metric name (Prometheus conventions, e.g. `twin_request_seconds`).
+    help : str
+        One-line description.
+    buckets : Sequence[float]
+        Bucket upper bounds in increasing order (`+Inf` is added).
+    labelnames : Sequence[str]
+        Label names; `observe` takes their values as keyword arguments.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Add one observation."""
+        if not METRICS_ENABLED:
+            return
+
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        """Exposition-format lines for every label set."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                labels = _labels(self.labelnames + ("le",), key + (f"{bound:g}",))
+                lines.append(f"{self.name}_bucket{labels} {count:g}")
+            labels = _labels(self.labelnames + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {values[-1]:g}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {values[-2]:.6g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {values[-1]:g}")
+
+        return lines
+
+
+class Counter:
+    """Monotonic counter with a fixed label set (see `Histogram` for the parameters)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increase the counter."""
+        if not METRICS_ENABLED:
+            return
+
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        """Exposition-format lines for every label set."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class RollingPercentiles:
+    """Last `METRICS_WINDOW` observations per key, summarised as p50/p95/p99."""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._values: Dict[str, deque] = {}
+
+    def observe(self, key: str, value: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = deque(maxlen=self.window)
+            values.append(value)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{key: {"count", "p50_ms", "p95_ms", "p99_ms"}} for every key."""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._values.items()}
+
+        def pick(ordered: List[float], q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000, 2)
+
+        return {
+            key: {"count": len(ordered), "p50_ms": pick(ordered, 50),
+                  "p95_ms": pick(ordered, 95), "p99_ms": pick(ordered, 99)}
+            for key, ordered in sorted(samples.items()) if ordered
+        }
+
+
+# ============================================================
+# Metric Definitions
+# ============================================================
+
+REQUEST_SECONDS = Histogram("twin_request_seconds", "Request duration by route and status.",
+                            SECONDS_BUCKETS, ("route", "status"))
+PHASE_SECONDS = Histogram("twin_phase_seconds", "Time spent in each phase of a request.",
+                          SECONDS_BUCKETS, ("route", "phase"))
+STORAGE_SECONDS = Histogram("twin_storage_seconds", "Conversation storage call duration by operation.",
+                            SECONDS_BUCKETS, ("op",))
+BEDROCK_SECONDS = Histogram("twin_bedrock_seconds", "Bedrock call duration (including retries) by model.",
+                            SECONDS_BUCKETS, ("model", "op", "outcome"))
+BEDROCK_LATENCY_SECONDS = Histogram("twin_bedrock_reported_latency_seconds",
+                                    "Model latency reported by Bedrock (metrics.latencyMs).",
+                                    SECONDS_BUCKETS, ("model",))
+BEDROCK_TOKENS = Histogram("twin_bedrock_tokens", "Bedrock usage per call by kind of token.",
+                           TOKEN_BUCKETS, ("model", "kind"))
+PAYLOAD_BYTES = Histogram("twin_payload_bytes", "Size of user messages and assistant responses.",
+                          BYTES_BUCKETS, ("route", "kind"))
+HISTORY_MESSAGES = Histogram("twin_history_messages", "Messages of history loaded per turn.",
+                             MESSAGES_BUCKETS, ("route",))
+BEDROCK_TOKENS_TOTAL = Counter("twin_bedrock_tokens_total", "Bedrock tokens used by model and kind.",
+                               ("model", "kind"))
+RESPONSE_CACHE_LOOKUPS = Counter("twin_response_cache_lookups_total",
+                                 "Response cache lookups on cacheable turns by result (hit, miss).", ("result",))
+
+INSTRUMENTS = [
+    REQUEST_SECONDS, PHASE_SECONDS, STORAGE_SECONDS, BEDROCK_SECONDS, BEDROCK_LATENCY_SECONDS,
+    BEDROCK_TOKENS, BEDROCK_TOKENS_TOTAL, PAYLOAD_BYTES, HISTORY_MESSAGES, RESPONSE_CACHE_LOOKUPS,
+]
+
+# Rolling percentiles of request and phase durations, keyed "route phase"
+percentiles = RollingPercentiles()
+
+# Bedrock `usage` fields and the `kind` label they are recorded under
+USAGE_KINDS = {
+    "inputTokens": "input",
+    "outputTokens": "output",
+    "cacheReadInputTokens": "cache_read",
+    "cacheWriteInputTokens": "cache_write",
+}
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for instrument in INSTRUMENTS:
+        lines += instrument.render()
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timer(histogram: Histogram, **labels: Any) -> Iterator[None]:
+    """Observe the duration of the `with` block in `histogram`."""
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - began, **labels)
+
+
+def record_usage(model: str, response: Dict) -> None:
+    """Record the `usage` and `metrics` of a Bedrock response (or stream metadata event)."""
+    usage = response.get("usage") or {}
+    for field, kind in USAGE_KINDS.items():
+        if field in usage:
+            BEDROCK_TOKENS.observe(usage[field], model=model, kind=kind)
+            BEDROCK_TOKENS_TOTAL.inc(usage[field], model=model, kind=kind)
+
+    latency_ms = (response.get("metrics") or {}).get("latencyMs")
+    if latency_ms is not None:
+        BEDROCK_LATENCY_SECONDS.observe(latency_ms / 1000, model=model)
+
+    trace = current()
+    if trace is not None:
+        trace.set(
+            model=model,
+            input_tokens=usage.get("inputTokens"),
+            output_tokens=usage.get("outputTokens"),
+            cache_read_tokens=usage.get("cacheReadInputTokens"),
+            bedrock_latency_ms=latency_ms,
+        )
+
+
+# ============================================================
+# Request Traces
+# ============================================================
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("twin_trace", default=None)
+
+
+class Trace:
+    """
+    Phase timings and fields of one request.
+
+    Create with `start()`; `finish()` records the totals, the rolling
+    percentiles and (with `METRICS_LOG`) prints the log line.
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+        self.finished = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the `with` block as phase `name` (repeated phases add up)."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            PHASE_SECONDS.observe(elapsed, route=self.route, phase=name)
+            percentiles.observe(f"{self.route} {name}", elapsed)
+
+    def set(self, **fields: Any) -> None:
+        """Attach fields to the log line (None values are skipped)."""
+        self.fields.update({k: v for k, v in fields.items() if v is not None})
+
+    def sizes(self, message: str, response: Optional[str], history: int) -> None:
+        """Record payload sizes and the history length of a chat turn."""
+        request_bytes = len(message.encode("utf-8"))
+        PAYLOAD_BYTES.observe(request_bytes, route=self.route, kind="request")
+        HISTORY_MESSAGES.observe(history, route=self.route)
+        self.set(request_bytes=request_bytes, history_messages=history)
+
+        if response is not None:
+            response_bytes = len(response.encode("utf-8"))
+            PAYLOAD_BYTES.observe(response_bytes, route=self.route, kind="response")
+            self.set(response_bytes=response_bytes)
+
+    def finish(self, status: int) -> None:
+        """Record the request total and emit the log line (only the first call counts)."""
+        if self.finished:
+            return
+        self.finished = True
+
+        total = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(total, route=self.route, status=status)
+        percentiles.observe(f"{self.route} total", total)
+
+        if METRICS_LOG:
+            print(json.dumps({
+                "event": "request",
+                "route": self.route,
+                "status": status,
+                "total_ms": round(total * 1000, 2),
+                "phases_ms": {name: round(s * 1000, 2) for name, s in self.phases.items()},
+                **self.fields,
+            }, default=str))
+
+
+def start(route: str) -> Trace:
+    """Begin a trace for the current request and make it the current one."""
+    trace = Trace(route)
+    _current.set(trace)
+    return trace
+
+
+def current() -> Optional[Trace]:
+    """The trace of the request being handled, if any."""
+    return _current.get()
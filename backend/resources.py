@@ -17,16 +17,27 @@ The loaded content is made available as module-level variables:
 - facts    : dict -> structured facts about the persona
 
 These resources can then be combined into prompts or used by downstream logic
-in server.py or other backend components.
+in server.py or other backend components. Call `reload()` to re-read them after
+the files in `data/` change.
+
+Loading is lazy: nothing is read on import, and each variable is loaded on
+first access. If the precomputed persona artifact (`data/persona.json`, built
+by `deploy.py` via `build_artifact()`) is present, values are taken from it,
+which avoids parsing the PDF on a Lambda cold start. A value is only used if
+its source file is missing or unchanged since the artifact was built;
+otherwise the raw source is read. pypdf is imported only when the PDF actually
+has to be parsed.
 """
 
 # ============================================================
 # Imports
 # ============================================================
 
-from pypdf import PdfReader
+import hashlib
 import json
-from typing import Any, Dict
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
 
 
 # ============================================================
@@ -49,6 +60,9 @@ def _load_linkedin_pdf(path: str = "./data/linkedin.pdf") -> str:
         If the file is not found, returns a fallback message.
     """
     try:
+        # Imported here so that cold starts served from the artifact skip it
+        from pypdf import PdfReader
+
         # Create a PdfReader instance for the given file path
         reader: PdfReader = PdfReader(path)
 
@@ -102,18 +116,149 @@ def _load_json_file(path: str) -> Dict[str, Any]:
         return json.load(f)
 
 
+def _file_digest(path: str) -> Optional[str]:
+    """Return the SHA-256 hex digest of a file, or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+# ============================================================
+# Resource Paths
+# ============================================================
+
+LINKEDIN_PATH = "./data/linkedin.pdf"
+SUMMARY_PATH = "./data/summary.txt"
+STYLE_PATH = "./data/style.txt"
+FACTS_PATH = "./data/facts.json"
+
+# Precomputed persona artifact; an empty value disables it
+PERSONA_ARTIFACT_PATH = os.getenv("PERSONA_ARTIFACT_PATH", "./data/persona.json")
+
+# Artifact format marker and version
+ARTIFACT_FORMAT = "twin-persona"
+ARTIFACT_VERSION = 1
+
+
 # ============================================================
-# Resource Loading (Module-Level)
+# Resource Loading (Lazy)
 # ============================================================
 
 # Extracted LinkedIn/CV-style information as plain text
-linkedin: str = _load_linkedin_pdf("./data/linkedin.pdf")
+linkedin: str
 
 # Professional summary describing the persona
-summary: str = _load_text_file("./data/summary.txt")
+summary: str
 
 # Communication style preferences
-style: str = _load_text_file("./data/style.txt")
+style: str
 
 # Structured factual profile (name, location, specialties, education, etc.)
-facts: Dict[str, Any] = _load_json_file("./data/facts.json")
+facts: Dict[str, Any]
+
+# Resource name -> (source path, loader reading the raw source)
+_SOURCES: Dict[str, Tuple[str, Callable[[], Any]]] = {
+    "linkedin": (LINKEDIN_PATH, lambda: _load_linkedin_pdf(LINKEDIN_PATH)),
+    "summary": (SUMMARY_PATH, lambda: _load_text_file(SUMMARY_PATH)),
+    "style": (STYLE_PATH, lambda: _load_text_file(STYLE_PATH)),
+    "facts": (FACTS_PATH, lambda: _load_json_file(FACTS_PATH)),
+}
+
+# Parsed artifact (False until read; None if missing or unusable)
+_artifact: Any = False
+
+# Serialises first loads when prompts are built from worker threads
+_load_lock = threading.Lock()
+
+
+def _read_artifact() -> Optional[Dict[str, Any]]:
+    """Return the parsed persona artifact, reading it at most once."""
+    global _artifact
+
+    if _artifact is False:
+        _artifact = None
+        if PERSONA_ARTIFACT_PATH:
+            try:
+                with open(PERSONA_ARTIFACT_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("format") == ARTIFACT_FORMAT and data.get("version") == ARTIFACT_VERSION:
+                    _artifact = data
+            except (FileNotFoundError, ValueError):
+                pass
+
+    return _artifact
+
+
+def _load(name: str) -> Any:
+    """Load one resource from the artifact if it is current, else from its source."""
+    path, loader = _SOURCES[name]
+    artifact = _read_artifact()
+
+    if artifact is not None and name in artifact["values"]:
+        digest = _file_digest(path)
+        if digest is None or digest == artifact["sources"].get(name):
+            return artifact["values"][name]
+
+    return loader()
+
+
+def __getattr__(name: str) -> Any:
+    """Load a resource on first access and bind it as a module attribute."""
+    if name not in _SOURCES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _load_lock:
+        if name not in globals():
+            globals()[name] = _load(name)
+        return globals()[name]
+
+
+def reload() -> None:
+    """
+    Discard every loaded resource so the next access re-reads it from `data/`.
+
+    Consumers that cache derived values (such as the prompt cache in
+    `context.py`) must be invalidated separately.
+    """
+    global _artifact
+
+    with _load_lock:
+        for name in _SOURCES:
+            globals().pop(name, None)
+        _artifact = False
+
+
+# ============================================================
+# Build-Time Artifact
+# ============================================================
+
+def build_artifact(path: str) -> Dict[str, Any]:
+    """
+    Extract every resource from its raw source and write the persona artifact.
+
+    Each value is stored with the SHA-256 digest of the file it came from, so
+    a stale artifact is ignored for any source that has since changed.
+
+    Parameters
+    ----------
+    path : str
+        Destination of the JSON artifact.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The artifact that was written.
+    """
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "sources": {name: _file_digest(source) for name, (source, _) in _SOURCES.items()},
+        "values": {name: loader() for name, (_, loader) in _SOURCES.items()},
+    }
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+
+    return artifact
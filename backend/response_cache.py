@@ -0,0 +1,215 @@
+"""
+Response cache for repeated visitor questions.
+
+Visitors keep asking the twin the same few opening questions ("what's your
+background?"). For turns with little or no conversation context the answer
+depends only on the question, the persona and the model, so it can be reused
+instead of calling Bedrock again.
+
+Lookups
+-------
+- exact   : the message is normalised (Unicode NFKC, lower-case, punctuation
+            and extra whitespace removed) and looked up directly
+- similar : optionally, if `similarity` > 0, the cached question with the
+            highest character-trigram cosine similarity is used when it
+            reaches the threshold (catches typos and small rewordings).
+            Candidates come from a trigram inverted index, so a lookup never
+            scans every entry
+
+Entries expire after `ttl` seconds and the least recently used are evicted
+beyond `max_entries`. Every entry belongs to a fingerprint of the persona and
+model it was generated with; a lookup or store with a different fingerprint
+clears the whole cache, so editing `data/` or changing `BEDROCK_MODEL_ID`
+never serves stale answers. `server.py` leaves the current date/time out
+of the prompt for cacheable turns, so cached answers do not go stale with
+the clock either.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+
+# ============================================================
+# Normalisation
+# ============================================================
+
+def normalize(text: str) -> str:
+    """Canonical form of a question used as the exact-match key."""
+    text = unicodedata.normalize("NFKC", text).lower().replace("'", "").replace("’", "")
+    return " ".join(re.findall(r"\w+", text))
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a normalised key (padded so short words count)."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ============================================================
+# Response Cache
+# ============================================================
+
+class ResponseCache:
+    """
+    Bounded LRU + TTL cache of assistant responses keyed by normalised question.
+
+    Parameters
+    ----------
+    max_entries : int
+        Most cached responses (0 disables the cache).
+    ttl : float
+        Seconds an entry stays valid (0 means no expiry).
+    similarity : float
+        Trigram cosine threshold for near-duplicate hits (0 disables them).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, similarity: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.fingerprint: Optional[str] = None
+        # key -> (expiry, response)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # trigram -> keys containing it (only maintained for similar lookups)
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        if self.similarity > 0:
+            for gram in trigrams(key):
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def _check_fingerprint(self, fingerprint: str) -> None:
+        """Clear everything if the persona or model changed (caller holds the lock)."""
+        if fingerprint != self.fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._postings.clear()
+            self.fingerprint = fingerprint
+
+    def _live(self, key: str) -> Optional[str]:
+        """Return the response for `key` unless it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl > 0 and entry[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _most_similar(self, key: str) -> Optional[str]:
+        """Return the cached key most similar to `key` above the threshold, if any."""
+        grams = trigrams(key)
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        best, best_score = None, self.similarity
+        for candidate, shared in overlap.items():
+            score = shared / math.sqrt(len(grams) * len(trigrams(candidate)))
+            if score >= best_score:
+                best, best_score = candidate, score
+
+        return best
+
+    def get(self, message: str, fingerprint: str) -> Optional[str]:
+        """Return a cached response for `message`, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        key = normalize(message)
+
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+
+            response = self._live(key)
+            if response is not None:
+                self.exact_hits += 1
+                return response
+
+            if self.similarity > 0:
+                similar = self._most_similar(key)
+                response = self._live(similar) if similar is not None else None
+                if response is not None:
+                    self.similar_hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def put(self, message: str, response: str, fingerprint: str) -> None:
+        """Store the response to `message` and evict beyond `max_entries`."""
+        if not self.enabled:
+            return
+
+        key = normalize(message)
+        if not key:
+            return
+
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+
+            if key in self._entries:
+                self._drop(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            if self.similarity > 0:
+                for gram in trigrams(key):
+                    self._postings.setdefault(gram, set()).add(key)
+            self.stores += 1
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Return counters and current occupancy."""
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "similarity_threshold": self.similarity,
+            }
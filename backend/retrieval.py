@@ -0,0 +1,316 @@
+"""
+Retrieval over the persona resources for the AI Digital Twin.
+
+Instead of pasting every resource into every prompt, the LinkedIn text, the
+professional summary and the structured facts from `resources.py` are split
+into small chunks and indexed with BM25. For each turn `context.py` asks for
+the top-k chunks relevant to the user's message, so short questions carry only
+a few hundred tokens of background.
+
+Chunks
+------
+- linkedin : consecutive lines packed into chunks of about `CHUNK_WORDS` words
+             (bullets and headings are never split)
+- summary  : paragraphs, packed the same way
+- facts    : one chunk for all scalar fields (name, role, location, ...) and
+             one per list/object field (education, specialties, ...)
+
+Persistence
+-----------
+The index is built once and cached in-process. `deploy.py` also writes it to
+`data/retrieval.json` (via `build_artifact()`); at runtime that file is used
+when its recorded source digest matches the current resources, and the index
+is rebuilt from `resources.py` otherwise (a few milliseconds). Call
+`invalidate()` after the resources change.
+
+The implementation is pure Python: the corpus is a few dozen chunks, so no
+vector library or embedding model is needed.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import resources
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+# Persisted index built by `deploy.py`; an empty value disables it
+RETRIEVAL_INDEX_PATH = os.getenv("RETRIEVAL_INDEX_PATH", "./data/retrieval.json")
+
+# Artifact format marker and version
+INDEX_FORMAT = "twin-retrieval"
+INDEX_VERSION = 1
+
+# Target chunk size in words
+CHUNK_WORDS = 80
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words too common to help ranking
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could did do does for from had has have he her his how i
+if in into is it its me my of on or our she so than that the their them then there these they
+this to was we were what when where which who why will with would you your
+""".split())
+
+# Query terms expanded with the vocabulary the persona data actually uses
+QUERY_SYNONYMS = {
+    "study": "education degree university msc bsc",
+    "school": "education degree university",
+    "qualification": "education degree",
+    "job": "experience role",
+    "work": "experience role",
+    "career": "experience role",
+    "skill": "specialties expertise",
+    "hobby": "interests",
+    "contact": "email linkedin",
+    "live": "location",
+    "based": "location",
+}
+
+
+# ============================================================
+# Chunking
+# ============================================================
+
+def _stem(term: str) -> str:
+    """
+    Reduce a term to a crude stem so inflected forms match.
+
+    "studies"/"studied"/"studying"/"study", "uses"/"used"/"using"/"use" and
+    "projects"/"project" each map to one stem: "ies"/"ied" become "y",
+    "ing"/"ed" are stripped when a vowel is left, then a plural "s" and a
+    final silent "e" are dropped.
+    """
+    if len(term) > 4 and term.endswith(("ies", "ied")):
+        return term[:-3] + "y"
+
+    for suffix in ("ing", "ed"):
+        if term.endswith(suffix) and not term.endswith("eed"):
+            stem = term[:-len(suffix)]
+            if len(stem) >= 2 and re.search(r"[aeiouy]", stem):
+                term = stem
+            break
+    else:
+        if term.endswith("s") and not term.endswith("ss") and len(term) > 3:
+            term = term[:-1]
+
+    if term.endswith("e") and not term.endswith("ee") and len(term) > 2:
+        term = term[:-1]
+    return term
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case, stemmed alphanumeric terms, without stopwords and single characters."""
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+# `QUERY_SYNONYMS` keyed by stem, as `expand_query` sees the query terms
+_SYNONYMS = {_stem(term): expansion for term, expansion in QUERY_SYNONYMS.items()}
+
+
+def expand_query(query: str) -> List[str]:
+    """Tokenize a query and add the synonyms of its terms."""
+    terms = tokenize(query)
+    for term in list(terms):
+        if term in _SYNONYMS:
+            terms += tokenize(_SYNONYMS[term])
+    return terms
+
+
+def _pack(units: List[str], max_words: int = CHUNK_WORDS) -> List[str]:
+    """Greedily pack text units (lines or paragraphs) into chunks of about `max_words` words."""
+    chunks: List[str] = []
+    current: List[str] = []
+    words = 0
+
+    for unit in units:
+        n = len(unit.split())
+        if current and words + n > max_words:
+            chunks.append("\n".join(current))
+            current, words = [], 0
+        current.append(unit)
+        words += n
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
+
+
+def chunk_resources(linkedin: str, summary: str, facts: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Split the persona resources into retrievable chunks.
+
+    Returns
+    -------
+    List[Dict[str, str]]
+        Chunks as {"source": ..., "text": ...}, in document order.
+    """
+    chunks = []
+
+    scalars = {k: v for k, v in facts.items() if not isinstance(v, (list, dict))}
+    if scalars:
+        chunks.append({"source": "facts", "text": json.dumps(scalars, ensure_ascii=False)})
+    for key, value in facts.items():
+        if isinstance(value, (list, dict)):
+            chunks.append({"source": "facts", "text": f"{key}: {json.dumps(value, ensure_ascii=False)}"})
+
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", summary) if p.strip()]
+    chunks += [{"source": "summary", "text": text} for text in _pack(paragraphs)]
+
+    lines = [line.strip() for line in linkedin.splitlines() if line.strip()]
+    chunks += [{"source": "linkedin", "text": text} for text in _pack(lines)]
+
+    return chunks
+
+
+# ============================================================
+# BM25 Index
+# ============================================================
+
+class BM25Index:
+    """
+    Okapi BM25 over a small list of chunks.
+
+    Term frequencies per chunk, document frequencies and the average chunk
+    length are precomputed, so a search is one pass over the query terms'
+    postings.
+    """
+
+    def __init__(self, chunks: List[Dict[str, str]]):
+        self.chunks = chunks
+        self.lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+
+        for i, chunk in enumerate(chunks):
+            terms = tokenize(chunk["text"])
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, {})[i] = tf
+
+        n = len(chunks)
+        self.avg_length = sum(self.lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """BM25 score of every chunk that shares at least one term with the query."""
+        scores: Dict[int, float] = {}
+
+        for term in set(expand_query(query)):
+            for i, tf in self.postings.get(term, {}).items():
+                norm = 1 - BM25_B + BM25_B * self.lengths[i] / (self.avg_length or 1)
+                scores[i] = scores.get(i, 0.0) + self.idf[term] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        return scores
+
+    def search(self, query: str, k: int) -> List[Dict[str, str]]:
+        """
+        Return the `k` best chunks for `query`, in document order.
+
+        When nothing matches (greetings, small talk) the summary chunks are
+        returned instead, so the model still has a general overview.
+        """
+        scores = self.scores(query)
+        if not scores:
+            return [c for c in self.chunks if c["source"] == "summary"][:k]
+
+        best = sorted(scores, key=lambda i: -scores[i])[:k]
+        return [self.chunks[i] for i in sorted(best)]
+
+    def to_dict(self, digest: str) -> Dict[str, Any]:
+        """Serialisable form of the index (the chunks; statistics are rebuilt on load)."""
+        return {"format": INDEX_FORMAT, "version": INDEX_VERSION, "digest": digest, "chunks": self.chunks}
+
+
+# ============================================================
+# Index Lifecycle
+# ============================================================
+
+# Index in use (None until first search)
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def _source_digest() -> str:
+    """Digest of the resources the index is built from."""
+    payload = json.dumps([resources.linkedin, resources.summary, resources.facts], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_index() -> BM25Index:
+    """Chunk the current resources and index them."""
+    return BM25Index(chunk_resources(resources.linkedin, resources.summary, resources.facts))
+
+
+def _load_index() -> BM25Index:
+    """Use the persisted chunks if they match the current resources, else rebuild."""
+    if RETRIEVAL_INDEX_PATH:
+        try:
+            with open(RETRIEVAL_INDEX_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("format") == INDEX_FORMAT and data.get("version") == INDEX_VERSION
+                    and data.get("digest") == _source_digest()):
+                return BM25Index(data["chunks"])
+        except (FileNotFoundError, ValueError):
+            pass
+
+    return build_index()
+
+
+def get_index() -> BM25Index:
+    """Return the retrieval index, loading or building it on first use."""
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            _index = _load_index()
+        return _index
+
+
+def search(query: str, k: int) -> List[Dict[str, str]]:
+    """Return the top-`k` persona chunks for `query` (see `BM25Index.search`)."""
+    return get_index().search(query, k)
+
+
+def invalidate() -> None:
+    """Drop the in-process index so the next search reloads or rebuilds it."""
+    global _index
+
+    with _index_lock:
+        _index = None
+
+
+def build_artifact(path: str) -> Dict[str, Any]:
+    """
+    Build the index from the current resources and write it to `path`.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The artifact that was written.
+    """
+    artifact = build_index().to_dict(_source_digest())
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+
+    return artifact
@@ -0,0 +1,376 @@
+"""
+Model routing, fallback and hedging for Bedrock calls.
+
+`server.py` builds each request for `BEDROCK_MODEL_ID` (the primary model);
+`Router.call` then decides which model actually serves it:
+
+- small model : if `BEDROCK_SMALL_MODEL_ID` is set, short, simple questions
+                (estimated input at most `ROUTE_SMALL_MAX_TOKENS`, message at
+                most `ROUTE_SMALL_MAX_WORDS` words and none of the
+                `COMPLEX_HINTS`) go to it instead of the primary
+- fallback    : if `BEDROCK_FALLBACK_MODEL_ID` is set, a call that fails with
+                a throttling/availability error (after the retries in
+                `throttling.py`), is shed by the limiter, or times out is
+                repeated on the fallback model
+- hedging     : with `ROUTE_HEDGE_AFTER` set, a call still running after
+                that many seconds ("auto": the model's rolling p95 latency)
+                is duplicated on the fallback model and the first success
+                wins. The slower call cannot be cancelled and still counts
+                against the quota, so hedging trades spend for tail latency
+- health      : every call's latency and outcome is recorded per model. A
+                model with `ROUTE_FAILURE_THRESHOLD` consecutive failures,
+                or a rolling error rate above `ROUTE_MAX_ERROR_RATE`, is
+                skipped in favour of the fallback for `ROUTE_COOLDOWN`
+                seconds
+
+The models in use must accept the same request; with `BEDROCK_PROMPT_CACHE`
+on, pick models that support `cachePoint` blocks. `Router.table()` is
+reported by `/` and `/health`.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+import throttling
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+# Cheaper model for short, simple questions (empty disables size routing)
+BEDROCK_SMALL_MODEL_ID = os.getenv("BEDROCK_SMALL_MODEL_ID", "")
+
+# Secondary model for failed, shed or slow calls (empty disables fallback and hedging)
+BEDROCK_FALLBACK_MODEL_ID = os.getenv("BEDROCK_FALLBACK_MODEL_ID", "")
+
+# Largest estimated request (tokens) and message (words) routed to the small model
+ROUTE_SMALL_MAX_TOKENS = int(os.getenv("ROUTE_SMALL_MAX_TOKENS", "2500"))
+ROUTE_SMALL_MAX_WORDS = int(os.getenv("ROUTE_SMALL_MAX_WORDS", "25"))
+
+# Seconds before a slow call is hedged on the fallback model: a number,
+# "auto" for the model's rolling p95 latency, or empty to disable hedging
+ROUTE_HEDGE_AFTER = os.getenv("ROUTE_HEDGE_AFTER", "")
+
+# Successful calls a model needs before "auto" hedging uses its p95
+ROUTE_HEDGE_MIN_SAMPLES = int(os.getenv("ROUTE_HEDGE_MIN_SAMPLES", "20"))
+
+# A model is skipped for ROUTE_COOLDOWN seconds after this many consecutive
+# failures, or while its error rate over the stats window exceeds the maximum
+ROUTE_FAILURE_THRESHOLD = int(os.getenv("ROUTE_FAILURE_THRESHOLD", "3"))
+ROUTE_MAX_ERROR_RATE = float(os.getenv("ROUTE_MAX_ERROR_RATE", "0.5"))
+ROUTE_COOLDOWN = float(os.getenv("ROUTE_COOLDOWN", "30"))
+
+# Calls kept per model for latency percentiles and error rates
+STATS_WINDOW = 200
+
+# Error rates need at least this many calls in the window to count
+MIN_ERROR_SAMPLES = 10
+
+# Words suggesting a question that deserves the primary model
+COMPLEX_HINTS = frozenset("""
+explain why how compare comparison difference design architecture tradeoff tradeoffs detail detailed
+walk through implement code algorithm analyse analyze evaluate pros cons strategy
+""".split())
+
+
+# ============================================================
+# Per-Model Statistics
+# ============================================================
+
+class ModelStats:
+    """
+    Rolling latency and outcome statistics for one model.
+
+    Keeps the last `STATS_WINDOW` calls; `healthy()` turns false after
+    repeated failures and recovers once `ROUTE_COOLDOWN` has passed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: deque = deque(maxlen=STATS_WINDOW)
+        self.outcomes: deque = deque(maxlen=STATS_WINDOW)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Record one finished call."""
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                return
+
+            self.errors += 1
+            self.consecutive_failures += 1
+            if (self.consecutive_failures >= ROUTE_FAILURE_THRESHOLD
+                    or self._error_rate() > ROUTE_MAX_ERROR_RATE):
+                self.unhealthy_until = time.monotonic() + ROUTE_COOLDOWN
+
+    def _error_rate(self) -> float:
+        if len(self.outcomes) < MIN_ERROR_SAMPLES:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile (seconds) of recent successful calls, or None without samples."""
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+            return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self.latencies)
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def snapshot(self) -> Dict:
+        """Counters, error rate and latency percentiles in milliseconds."""
+        p50, p95 = self.percentile(50), self.percentile(95)
+        with self._lock:
+            return {
+                "healthy": self.healthy(),
+                "calls": self.calls,
+                "errors": self.errors,
+                "error_rate": round(self._error_rate(), 3),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+
+# ============================================================
+# Router
+# ============================================================
+
+def is_simple(message: str) -> bool:
+    """Heuristic classifier: short messages without analysis or design keywords."""
+    words = re.findall(r"[a-z']+", message.lower())
+    return len(words) <= ROUTE_SMALL_MAX_WORDS and not COMPLEX_HINTS.intersection(words)
+
+
+def should_fail_over(error: Exception) -> bool:
+    """Whether a failed call may be repeated on another model."""
+    if isinstance(error, throttling.Overloaded):
+        return True
+    if isinstance(error, ClientError):
+        return throttling.error_code(error) in throttling.RETRYABLE_ERRORS
+    return isinstance(error, BotoCoreError)
+
+
+class Router:
+    """
+    Choose a model per request and fall back or hedge on the secondary one.
+
+    Parameters
+    ----------
+    small : str
+        Model for short, simple requests ("" disables it).
+    fallback : str
+        Model for failed, shed or slow requests ("" disables it).
+    hedge_after : str
+        Hedge delay in seconds, "auto" or "" (see `ROUTE_HEDGE_AFTER`).
+    """
+
+    def __init__(self, small: str = BEDROCK_SMALL_MODEL_ID, fallback: str = BEDROCK_FALLBACK_MODEL_ID,
+                 hedge_after: str = ROUTE_HEDGE_AFTER):
+        self.small = small
+        self.fallback = fallback
+        self.hedge_after = hedge_after.strip().lower()
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def stats(self, model_id: str) -> ModelStats:
+        """Return the statistics of a model, creating them on first use."""
+        with self._lock:
+            stats = self._stats.get(model_id)
+            if stats is None:
+                stats = self._stats[model_id] = ModelStats()
+            return stats
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def route(self, kwargs: Dict, estimate: int) -> Tuple[str, Optional[str]]:
+        """
+        Return the (first, second) models for a request built for `kwargs["modelId"]`.
+
+        The second model is the one to fall back or hedge on, if any.
+        """
+        primary = kwargs["modelId"]
+        message = kwargs["messages"][-1]["content"][-1].get("text", "")
+
+        first = primary
+        if (self.small and self.stats(self.small).healthy()
+                and estimate <= ROUTE_SMALL_MAX_TOKENS and is_simple(message)):
+            first = self.small
+
+        second = self.fallback if self.fallback and self.fallback != first else None
+        if second is None and first != primary:
+            second = primary
+
+        # Skip a model that is failing, if there is somewhere else to go
+        if second is not None and not self.stats(first).healthy() and self.stats(second).healthy():
+            first, second = second, first
+
+        return first, second
+
+    def hedge_delay(self, model_id: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to `model_id`, or None for no hedging."""
+        if not self.hedge_after:
+            return None
+        if self.hedge_after == "auto":
+            stats = self.stats(model_id)
+            if stats.samples() < ROUTE_HEDGE_MIN_SAMPLES:
+                return None
+            return stats.percentile(95)
+        return float(self.hedge_after)
+
+    def _timed(self, send: Callable[[Dict], Any], kwargs: Dict) -> Any:
+        """
+        Send one request and record its latency and outcome.
+
+        Only model-side failures count against the model's health: errors
+        caused by the request itself (validation, access) and calls shed by
+        the local limiter (`throttling.Overloaded`) are re-raised unrecorded.
+        """
+        stats = self.stats(kwargs["modelId"])
+        began = time.perf_counter()
+        try:
+            result = send(kwargs)
+        except Exception as e:
+            if should_fail_over(e) and not isinstance(e, throttling.Overloaded):
+                stats.record(time.perf_counter() - began, False)
+            raise
+        stats.record(time.perf_counter() - began, True)
+        return result
+
+    def _submit(self, send: Callable[[Dict], Any], kwargs: Dict) -> Future:
+        # Hedged calls run on their own pool: the caller is usually already on
+        # the I/O executor, and waiting on that pool from inside it could deadlock
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="twin-hedge")
+            executor = self._executor
+        return executor.submit(self._timed, send, kwargs)
+
+    def call(self, kwargs: Dict, estimate: int, send: Callable[[Dict], Any],
+             hedge: bool = True) -> Tuple[Any, str]:
+        """
+        Send a request through the routing policy.
+
+        Parameters
+        ----------
+        kwargs : Dict
+            The `converse` / `converse_stream` arguments, built for the primary model.
+        estimate : int
+            Estimated input tokens of the request.
+        send : Callable[[Dict], Any]
+            Performs one call with the given arguments (including `modelId`).
+        hedge : bool, optional
+            Allow hedging (False for streams, which are only failed over).
+
+        Returns
+        -------
+        Tuple[Any, str]
+            The response and the model that produced it.
+        """
+        first, second = self.route(kwargs, estimate)
+        with self._lock:
+            self.routed[first] = self.routed.get(first, 0) + 1
+
+        delay = self.hedge_delay(first) if hedge and second else None
+        if delay is None:
+            try:
+                return self._timed(send, {**kwargs, "modelId": first}), first
+            except Exception as e:
+                if second is None or not should_fail_over(e):
+                    raise
+            self._bump("fallbacks")
+            return self._timed(send, {**kwargs, "modelId": second}), second
+
+        return self._hedged(kwargs, send, first, second, delay)
+
+    def _hedged(self, kwargs: Dict, send: Callable[[Dict], Any], first: str, second: str,
+                delay: float) -> Tuple[Any, str]:
+        """Run `first`, adding `second` after `delay` seconds or on a fail-over error."""
+        futures = {self._submit(send, {**kwargs, "modelId": first}): first}
+        pending = set(futures)
+        hedge_at = time.monotonic() + delay
+        error: Optional[Exception] = None
+        hedged = False
+
+        while pending:
+            launched = len(futures) > 1
+            timeout = None if launched else max(0.0, hedge_at - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if not should_fail_over(e):
+                        raise
+                    error = e
+                    continue
+                if hedged and futures[future] == second:
+                    self._bump("hedge_wins")
+                return result, futures[future]
+
+            if not launched:
+                # Still slow (hedge) or already failed (fallback)
+                hedged = bool(pending)
+                self._bump("hedges" if hedged else "fallbacks")
+                future = self._submit(send, {**kwargs, "modelId": second})
+                futures[future] = second
+                pending.add(future)
+
+        raise error
+
+    def models(self) -> List[str]:
+        """Configured secondary models (for cache fingerprints)."""
+        return [self.small, self.fallback]
+
+    def table(self, primary: str) -> Dict:
+        """The routing table and per-model statistics, for `/` and `/health`."""
+        with self._lock:
+            counters = {
+                "routed": dict(self.routed),
+                "fallbacks": self.fallbacks,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+            models = list(self._stats)
+
+        return {
+            "primary": primary,
+            "small": self.small or None,
+            "small_max_tokens": ROUTE_SMALL_MAX_TOKENS if self.small else None,
+            "fallback": self.fallback or None,
+            "hedge_after": self.hedge_after or None,
+            **counters,
+            "models": {model: self.stats(model).snapshot() for model in models},
+        }
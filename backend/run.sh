@@ -0,0 +1,9 @@
+#!/bin/sh
+# Entry point of the streaming Lambda function (terraform: aws_lambda_function.stream).
+# Lambda Web Adapter starts this script, waits for uvicorn on $PORT and relays
+# each Function URL request to it with response streaming, so /chat/stream
+# Server-Sent Events reach the client as they are generated.
+# Dependencies live in /var/task, or /opt/python when built with `deploy.py --layer`.
+PATH="$PATH:$LAMBDA_TASK_ROOT/bin" \
+PYTHONPATH="$PYTHONPATH:/opt/python:$LAMBDA_RUNTIME_DIR" \
+exec python -m uvicorn server:app --host 127.0.0.1 --port "${PORT:-8080}"
@@ -7,15 +7,26 @@ It enables:
 1. Health checks
 2. Basic service metadata
 3. Chat interactions using AWS Bedrock models
-4. Persistent conversation memory (local or S3)
+4. Streaming chat over Server-Sent Events (Bedrock `converse_stream`)
+5. Persistent conversation memory (local, S3 or DynamoDB)
+6. Non-blocking request handling (blocking I/O runs in a bounded thread pool)
 
 Key Features
 ------------
 - Bedrock runtime integration using boto3
 - CORS support for the frontend
 - Session-based conversation history
-- Pluggable memory storage (local JSON or S3)
-- System prompt injection from `context.prompt()`
+- Token-budgeted history window, with per-message estimates calibrated from Bedrock usage
+- Pluggable memory backends (local, S3 or DynamoDB) behind `memory.MemoryBackend`
+- Write-through in-process session cache (LRU + TTL) in front of storage
+- System prompt injection from `context.prompt()`, with only the persona background relevant to each message
+- Optional Bedrock prompt caching of the persona and history prefix
+- Rolling summary of messages older than the history window, updated in the background
+- Per-request model routing (small model for simple questions) with fallback and hedging (`routing.py`)
+- Per-model Bedrock rate limiting, load shedding and retries with jittered backoff (`throttling.py`)
+- Identical concurrent Bedrock calls coalesced into one (single-flight)
+- Phase timings, payload sizes and Bedrock usage as Prometheus histograms on `/metrics`, JSON log lines and p50/p95/p99 on `/health`
+- Response cache for first-turn questions (exact and near-duplicate), invalidated on persona/model change
 
 Each conversation session is tracked by a session_id and stored as structured JSON.
 """
@@ -25,8 +36,11 @@ Each conversation session is tracked by a session_id and stored as structured JS
 # ============================================================
 
 # FastAPI core
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 # Pydantic models
 from pydantic import BaseModel
@@ -36,17 +50,44 @@ from dotenv import load_dotenv
 import os
 
 # Typing + utilities
-from typing import Optional, List, Dict
-import json
+from typing import Optional, List, Dict, Iterator, Callable, Any, Tuple, Awaitable
+import hashlib
+import math
 import uuid
 from datetime import datetime
 
-# AWS / Bedrock
-import boto3
+# Concurrency
+import asyncio
+import contextvars
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# AWS / Bedrock (boto3 itself is imported when the first client is created)
 from botocore.exceptions import ClientError
 
 # System prompt
-from context import prompt
+from context import persona_digest, prompt, prompt_blocks
+
+# Response cache for repeated questions
+from response_cache import ResponseCache
+
+# JSON encoding (orjson when installed)
+import codec
+
+# Conversation storage backends and the in-memory message type
+import memory
+from messages import ChatMessage, Role, from_records, to_records
+
+# Request metrics (/metrics, structured logs)
+import metrics
+
+# Bedrock rate limiting and retries, and model routing
+import routing
+import throttling
 
 
 # ============================================================
@@ -61,8 +102,15 @@ load_dotenv()
 # FastAPI Application
 # ============================================================
 
-# Create app instance
-app = FastAPI()
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered with `codec` (orjson when installed)."""
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumpb(content)
+
+
+# Create app instance (every JSON route, /chat included, renders with the codec)
+app = FastAPI(default_response_class=CodecJSONResponse)
 
 
 # ============================================================
@@ -82,19 +130,134 @@ app.add_middleware(
 )
 
 
+# ============================================================
+# Response Compression
+# ============================================================
+
+# Smallest response body (bytes) sent gzip-compressed to clients that accept it (0 disables)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+# gzip level for compressed responses (1 fastest ... 9 smallest)
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "6"))
+
+# Compresses /conversation pages (including NDJSON streams) and /chat
+# responses above the threshold; Server-Sent Events (/chat/stream) are
+# excluded by the middleware so tokens are not held back
+if RESPONSE_COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+        compresslevel=RESPONSE_COMPRESSION_LEVEL,
+    )
+
+
 # ============================================================
 # AWS Bedrock Client
 # ============================================================
 
-# Initialise Bedrock runtime client
-bedrock_client = boto3.client(
-    service_name="bedrock-runtime",
-    region_name=os.getenv("DEFAULT_AWS_REGION", "us-east-1")
-)
+# Bedrock runtime client, created on first use by `get_bedrock_client()` so
+# that importing this module (a Lambda cold start) does not pay for boto3
+bedrock_client: Optional[Any] = None
+
+# Guards lazy creation of the AWS clients
+_client_lock = threading.Lock()
+
+
+def get_bedrock_client() -> Any:
+    """Return the Bedrock runtime client, creating it on first use."""
+    global bedrock_client
+
+    with _client_lock:
+        if bedrock_client is None:
+            import boto3
+            from botocore.config import Config
+
+            # Single attempt per call: `throttling.py` owns retries and
+            # backoff, and must see each throttle to adapt the rate
+            bedrock_client = boto3.client(
+                service_name="bedrock-runtime",
+                region_name=os.getenv("DEFAULT_AWS_REGION", "us-east-1"),
+                config=Config(retries={"total_max_attempts": 1, "mode": "standard"}),
+            )
+        return bedrock_client
 
 # Select Bedrock model
 BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "amazon.nova-lite-v1:0")
 
+# Inference parameters shared by `converse` and `converse_stream`
+INFERENCE_CONFIG = {
+    "maxTokens": 2000,
+    "temperature": 0.7,
+    "topP": 0.9
+}
+
+# Chooses the model per request and falls back or hedges on a secondary
+# one (`BEDROCK_MODEL_ID` is the primary; see `routing.py`)
+router = routing.Router()
+
+# Share one in-flight `converse` call between concurrent requests with an
+# identical model input (same prompt, history and message)
+BEDROCK_COALESCE = os.getenv("BEDROCK_COALESCE", "true").lower() == "true"
+
+
+# ============================================================
+# Prompt Caching Configuration
+# ============================================================
+
+# Send the persona via the Converse `system` field with cache checkpoints
+BEDROCK_PROMPT_CACHE = os.getenv("BEDROCK_PROMPT_CACHE", "false").lower() == "true"
+
+# Maximum number of history messages sent to Bedrock (and read from storage)
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "40"))
+
+# Estimated tokens of history sent per call, filled newest to oldest
+# (0 disables the budget and keeps only the message limit)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+
+# With prompt caching on, the window start only advances in steps of this many
+# messages, so consecutive turns share the same history prefix
+HISTORY_WINDOW_STEP = int(os.getenv("HISTORY_WINDOW_STEP", "10"))
+
+# Marker placed after each cacheable prefix
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+# ============================================================
+# Conversation Summarization Configuration
+# ============================================================
+
+# Fold messages that leave the history window into a rolling summary
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+
+# Update the summary once this many evicted messages are not yet in it
+SUMMARY_MIN_BATCH = int(os.getenv("SUMMARY_MIN_BATCH", "6"))
+
+# Most messages folded into the summary by one update (long backlogs catch up
+# over several turns)
+SUMMARY_MAX_BATCH = int(os.getenv("SUMMARY_MAX_BATCH", "40"))
+
+# Model and output limit used for summary updates
+SUMMARY_MODEL_ID = os.getenv("SUMMARY_MODEL_ID", BEDROCK_MODEL_ID)
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+
+
+# ============================================================
+# Response Cache Configuration
+# ============================================================
+
+# Cached responses kept in-process (0 disables the response cache)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Seconds a cached response stays valid (0 means until evicted)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# Trigram cosine similarity for near-duplicate hits (0 allows exact matches only)
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+
+# Turns are cacheable only when the session has at most this many stored
+# messages and no summary (0 means first turns only)
+RESPONSE_CACHE_MAX_HISTORY = int(os.getenv("RESPONSE_CACHE_MAX_HISTORY", "0"))
+
 
 # ============================================================
 # Memory Storage Configuration
@@ -103,15 +266,392 @@ BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "amazon.nova-lite-v1:0")
 # Toggle local vs S3 storage
 USE_S3 = os.getenv("USE_S3", "false").lower() == "true"
 
+# Storage backend: "local", "s3" or "dynamodb" (defaults follow USE_S3)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "s3" if USE_S3 else "local").lower()
+
 # S3 bucket name
 S3_BUCKET = os.getenv("S3_BUCKET", "")
 
 # Local directory path
 MEMORY_DIR = os.getenv("MEMORY_DIR", "../memory")
 
-# Create S3 client only if needed
-if USE_S3:
-    s3_client = boto3.client("s3")
+# Fold S3 per-turn segments into the base log once this many are pending
+MEMORY_COMPACT_SEGMENTS = int(os.getenv("MEMORY_COMPACT_SEGMENTS", "16"))
+
+# Compression of conversations stored on S3 / DynamoDB ("gzip", "zstd" or "none")
+MEMORY_COMPRESSION = os.getenv("MEMORY_COMPRESSION", "gzip").lower()
+
+# Number of in-process locks that serialize appends to the same session
+SESSION_LOCK_STRIPES = 64
+
+# Largest page size accepted by `/conversation/{session_id}`
+CONVERSATION_PAGE_MAX = int(os.getenv("CONVERSATION_PAGE_MAX", "500"))
+
+# DynamoDB table (partition key `session_id`, sort key `seq`) and an
+# optional endpoint override for DynamoDB Local
+DYNAMODB_TABLE = os.getenv("DYNAMODB_TABLE", "")
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+# In-process session cache limits (0 sessions disables the cache)
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "256"))
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+
+
+# ============================================================
+# Blocking I/O Executor
+# ============================================================
+
+# boto3 and file I/O are synchronous. Running them directly inside the async
+# route handlers would stall every other request on the same worker, so they
+# are dispatched to a bounded thread pool instead.
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "16"))
+
+io_executor = ThreadPoolExecutor(
+    max_workers=IO_MAX_WORKERS,
+    thread_name_prefix="twin-io"
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a blocking callable on the I/O executor and await its result.
+
+    The callable runs in a copy of the caller's context, so it sees the
+    request's `metrics.current()` trace.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(io_executor, functools.partial(context.run, func, *args))
+
+
+# ============================================================
+# Request Coalescing
+# ============================================================
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it is in flight await the same task and receive the same result
+    (or exception). The key is forgotten as soon as the call completes, so
+    nothing is cached. The task is shielded, so a caller that disconnects
+    does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `func()`, or the call already in flight for `key`."""
+        task = self._calls.get(key)
+
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            trace = metrics.current()
+            if trace is not None:
+                trace.set(coalesced=True)
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        """Return call counters and the number of calls in flight."""
+        calls = self.leaders + self.coalesced
+        return {
+            "enabled": BEDROCK_COALESCE,
+            "in_flight": len(self._calls),
+            "calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / calls if calls else 0.0,
+        }
+
+
+bedrock_flights = SingleFlight()
+
+
+# ============================================================
+# Prompt Cache Statistics
+# ============================================================
+
+class PromptCacheStats:
+    """
+    Running totals of Bedrock prompt-cache usage.
+
+    Fed from the `usage` block of every `converse` response and every
+    `converse_stream` metadata event.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+
+    def record(self, usage: Dict) -> None:
+        """Add one response's `usage` block to the totals."""
+        cache_read = usage.get("cacheReadInputTokens", 0)
+        with self._lock:
+            self.requests += 1
+            self.hits += 1 if cache_read else 0
+            self.input_tokens += usage.get("inputTokens", 0)
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += usage.get("cacheWriteInputTokens", 0)
+
+    def snapshot(self) -> Dict:
+        """Return the totals plus derived hit rates."""
+        with self._lock:
+            total_input = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+            return {
+                "enabled": BEDROCK_PROMPT_CACHE,
+                "requests": self.requests,
+                "hit_rate": self.hits / self.requests if self.requests else 0.0,
+                "input_tokens": self.input_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "token_hit_rate": self.cache_read_tokens / total_input if total_input else 0.0,
+                "saved_input_tokens": self.cache_read_tokens,
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+# ============================================================
+# Token Estimation
+# ============================================================
+
+class TokenEstimator:
+    """
+    Cheap input-token estimates, calibrated against Bedrock's own counts.
+
+    The base estimate is characters / 4 plus a small per-message overhead.
+    It is computed once per message and cached on the message itself
+    (`message.tokens`, which is also persisted), so building a window
+    never re-measures old history. A single multiplicative `scale` corrects
+    the base estimate for the model's tokenizer: after every call the total
+    base estimate of the request is compared with the `usage` reported by
+    Bedrock and `scale` moves towards the observed ratio (exponential moving
+    average).
+    """
+
+    CHARS_PER_TOKEN = 4
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, smoothing: float = 0.2):
+        self._lock = threading.Lock()
+        self.smoothing = smoothing
+        self.scale = 1.0
+        self.calibrations = 0
+
+    def base(self, text: str) -> int:
+        """Uncalibrated estimate for one message with this text."""
+        return -(-len(text) // self.CHARS_PER_TOKEN) + self.MESSAGE_OVERHEAD
+
+    def message_tokens(self, message: ChatMessage) -> float:
+        """Calibrated estimate for a stored message, caching the base estimate on it."""
+        tokens = message.tokens
+        if tokens is None:
+            tokens = message.tokens = self.base(message.content)
+        return tokens * self.scale
+
+    def request_tokens(self, kwargs: Dict) -> int:
+        """Uncalibrated estimate for a whole Converse request (system + messages)."""
+        blocks = list(kwargs.get("system", []))
+        for message in kwargs["messages"]:
+            blocks.extend(message["content"])
+        chars = sum(len(block["text"]) for block in blocks if "text" in block)
+        return -(-chars // self.CHARS_PER_TOKEN) + self.MESSAGE_OVERHEAD * len(kwargs["messages"])
+
+    def calibrate(self, estimated: int, usage: Dict) -> None:
+        """Move `scale` towards the ratio of actual to estimated input tokens."""
+        actual = (usage.get("inputTokens", 0) + usage.get("cacheReadInputTokens", 0)
+                  + usage.get("cacheWriteInputTokens", 0))
+        if not estimated or not actual:
+            return
+
+        ratio = min(4.0, max(0.25, actual / estimated))
+        with self._lock:
+            self.scale += self.smoothing * (ratio - self.scale)
+            self.calibrations += 1
+
+    def snapshot(self) -> Dict:
+        """Return the current budget settings and calibration state."""
+        with self._lock:
+            return {
+                "history_token_budget": HISTORY_TOKEN_BUDGET,
+                "history_max_messages": HISTORY_WINDOW,
+                "scale": round(self.scale, 4),
+                "calibrations": self.calibrations,
+            }
+
+
+token_estimator = TokenEstimator()
+
+
+# ============================================================
+# Session Cache
+# ============================================================
+
+class SessionCache:
+    """
+    Bounded write-through cache of conversation histories.
+
+    Sits in front of both the local and S3 backends so that a warm worker or
+    Lambda container can serve consecutive turns of a session without a
+    storage round trip. Entries are evicted least-recently-used first once
+    either `max_sessions` or `max_bytes` is exceeded, and expire `ttl`
+    seconds after they were last written (bounding staleness when another
+    worker writes the same session).
+
+    An entry may hold only the tail of a session (as loaded by `/chat`); its
+    `offset` is then the position of the first cached message in the full
+    history, and only an entry with offset 0 can serve a full read.
+
+    Sizes are estimated from message content lengths rather than measured
+    exactly, which is enough for a memory ceiling.
+    """
+
+    # Approximate per-message overhead (`ChatMessage`, timestamp, token count) in bytes
+    MESSAGE_OVERHEAD = 100
+
+    def __init__(self, max_sessions: int, max_bytes: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # session_id -> (expiry, size, messages, offset)
+        self._entries: "OrderedDict[str, Tuple[float, int, List[ChatMessage], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0 and self.max_bytes > 0
+
+    def _size(self, messages: List[ChatMessage]) -> int:
+        return sum(len(m.content) + self.MESSAGE_OVERHEAD for m in messages)
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry[1]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_sessions or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get(self, session_id: str, complete: bool = False) -> Optional[Tuple[List[ChatMessage], int]]:
+        """
+        Return a copy of the cached (messages, offset), or None on a miss.
+
+        With `complete=True`, entries holding only a tail count as misses.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+
+            if entry is not None and self.ttl > 0 and entry[0] < time.monotonic():
+                self._drop(session_id)
+                entry = None
+
+            if entry is None or (complete and entry[3]):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return list(entry[2]), entry[3]
+
+    def put(self, session_id: str, messages: List[ChatMessage], offset: int = 0) -> None:
+        """Store a copy of the history (or its tail) and evict beyond the limits."""
+        if not self.enabled:
+            return
+
+        size = self._size(messages)
+
+        with self._lock:
+            if session_id in self._entries:
+                self._drop(session_id)
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[session_id] = (time.monotonic() + self.ttl, size, list(messages), offset)
+            self._bytes += size
+            self._evict()
+
+    def extend(self, session_id: str, new_messages: List[ChatMessage]) -> None:
+        """Append a new turn to a cached entry; sessions not cached are left alone."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+
+            _, size, messages, offset = entry
+            added = self._size(new_messages)
+
+            self._entries[session_id] = (time.monotonic() + self.ttl, size + added, messages + new_messages, offset)
+            self._entries.move_to_end(session_id)
+            self._bytes += added
+            self._evict()
+
+    def invalidate(self, session_id: str) -> None:
+        """Forget a session so the next load goes to storage."""
+        with self._lock:
+            if session_id in self._entries:
+                self._drop(session_id)
+
+    def stats(self) -> Dict:
+        """Return counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Appends to the same session within this process are serialized, so the
+# cached copy is extended in the same order the storage backend saw
+session_write_locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+
+
+def session_write_lock(session_id: str) -> threading.Lock:
+    """Return the in-process write lock guarding a session."""
+    return session_write_locks[hash(session_id) % SESSION_LOCK_STRIPES]
+
+
+session_cache = SessionCache(
+    max_sessions=SESSION_CACHE_MAX_SESSIONS,
+    max_bytes=SESSION_CACHE_MAX_BYTES,
+    ttl=SESSION_CACHE_TTL,
+)
 
 
 # ============================================================
@@ -130,103 +670,248 @@ class ChatResponse(BaseModel):
     session_id: str
 
 
-class Message(BaseModel):
-    """Internal model representing a single message in the conversation."""
-    role: str
-    content: str
-    timestamp: str
-
-
 # ============================================================
 # Memory Management
 # ============================================================
 
-def get_memory_path(session_id: str) -> str:
-    """Return the storage filename/key for a given session."""
-    return f"{session_id}.json"
+def create_memory_backend() -> memory.MemoryBackend:
+    """Build the storage backend selected by `MEMORY_BACKEND`."""
+    if MEMORY_BACKEND in ("s3", "dynamodb"):
+        import boto3
+
+    if MEMORY_BACKEND == "s3":
+        return memory.S3MemoryBackend(boto3.client("s3"), S3_BUCKET, MEMORY_COMPACT_SEGMENTS, MEMORY_COMPRESSION)
 
+    if MEMORY_BACKEND == "dynamodb":
+        client = boto3.client("dynamodb", endpoint_url=DYNAMODB_ENDPOINT_URL)
+        return memory.DynamoDBMemoryBackend(client, DYNAMODB_TABLE, MEMORY_COMPRESSION)
 
-def load_conversation(session_id: str) -> List[Dict]:
+    if MEMORY_BACKEND == "local":
+        return memory.LocalMemoryBackend(MEMORY_DIR)
+
+    raise ValueError(f"Unknown MEMORY_BACKEND: {MEMORY_BACKEND}")
+
+
+# Active storage backend, created on first use by `get_memory_backend()`
+memory_backend: Optional[memory.MemoryBackend] = None
+
+
+def get_memory_backend() -> memory.MemoryBackend:
+    """Return the active storage backend, creating it (and only the client it needs) on first use."""
+    global memory_backend
+
+    with _client_lock:
+        if memory_backend is None:
+            memory_backend = create_memory_backend()
+        return memory_backend
+
+
+def load_conversation(session_id: str) -> List[ChatMessage]:
     """
-    Load the conversation history for a given session.
+    Load the full conversation history for a given session.
+
+    Served from the session cache when it holds the whole session; misses
+    are read from storage and cached.
 
-    Returns a list of message dictionaries, or an empty list
-    if no previous conversation exists.
+    These storage helpers are the boundary between stored dictionaries and
+    `ChatMessage`: they decode what the backend returns and encode what is
+    written to it.
     """
-    if USE_S3:
-        try:
-            # Load from S3
-            response = s3_client.get_object(
-                Bucket=S3_BUCKET,
-                Key=get_memory_path(session_id)
-            )
-            return json.loads(response["Body"].read().decode("utf-8"))
+    cached = session_cache.get(session_id, complete=True)
+    if cached is not None:
+        return cached[0]
 
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "NoSuchKey":
-                return []
-            raise
+    with metrics.timer(metrics.STORAGE_SECONDS, op="load"):
+        messages = from_records(get_memory_backend().load(session_id))
+    session_cache.put(session_id, messages)
+    return messages
 
-    # Load from local disk
-    file_path = os.path.join(MEMORY_DIR, get_memory_path(session_id))
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
 
-    return []
+def load_recent(session_id: str, limit: int = HISTORY_WINDOW) -> Tuple[List[ChatMessage], int]:
+    """
+    Load the last `limit` messages of a session for building a Bedrock turn.
+
+    Returns (messages, offset), where `offset` is the position of the first
+    returned message in the full history. Storage reads use the tail API, so
+    their cost does not grow with the length of the session.
+    """
+    trace = metrics.current()
+    cached = session_cache.get(session_id)
+    if cached is not None:
+        if trace is not None:
+            trace.set(session_cache="hit")
+        messages, offset = cached
+        tail = messages[-limit:]
+        return tail, offset + len(messages) - len(tail)
+
+    if trace is not None:
+        trace.set(session_cache="miss")
+    with metrics.timer(metrics.STORAGE_SECONDS, op="tail"):
+        records, total = get_memory_backend().tail(session_id, limit)
+    tail = from_records(records)
+    offset = total - len(tail)
+    session_cache.put(session_id, tail, offset)
+    return tail, offset
+
+
+def iter_conversation(session_id: str, start: int = 0) -> Iterator[ChatMessage]:
+    """
+    Yield a session's messages from position `start` onwards.
+
+    A fully cached session is served from memory; otherwise messages are
+    streamed from storage without materializing the whole history.
+    """
+    cached = session_cache.get(session_id, complete=True)
+    if cached is not None:
+        return iter(cached[0][start:])
+
+    return map(ChatMessage.from_dict, get_memory_backend().iter(session_id, start))
 
 
-def save_conversation(session_id: str, messages: List[Dict]):
+def load_page(session_id: str, offset: int, limit: int) -> Tuple[List[ChatMessage], bool]:
     """
-    Save the conversation history for a given session.
+    Load one page of a session's history.
 
-    Writes to either S3 or local filesystem depending on USE_S3.
+    Returns (messages, has_more). One message past the page is read to
+    detect whether another page follows, so the total is never counted.
     """
-    if USE_S3:
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=get_memory_path(session_id),
-            Body=json.dumps(messages, indent=2),
-            ContentType="application/json"
-        )
-    else:
-        os.makedirs(MEMORY_DIR, exist_ok=True)
-        file_path = os.path.join(MEMORY_DIR, get_memory_path(session_id))
-        with open(file_path, "w") as f:
-            json.dump(messages, f, indent=2)
+    page = list(itertools.islice(iter_conversation(session_id, offset), limit + 1))
+    return page[:limit], len(page) > limit
+
+
+def append_conversation(session_id: str, new_messages: List[ChatMessage]):
+    """
+    Persist a new turn by appending `new_messages` to the session.
+
+    Write-through: storage is appended to first, then the new messages are
+    added to the session's cache entry (if it is still cached). Concurrent
+    turns on the same session are merged by the backend; if it reports
+    another writer, the cached copy may be missing their turn and is
+    dropped instead.
+    """
+    with session_write_lock(session_id):
+        with metrics.timer(metrics.STORAGE_SECONDS, op="append"):
+            contended = get_memory_backend().append(session_id, to_records(new_messages))
+
+        if contended:
+            session_cache.invalidate(session_id)
+        else:
+            session_cache.extend(session_id, new_messages)
+
+
+async def load_conversation_async(session_id: str) -> List[ChatMessage]:
+    """Non-blocking variant of `load_conversation` for use in route handlers."""
+    return await run_blocking(load_conversation, session_id)
+
+
+async def load_recent_async(session_id: str, limit: int = HISTORY_WINDOW) -> Tuple[List[ChatMessage], int]:
+    """Non-blocking variant of `load_recent` for use in route handlers."""
+    return await run_blocking(load_recent, session_id, limit)
+
+
+async def append_conversation_async(session_id: str, new_messages: List[ChatMessage]):
+    """Non-blocking variant of `append_conversation` for use in route handlers."""
+    await run_blocking(append_conversation, session_id, new_messages)
 
 
 # ============================================================
-# Bedrock Call Function
+# Bedrock Call Functions
 # ============================================================
 
-def call_bedrock(conversation: List[Dict], user_message: str) -> str:
+def budget_start(conversation: List[ChatMessage], offset: int = 0) -> int:
     """
-    Send conversation history + current message to AWS Bedrock.
+    Return the absolute position of the oldest message that fits the token budget.
+
+    Messages are added newest to oldest until the next one would push the
+    calibrated estimate past `HISTORY_TOKEN_BUDGET`.
+    """
+    used = 0.0
+    start = offset + len(conversation)
+
+    for message in reversed(conversation):
+        used += token_estimator.message_tokens(message)
+        if used > HISTORY_TOKEN_BUDGET:
+            break
+        start -= 1
+
+    return start
+
+
+def history_window(conversation: List[ChatMessage], offset: int = 0) -> List[ChatMessage]:
+    """
+    Select the slice of history sent to Bedrock.
+
+    `conversation` may be just the tail of the session, in which case
+    `offset` is the position of its first message in the full history.
+
+    The window holds the newest messages that fit `HISTORY_TOKEN_BUDGET`
+    estimated tokens, and at most `HISTORY_WINDOW` of them. With caching
+    on, the window start is rounded up to a multiple of `HISTORY_WINDOW_STEP`
+    (in absolute positions) so it stays put for several turns and the history
+    prefix keeps hitting the cache, unless rounding would skip past the
+    latest exchange. The latest user/assistant exchange is always kept, even
+    when it alone exceeds the budget, and the window always begins with a
+    user message, as Converse requires.
+    """
+    total = offset + len(conversation)
+    start = max(0, total - HISTORY_WINDOW)
+
+    if HISTORY_TOKEN_BUDGET > 0:
+        start = max(start, budget_start(conversation, offset))
+
+    if BEDROCK_PROMPT_CACHE and start and HISTORY_WINDOW_STEP > 1:
+        rounded = -(-start // HISTORY_WINDOW_STEP) * HISTORY_WINDOW_STEP
+        if rounded <= total - 2:
+            start = rounded
+
+    start = min(start, max(0, total - min(2, HISTORY_WINDOW)))
+
+    window = conversation[max(0, start - offset):]
+    while window and window[0].role != Role.USER:
+        window = window[1:]
+
+    return window
+
+
+def retrieval_query(conversation: List[ChatMessage], user_message: str) -> str:
+    """
+    Text used to retrieve persona background for this turn.
+
+    The previous user message is included so that follow-ups such as
+    "tell me more about that" still retrieve the right chunks.
+    """
+    previous = next((m.content for m in reversed(conversation) if m.role == Role.USER), "")
+    return f"{previous}\n{user_message}" if previous else user_message
+
+
+def build_messages(conversation: List[ChatMessage], user_message: str, summary: Optional[Dict] = None,
+                   timed: bool = True) -> List[Dict]:
+    """
+    Build the Bedrock message list for a conversation turn.
+
+    A rolling summary of older messages, if any, follows the system prompt.
+    With `timed=False` the prompt leaves out the current date/time.
 
     Bedrock requires messages formatted as:
     [
         {"role": "...", "content": [{"text": "..."}]},
         ...
     ]
-
-    Returns the assistant's text response.
     """
-
-    # Build messages list
     messages = []
 
     # Add system prompt (as user-role per Bedrock convention)
     messages.append({
         "role": "user",
-        "content": [{"text": f"System: {prompt()}"}]
+        "content": [{"text": f"System: {prompt(retrieval_query(conversation, user_message), timed)}"}]
+                   + summary_blocks(summary)
     })
 
-    # Add last 20 messages from history
-    for msg in conversation[-20:]:
+    # Add the recent history that fits the token budget
+    for msg in history_window(conversation):
         messages.append({
-            "role": msg["role"],
-            "content": [{"text": msg["content"]}]
+            "role": msg.role_name,
+            "content": [{"text": msg.content}]
         })
 
     # Add current user message
@@ -235,31 +920,376 @@ def call_bedrock(conversation: List[Dict], user_message: str) -> str:
         "content": [{"text": user_message}]
     })
 
+    return messages
+
+
+def build_cached_request(conversation: List[ChatMessage], user_message: str, offset: int = 0,
+                         summary: Optional[Dict] = None, timed: bool = True) -> Dict:
+    """
+    Build `system` and `messages` for a prompt-cached Converse call.
+
+    Layout (cache checkpoints marked with *):
+    - system   : static persona *, then the rolling summary (if any), which
+                 changes only every few turns
+    - messages : history window *, then the current user message, preceded
+                 by the per-turn section (retrieved background and date/time)
+                 so it never invalidates a prefix (left out when empty)
+    """
+    persona, per_turn = prompt_blocks(retrieval_query(conversation, user_message), timed)
+
+    system = [{"text": persona}, CACHE_POINT] + summary_blocks(summary)
+
+    messages = [
+        {"role": msg.role_name, "content": [{"text": msg.content}]}
+        for msg in history_window(conversation, offset)
+    ]
+
+    # Checkpoint the end of the history so the next turn reuses it
+    if messages:
+        messages[-1]["content"].append(CACHE_POINT)
+
+    messages.append({
+        "role": "user",
+        "content": ([{"text": per_turn}] if per_turn else []) + [{"text": user_message}]
+    })
+
+    return {"system": system, "messages": messages}
+
+
+def build_converse_request(conversation: List[ChatMessage], user_message: str, offset: int = 0,
+                           summary: Optional[Dict] = None, timed: bool = True) -> Dict:
+    """
+    Build the keyword arguments for `converse` / `converse_stream`.
+
+    `timed=False` leaves the current date/time out of the prompt, for turns
+    whose answer may be stored in the response cache and reused later.
+    """
+    if BEDROCK_PROMPT_CACHE:
+        request = build_cached_request(conversation, user_message, offset, summary, timed)
+    else:
+        request = {"messages": build_messages(conversation, user_message, summary, timed)}
+
+    return {
+        "modelId": BEDROCK_MODEL_ID,
+        "inferenceConfig": INFERENCE_CONFIG,
+        **request,
+    }
+
+
+def bedrock_http_error(e: ClientError) -> HTTPException:
+    """Map a Bedrock `ClientError` onto the HTTP error returned to the client."""
+    code = e.response["Error"]["Code"]
+
+    if code == "ValidationException":
+        return HTTPException(400, "Invalid message format for Bedrock")
+
+    if code == "AccessDeniedException":
+        return HTTPException(403, "Access denied to Bedrock model")
+
+    # Still throttled or unavailable after the retries in `throttling`
+    if code in throttling.THROTTLE_ERRORS:
+        return HTTPException(429, "Bedrock is throttling requests", headers={"Retry-After": "5"})
+
+    if code in throttling.RETRYABLE_ERRORS:
+        return HTTPException(503, "Bedrock is temporarily unavailable", headers={"Retry-After": "5"})
+
+    return HTTPException(500, f"Bedrock error: {str(e)}")
+
+
+def overloaded_http_error(e: throttling.Overloaded) -> HTTPException:
+    """Map a request shed by the Bedrock rate limiter onto a 503."""
+    return HTTPException(503, str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+
+def call_bedrock(conversation: List[ChatMessage], user_message: str, offset: int = 0,
+                 summary: Optional[Dict] = None, timed: bool = True) -> str:
+    """
+    Send conversation history + current message to AWS Bedrock.
+
+    `offset` is the position of `conversation[0]` in the full history
+    (non-zero when only the tail of the session was loaded), and `summary`
+    the session's rolling summary of older messages, if any. `timed=False`
+    leaves the current date/time out of the prompt.
+
+    Returns the assistant's text response.
+    """
+    return converse(build_converse_request(conversation, user_message, offset, summary, timed))
+
+
+def send_bedrock(op: str, kwargs: Dict) -> Dict:
+    """One `converse` / `converse_stream` call to `kwargs["modelId"]`, rate-limited, retried and timed."""
+    model = kwargs["modelId"]
+    method = getattr(get_bedrock_client(), op)
+    began = time.perf_counter()
+    outcome = "error"
+
     try:
-        # Call Bedrock
-        response = bedrock_client.converse(
-            modelId=BEDROCK_MODEL_ID,
-            messages=messages,
-            inferenceConfig={
-                "maxTokens": 2000,
-                "temperature": 0.7,
-                "topP": 0.9
-            }
-        )
+        response = throttling.call(model, lambda: method(**kwargs))
+        outcome = "ok"
+        return response
+    finally:
+        metrics.BEDROCK_SECONDS.observe(time.perf_counter() - began, model=model, op=op, outcome=outcome)
+
+
+def send_converse(kwargs: Dict) -> Dict:
+    """One `converse` call (see `send_bedrock`)."""
+    return send_bedrock("converse", kwargs)
+
+
+def send_converse_stream(kwargs: Dict) -> Dict:
+    """One `converse_stream` call (see `send_bedrock`); the time covers opening the stream only."""
+    return send_bedrock("converse_stream", kwargs)
+
+
+def converse(kwargs: Dict) -> str:
+    """Send a prepared `converse` request through the router and return the assistant's text."""
+    estimate = token_estimator.request_tokens(kwargs)
+
+    try:
+        # Call Bedrock on the routed model (with fallback/hedging)
+        response, model = router.call(kwargs, estimate, send_converse)
+
+        # Track prompt-cache usage, record metrics and calibrate the token estimator
+        usage = response.get("usage", {})
+        prompt_cache_stats.record(usage)
+        metrics.record_usage(model, response)
+        token_estimator.calibrate(estimate, usage)
 
         # Extract response text
         return response["output"]["message"]["content"][0]["text"]
 
     except ClientError as e:
-        code = e.response["Error"]["Code"]
+        raise bedrock_http_error(e)
+
+    except throttling.Overloaded as e:
+        raise overloaded_http_error(e)
 
-        if code == "ValidationException":
-            raise HTTPException(400, "Invalid message format for Bedrock")
 
-        if code == "AccessDeniedException":
-            raise HTTPException(403, "Access denied to Bedrock model")
+async def call_bedrock_async(conversation: List[ChatMessage], user_message: str, offset: int = 0,
+                             summary: Optional[Dict] = None, timed: bool = True) -> str:
+    """
+    Non-blocking variant of `call_bedrock` for use in route handlers.
+
+    With `BEDROCK_COALESCE` on, concurrent turns whose requests are identical
+    (typically the same first message within the same prompt time bucket)
+    share one Bedrock call.
+    """
+    if not BEDROCK_COALESCE:
+        return await run_blocking(call_bedrock, conversation, user_message, offset, summary, timed)
 
-        raise HTTPException(500, f"Bedrock error: {str(e)}")
+    kwargs = await run_blocking(build_converse_request, conversation, user_message, offset, summary, timed)
+    key = hashlib.sha256(codec.dumpb(kwargs, sort_keys=True)).hexdigest()
+
+    return await bedrock_flights.run(key, lambda: run_blocking(converse, kwargs))
+
+
+def open_bedrock_stream(conversation: List[ChatMessage], user_message: str, offset: int = 0,
+                        summary: Optional[Dict] = None, timed: bool = True):
+    """
+    Start a streaming Bedrock call for the current turn.
+
+    The request is sent eagerly so that validation, access and throttling
+    errors surface as HTTP errors before any response bytes are written.
+    Returns the `converse_stream` event stream, the estimated input tokens
+    of the request and the model serving it (for `iter_stream_text`).
+    """
+    kwargs = build_converse_request(conversation, user_message, offset, summary, timed)
+    estimate = token_estimator.request_tokens(kwargs)
+
+    try:
+        # Routed and failed over like `converse`, but never hedged
+        response, model = router.call(kwargs, estimate, send_converse_stream, hedge=False)
+        return response["stream"], estimate, model
+
+    except ClientError as e:
+        raise bedrock_http_error(e)
+
+    except throttling.Overloaded as e:
+        raise overloaded_http_error(e)
+
+
+def iter_stream_text(stream, estimate: int = 0, model: str = BEDROCK_MODEL_ID) -> Iterator[str]:
+    """
+    Yield text deltas from a `converse_stream` event stream as they arrive.
+
+    The usage in the final metadata event is recorded (for `model`), and
+    calibrates the token estimator against `estimate` (the request's
+    estimated input tokens).
+    """
+    for event in stream:
+        delta = event.get("contentBlockDelta", {}).get("delta", {})
+        if "text" in delta:
+            yield delta["text"]
+
+        if "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+            prompt_cache_stats.record(usage)
+            metrics.record_usage(model, event["metadata"])
+            token_estimator.calibrate(estimate, usage)
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format a single Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {codec.dumps(data)}\n\n"
+
+
+# ============================================================
+# Conversation Summarization
+# ============================================================
+
+# Sessions whose summary is being updated by this process
+summaries_in_flight: set = set()
+summaries_lock = threading.Lock()
+
+
+def load_summary(session_id: str) -> Optional[Dict]:
+    """Return the session's rolling summary (None if absent or disabled)."""
+    if not SUMMARY_ENABLED:
+        return None
+    with metrics.timer(metrics.STORAGE_SECONDS, op="load_summary"):
+        return get_memory_backend().load_summary(session_id)
+
+
+async def load_summary_async(session_id: str) -> Optional[Dict]:
+    """Non-blocking variant of `load_summary`."""
+    return await run_blocking(load_summary, session_id)
+
+
+def summary_blocks(summary: Optional[Dict]) -> List[Dict]:
+    """Return the content block(s) that inject a rolling summary into the prompt."""
+    if not summary or not summary.get("summary"):
+        return []
+
+    return [{
+        "text": "Summary of the earlier part of this conversation "
+                "(older messages are no longer shown):\n" + summary["summary"]
+    }]
+
+
+def window_start(conversation: List[ChatMessage], offset: int = 0) -> int:
+    """Absolute position of the first message `history_window` would send."""
+    return offset + len(conversation) - len(history_window(conversation, offset))
+
+
+def summary_due(conversation: List[ChatMessage], offset: int, summary: Optional[Dict]) -> bool:
+    """True if enough messages have left the history window since the last summary update."""
+    if not SUMMARY_ENABLED:
+        return False
+
+    through = summary["through"] if summary else 0
+    return window_start(conversation, offset) - through >= SUMMARY_MIN_BATCH
+
+
+def build_summary_request(previous: str, messages: List[ChatMessage]) -> Dict:
+    """Build the Converse arguments that fold `messages` into the `previous` summary."""
+    transcript = "\n".join(f"{m.role_name}: {m.content}" for m in messages)
+
+    instruction = (
+        "You maintain a running summary of a conversation between a website visitor (user) "
+        "and a digital twin (assistant). Update the summary so that it also covers the new "
+        "messages. Keep what the visitor said about themselves, the questions they asked, "
+        "what was answered and anything promised. Use at most 200 words, in plain prose. "
+        "Reply with the updated summary only.\n\n"
+        f"Current summary:\n{previous or '(none yet)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+
+    return {
+        "modelId": SUMMARY_MODEL_ID,
+        "inferenceConfig": {"maxTokens": SUMMARY_MAX_TOKENS, "temperature": 0.2},
+        "messages": [{"role": "user", "content": [{"text": instruction}]}],
+    }
+
+
+def update_summary(session_id: str) -> None:
+    """
+    Fold messages that have left the history window into the session's summary.
+
+    Runs as a background task after a turn has been saved, never on the
+    request path. Messages `[through, window start)` are summarised together
+    with the previous summary text (at most `SUMMARY_MAX_BATCH` per run), and
+    the result is stored with the session. Failures are logged and retried on
+    a later turn; an update from another worker that got further first wins.
+    """
+    with summaries_lock:
+        if session_id in summaries_in_flight:
+            return
+        summaries_in_flight.add(session_id)
+
+    try:
+        conversation, offset = load_recent(session_id)
+        summary = load_summary(session_id) or {"summary": "", "through": 0}
+        through = summary["through"]
+        end = min(window_start(conversation, offset), through + SUMMARY_MAX_BATCH)
+
+        if end - through < SUMMARY_MIN_BATCH:
+            return
+
+        evicted = list(itertools.islice(iter_conversation(session_id, through), end - through))
+        request = build_summary_request(summary["summary"], evicted)
+        response = send_converse(request)
+        metrics.record_usage(request["modelId"], response)
+        text = response["output"]["message"]["content"][0]["text"].strip()
+
+        # Another worker may have advanced the summary in the meantime
+        current = load_summary(session_id)
+        if current and current["through"] >= through + len(evicted):
+            return
+
+        get_memory_backend().save_summary(session_id, {
+            "summary": text,
+            "through": through + len(evicted),
+            "updated": datetime.now().isoformat(),
+        })
+
+    except Exception as e:
+        print(f"Summary update error for {session_id}: {str(e)}")
+
+    finally:
+        with summaries_lock:
+            summaries_in_flight.discard(session_id)
+
+
+# ============================================================
+# Response Cache
+# ============================================================
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=RESPONSE_CACHE_TTL,
+    similarity=RESPONSE_CACHE_SIMILARITY,
+)
+
+
+def response_fingerprint() -> str:
+    """Identify the persona, model and inference settings a cached response depends on."""
+    config = codec.dumps(INFERENCE_CONFIG, sort_keys=True)
+    models = "|".join([BEDROCK_MODEL_ID] + router.models())
+    return f"{models}|{config}|{persona_digest()}"
+
+
+def response_cacheable(conversation: List[ChatMessage], offset: int, summary: Optional[Dict]) -> bool:
+    """
+    Whether this turn's answer depends only on the question.
+
+    True for sessions with at most `RESPONSE_CACHE_MAX_HISTORY` stored
+    messages and no rolling summary.
+    """
+    return (
+        response_cache.enabled
+        and not summary
+        and offset + len(conversation) <= RESPONSE_CACHE_MAX_HISTORY
+    )
+
+
+def cached_response(message: str, cacheable: bool) -> Optional[str]:
+    """Return the cached answer to `message`, if the turn is cacheable and one exists."""
+    if not cacheable:
+        return None
+
+    cached = response_cache.get(message, response_fingerprint())
+    metrics.RESPONSE_CACHE_LOOKUPS.inc(result="hit" if cached is not None else "miss")
+    return cached
 
 
 # ============================================================
@@ -272,71 +1302,255 @@ async def root():
     return {
         "message": "AI Digital Twin API (Powered by AWS Bedrock)",
         "memory_enabled": True,
-        "storage": "S3" if USE_S3 else "local",
-        "ai_model": BEDROCK_MODEL_ID
+        "storage": get_memory_backend().name,
+        "ai_model": BEDROCK_MODEL_ID,
+        "routing": router.table(BEDROCK_MODEL_ID),
     }
 
 
 @app.get("/health")
 async def health_check():
     """Health endpoint for monitoring."""
-    return {"status": "healthy", "use_s3": USE_S3, "bedrock_model": BEDROCK_MODEL_ID}
+    return {
+        "status": "healthy",
+        "use_s3": USE_S3,
+        "storage": get_memory_backend().name,
+        "bedrock_model": BEDROCK_MODEL_ID,
+        "prompt_cache": prompt_cache_stats.snapshot(),
+        "session_cache": session_cache.stats(),
+        "token_budget": token_estimator.snapshot(),
+        "response_cache": response_cache.stats(),
+        "coalescing": bedrock_flights.stats(),
+        "bedrock_limits": throttling.stats(),
+        "routing": router.table(BEDROCK_MODEL_ID),
+        "latency": metrics.percentiles.snapshot(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Request, storage and Bedrock histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Main chat endpoint for interacting with the Digital Twin.
 
     Steps:
     1. Create or reuse session_id
-    2. Load conversation history
-    3. Call AWS Bedrock with context
-    4. Append new messages
-    5. Save updated memory
+    2. Load the recent conversation history and its rolling summary
+    3. Answer from the response cache (first turns), or call AWS Bedrock with context
+    4. Build the new user + assistant messages
+    5. Append them to memory
+    6. Update the rolling summary in the background, if due
     """
+    trace = metrics.start("/chat")
+    status = 500
+
     try:
         session_id = request.session_id or str(uuid.uuid4())
+        trace.set(session_id=session_id)
 
-        # Load history
-        conversation = load_conversation(session_id)
+        # Load recent history (tail read; full history is not needed) and summary
+        with trace.phase("load"):
+            (conversation, offset), summary = await asyncio.gather(
+                load_recent_async(session_id),
+                load_summary_async(session_id),
+            )
 
-        # Query Bedrock
-        assistant_response = call_bedrock(conversation, request.message)
+        # Reuse a cached answer, or query Bedrock
+        with trace.phase("bedrock"):
+            cacheable = response_cacheable(conversation, offset, summary)
+            assistant_response = cached_response(request.message, cacheable)
+            trace.set(response_cache="hit" if assistant_response is not None else "miss" if cacheable else "skip")
+            if assistant_response is None:
+                # A cacheable answer may be served later, so it must not depend on the time
+                assistant_response = await call_bedrock_async(
+                    conversation, request.message, offset, summary, timed=not cacheable
+                )
+                if cacheable:
+                    response_cache.put(request.message, assistant_response, response_fingerprint())
+
+        trace.sizes(request.message, assistant_response, len(conversation))
+
+        # New user + assistant messages for this turn
+        new_messages = [
+            ChatMessage.now(Role.USER, request.message, token_estimator.base(request.message)),
+            ChatMessage.now(Role.ASSISTANT, assistant_response, token_estimator.base(assistant_response)),
+        ]
+
+        # Save (append only the new turn)
+        with trace.phase("save"):
+            await append_conversation_async(session_id, new_messages)
+
+        # Fold evicted messages into the summary after the response is sent
+        if summary_due(conversation + new_messages, offset, summary):
+            background_tasks.add_task(update_summary, session_id)
+
+        status = 200
+        return ChatResponse(response=assistant_response, session_id=session_id)
 
-        # Append user message
-        conversation.append({
-            "role": "user",
-            "content": request.message,
-            "timestamp": datetime.now().isoformat(),
-        })
+    except HTTPException as e:
+        status = e.status_code
+        raise
 
-        # Append assistant message
-        conversation.append({
-            "role": "assistant",
-            "content": assistant_response,
-            "timestamp": datetime.now().isoformat(),
-        })
+    except memory.ConcurrentWriteError as e:
+        status = 409
+        raise HTTPException(409, str(e))
 
-        # Save
-        save_conversation(session_id, conversation)
+    except Exception as e:
+        print(f"Chat endpoint error: {str(e)}")
+        raise HTTPException(500, str(e))
 
-        return ChatResponse(response=assistant_response, session_id=session_id)
+    finally:
+        trace.finish(status)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint using Server-Sent Events.
+
+    Emits:
+    - `start` : {"session_id": ...} before the first token
+    - `token` : {"text": ...} for every text delta from Bedrock
+    - `done`  : {"session_id": ..., "response": ...} once the answer is complete
+    - `error` : {"detail": ...} if the stream fails part-way through
+
+    The full assistant message is saved to memory only after the stream
+    completes, through the same append path as `/chat`; the rolling summary
+    is then updated in the background, if due. A response cache hit is sent
+    as a single `token` event without opening a Bedrock stream.
+    """
+    trace = metrics.start("/chat/stream")
+
+    try:
+        session_id = request.session_id or str(uuid.uuid4())
+        trace.set(session_id=session_id)
 
-    except HTTPException:
+        # Load recent history (tail read; full history is not needed) and summary
+        with trace.phase("load"):
+            (conversation, offset), summary = await asyncio.gather(
+                load_recent_async(session_id),
+                load_summary_async(session_id),
+            )
+
+        # Reuse a cached answer, or start the Bedrock stream (errors here become HTTP errors)
+        with trace.phase("bedrock_open"):
+            cacheable = response_cacheable(conversation, offset, summary)
+            cached = cached_response(request.message, cacheable)
+            trace.set(response_cache="hit" if cached is not None else "miss" if cacheable else "skip")
+            if cached is None:
+                stream, estimate, model = await run_blocking(
+                    open_bedrock_stream, conversation, request.message, offset, summary, not cacheable
+                )
+
+    except HTTPException as e:
+        trace.finish(e.status_code)
         raise
 
     except Exception as e:
-        print(f"Chat endpoint error: {str(e)}")
+        print(f"Chat stream endpoint error: {str(e)}")
+        trace.finish(500)
         raise HTTPException(500, str(e))
 
+    user_timestamp = time.time()
+
+    def events() -> Iterator[str]:
+        # 499 (client closed request) unless the stream reaches the end
+        status = 499
+        try:
+            yield sse_event("start", {"session_id": session_id})
+
+            parts = []
+            try:
+                with trace.phase("stream"):
+                    chunks = [cached] if cached is not None else iter_stream_text(stream, estimate, model)
+                    for text in chunks:
+                        parts.append(text)
+                        yield sse_event("token", {"text": text})
+
+                assistant_response = "".join(parts)
+                trace.sizes(request.message, assistant_response, len(conversation))
+                if cacheable and cached is None:
+                    response_cache.put(request.message, assistant_response, response_fingerprint())
+
+                # Append user + assistant messages and save
+                new_messages = [
+                    ChatMessage(Role.USER, request.message, user_timestamp, token_estimator.base(request.message)),
+                    ChatMessage.now(Role.ASSISTANT, assistant_response, token_estimator.base(assistant_response)),
+                ]
+                with trace.phase("save"):
+                    append_conversation(session_id, new_messages)
+
+            except Exception as e:
+                print(f"Chat stream error: {str(e)}")
+                status = 500
+                yield sse_event("error", {"detail": str(e)})
+                return
+
+            status = 200
+            yield sse_event("done", {"session_id": session_id, "response": assistant_response})
+
+        finally:
+            trace.finish(status)
+
+    # Sync generators are iterated in Starlette's threadpool, so the
+    # blocking event-stream reads do not stall the event loop
+    # The turn adds two messages, which may push older ones out of the window
+    placeholder = [ChatMessage(Role.USER, request.message), ChatMessage(Role.ASSISTANT, "")]
+    background = None
+    if summary_due(conversation + placeholder, offset, summary):
+        background = BackgroundTask(update_summary, session_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background,
+    )
+
 
 @app.get("/conversation/{session_id}")
-async def get_conversation(session_id: str):
-    """Retrieve the full conversation history for a given session."""
+async def get_conversation(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=CONVERSATION_PAGE_MAX),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Retrieve the conversation history for a given session.
+
+    - Without `limit`, the full history from `offset` is returned as before.
+    - With `limit`, one page is returned along with `next_offset`
+      (null on the last page) to request the next one.
+    - With `format=ndjson`, messages are streamed one JSON object per line
+      straight from storage, honouring `offset` and `limit`.
+    """
     try:
-        history = load_conversation(session_id)
-        return {"session_id": session_id, "messages": history}
+        if format == "ndjson":
+            messages = iter_conversation(session_id, offset)
+            if limit is not None:
+                messages = itertools.islice(messages, limit)
+
+            lines = (codec.dumpb(m.to_dict()) + b"\n" for m in messages)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+
+        if limit is None:
+            history = await load_conversation_async(session_id)
+            return {"session_id": session_id, "messages": to_records(history[offset:])}
+
+        page, has_more = await run_blocking(load_page, session_id, offset, limit)
+        return {
+            "session_id": session_id,
+            "messages": to_records(page),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + len(page) if has_more else None,
+        }
+
     except Exception as e:
         raise HTTPException(500, str(e))
 
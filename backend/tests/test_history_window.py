@@ -0,0 +1,74 @@
+"""
+Tests for the Bedrock history window.
+
+Run from `backend/` (with pytest installed):
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault("MEMORY_DIR", tempfile.mkdtemp())
+os.environ.setdefault("DEFAULT_AWS_REGION", "us-east-1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from messages import ChatMessage, Role
+
+
+def make_conversation(length: int) -> list:
+    """Alternating user/assistant messages, starting with a user message."""
+    return [ChatMessage(Role(i % 2), f"message {i}") for i in range(length)]
+
+
+@pytest.fixture
+def cached_window(monkeypatch):
+    """Prompt caching on, 1500 estimated tokens per message, a 4000-token budget."""
+    monkeypatch.setattr(server, "BEDROCK_PROMPT_CACHE", True)
+    monkeypatch.setattr(server, "HISTORY_WINDOW", 40)
+    monkeypatch.setattr(server, "HISTORY_WINDOW_STEP", 10)
+    monkeypatch.setattr(server, "HISTORY_TOKEN_BUDGET", 4000)
+    monkeypatch.setattr(server.token_estimator, "message_tokens", lambda message: 1500)
+
+
+@pytest.mark.parametrize("length", range(2, 30, 2))
+def test_rounding_keeps_latest_exchange(cached_window, length):
+    conversation = make_conversation(length)
+
+    window = server.history_window(conversation)
+
+    assert len(window) >= 2
+    assert window[-2:] == conversation[-2:]
+    assert window[0].role == Role.USER
+
+
+@pytest.mark.parametrize("length", range(2, 30, 2))
+def test_rounding_keeps_latest_exchange_with_offset(cached_window, length):
+    conversation = make_conversation(length)
+    tail = conversation[-6:]
+
+    window = server.history_window(tail, offset=len(conversation) - len(tail))
+
+    assert window[-2:] == conversation[-2:]
+    assert window[0].role == Role.USER
+
+
+def test_oversized_exchange_is_kept(cached_window, monkeypatch):
+    monkeypatch.setattr(server.token_estimator, "message_tokens", lambda message: 10000)
+    conversation = make_conversation(24)
+
+    assert server.history_window(conversation) == conversation[-2:]
+
+
+def test_rounding_advances_in_steps(cached_window, monkeypatch):
+    # The budget fits the last six messages (from 18); rounding moves the start to 20
+    monkeypatch.setattr(server, "HISTORY_TOKEN_BUDGET", 10000)
+    conversation = make_conversation(24)
+
+    window = server.history_window(conversation)
+
+    assert window == conversation[20:]
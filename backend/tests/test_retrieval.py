@@ -0,0 +1,77 @@
+"""
+Tests for the persona retrieval index (stemming and BM25 ranking).
+
+Run from `backend/` (with pytest installed):
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retrieval
+
+
+@pytest.mark.parametrize("words", [
+    "study studies studied studying",
+    "use uses used using",
+    "project projects",
+    "role roles",
+    "class classes",
+    "degree degrees",
+    "need needs needed",
+    "manage manages managed managing",
+])
+def test_inflections_share_a_stem(words):
+    assert len({retrieval._stem(word) for word in words.split()}) == 1
+
+
+@pytest.mark.parametrize("word", ["thing", "bring", "class", "data", "msc"])
+def test_short_or_unsuffixed_words_are_kept(word):
+    assert retrieval._stem(word) == word
+
+
+def test_synonyms_match_inflected_query_terms():
+    terms = retrieval.expand_query("Where are you based?")
+
+    assert "location" in terms
+
+
+CHUNKS = [
+    {"source": "summary", "text": "I enjoy helping teams turn data into decisions."},
+    {"source": "facts", "text": 'education: [{"degree": "MSc Data Science", "institution": "University"}]'},
+    {"source": "linkedin", "text": "Built dashboards with Power BI and Tableau for finance teams."},
+    {"source": "linkedin", "text": "Projects: forecasting demand with Python; a chatbot using Bedrock."},
+]
+
+
+def test_bm25_ranks_the_matching_chunk_first():
+    index = retrieval.BM25Index(CHUNKS)
+
+    scores = index.scores("Which degree did you study?")
+
+    assert max(scores, key=scores.get) == 1
+
+
+def test_bm25_matches_across_inflections():
+    index = retrieval.BM25Index(CHUNKS)
+
+    assert index.search("What project are you using Bedrock in?", 1) == [CHUNKS[3]]
+
+
+def test_search_returns_document_order():
+    index = retrieval.BM25Index(CHUNKS)
+
+    results = index.search("Tableau dashboards and forecasting projects", 2)
+
+    assert results == [CHUNKS[2], CHUNKS[3]]
+
+
+def test_search_falls_back_to_summary_without_matches():
+    index = retrieval.BM25Index(CHUNKS)
+
+    assert index.search("Hello!", 2) == [CHUNKS[0]]
@@ -0,0 +1,323 @@
+"""
+Client-side rate limiting and retries for Bedrock calls.
+
+Every Bedrock request from `server.py` goes through `call(model_id, func)`,
+which applies, per model:
+
+- token bucket : at most `rps` requests per second on average, with bursts of
+                 up to `burst`; sized to the account's Bedrock quota so the
+                 service is not driven into throttling in the first place
+- bounded queue: callers wait for a token for at most `queue_timeout`
+                 seconds, and at most `max_queue` of them wait at once.
+                 Anyone beyond that, or whose wait would exceed the timeout
+                 at the current rate, is shed immediately with `Overloaded`
+                 (the API turns it into a 503 with `Retry-After`)
+- retries      : throttling and transient service errors are retried with
+                 full-jitter exponential backoff, up to `max_attempts` calls
+- adaptation   : each throttle halves the bucket's rate (down to 10% of
+                 `rps`), and each success restores 5% of it, so a quota that
+                 is lower than configured is found automatically
+
+With `rps` 0 (the default) there is no bucket or queue, only retries.
+Settings come from the `BEDROCK_*` variables below, with per-model overrides
+in `BEDROCK_LIMITS`, e.g.
+
+    BEDROCK_LIMITS='{"amazon.nova-pro-v1:0": {"rps": 2, "burst": 4, "max_queue": 4}}'
+
+The limiter is per process; with several workers or Lambda instances, size
+`rps` to each one's share of the quota.
+"""
+
+# ============================================================
+# Imports
+# ============================================================
+
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from botocore.exceptions import ClientError
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+# Average requests per second per model (0 disables the bucket and queue)
+BEDROCK_RPS = float(os.getenv("BEDROCK_RPS", "0"))
+
+# Bucket capacity, i.e. the largest burst (0 means max(1, BEDROCK_RPS))
+BEDROCK_BURST = float(os.getenv("BEDROCK_BURST", "0"))
+
+# Callers allowed to wait for a token at once; the rest are shed. Waiting
+# callers hold an I/O executor thread, so keep this below IO_MAX_WORKERS
+BEDROCK_MAX_QUEUE = int(os.getenv("BEDROCK_MAX_QUEUE", "8"))
+
+# Longest a caller waits for a token, in seconds
+BEDROCK_QUEUE_TIMEOUT = float(os.getenv("BEDROCK_QUEUE_TIMEOUT", "10"))
+
+# Bedrock calls per request, including the first (1 disables retries)
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "4"))
+
+# Backoff before retry n is uniform in [0, min(cap, base * 2**n)] seconds
+BEDROCK_RETRY_BASE = float(os.getenv("BEDROCK_RETRY_BASE", "0.2"))
+BEDROCK_RETRY_CAP = float(os.getenv("BEDROCK_RETRY_CAP", "5"))
+
+# Per-model overrides of the settings above, as a JSON object keyed by model id
+BEDROCK_LIMITS = os.getenv("BEDROCK_LIMITS", "")
+
+# Errors worth retrying after a pause
+RETRYABLE_ERRORS = frozenset({
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+    "ModelTimeoutException",
+})
+
+# Errors that mean the rate is too high
+THROTTLE_ERRORS = frozenset({"ThrottlingException"})
+
+# Adaptive rate limits, as fractions of the configured rate
+MIN_RATE_FRACTION = 0.1
+THROTTLE_DECREASE = 0.5
+SUCCESS_INCREASE = 0.05
+
+
+# ============================================================
+# Errors
+# ============================================================
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued for a Bedrock token."""
+
+    def __init__(self, model_id: str, retry_after: float):
+        super().__init__(f"Too many requests for {model_id}; retry in {retry_after:.0f}s")
+        self.model_id = model_id
+        self.retry_after = retry_after
+
+
+def error_code(e: ClientError) -> str:
+    """Return the AWS error code of a `ClientError`."""
+    return e.response.get("Error", {}).get("Code", "")
+
+
+def backoff(attempt: int, base: float = BEDROCK_RETRY_BASE, cap: float = BEDROCK_RETRY_CAP) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ============================================================
+# Per-Model Limiter
+# ============================================================
+
+class ModelLimiter:
+    """
+    Token bucket, bounded wait queue and retry policy for one model.
+
+    Parameters
+    ----------
+    model_id : str
+        Model the limits apply to (used in errors and stats).
+    rps : float
+        Average requests per second (0 disables the bucket and queue).
+    burst : float
+        Bucket capacity (0 means max(1, rps)).
+    max_queue : int
+        Most callers waiting for a token at once.
+    queue_timeout : float
+        Longest a caller waits for a token, in seconds.
+    max_attempts : int
+        Calls per request, including the first.
+    """
+
+    def __init__(self, model_id: str, rps: float = 0.0, burst: float = 0.0, max_queue: int = 8,
+                 queue_timeout: float = 10.0, max_attempts: int = 4):
+        self.model_id = model_id
+        self.max_rate = rps
+        self.rate = rps
+        self.burst = burst or max(1.0, rps)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.shed = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update (caller holds the lock)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _shed(self, wait: float) -> Overloaded:
+        self.shed += 1
+        return Overloaded(self.model_id, max(1.0, wait))
+
+    def acquire(self) -> None:
+        """
+        Take one token, waiting up to `queue_timeout` for it.
+
+        Raises
+        ------
+        Overloaded
+            If the queue is full, or the wait at the current rate would exceed
+            `queue_timeout`.
+        """
+        if not self.enabled:
+            return
+
+        with self._cond:
+            self._refill()
+            if self.tokens >= 1 and not self.waiting:
+                self.tokens -= 1
+                self.admitted += 1
+                return
+
+            # Expected wait for a token behind everyone already queued
+            expected = (self.waiting + 1 - self.tokens) / self.rate
+            if self.waiting >= self.max_queue or expected > self.queue_timeout:
+                raise self._shed(expected)
+
+            deadline = time.monotonic() + self.queue_timeout
+            self.waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.admitted += 1
+                        return
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._shed((1 - self.tokens) / self.rate)
+                    self._cond.wait(min(remaining, (1 - self.tokens) / self.rate))
+            finally:
+                self.waiting -= 1
+
+    def on_throttle(self) -> None:
+        """Lower the rate after Bedrock throttled a request."""
+        with self._cond:
+            self.throttled += 1
+            if self.enabled:
+                self._refill()
+                self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate * THROTTLE_DECREASE)
+
+    def on_success(self) -> None:
+        """Raise the rate back towards the configured one."""
+        if self.enabled and self.rate < self.max_rate:
+            with self._cond:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * SUCCESS_INCREASE)
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """
+        Run `func` (one Bedrock request) under the limits, retrying transient errors.
+
+        Raises
+        ------
+        Overloaded
+            If a token could not be obtained in time.
+        ClientError
+            If Bedrock returned a non-retryable error, or retries ran out.
+        """
+        for attempt in range(self.max_attempts):
+            self.acquire()
+            try:
+                result = func()
+            except ClientError as e:
+                code = error_code(e)
+                if code in THROTTLE_ERRORS:
+                    self.on_throttle()
+                if code not in RETRYABLE_ERRORS or attempt == self.max_attempts - 1:
+                    with self._cond:
+                        self.failures += 1
+                    raise
+                with self._cond:
+                    self.retries += 1
+                time.sleep(backoff(attempt))
+                continue
+
+            self.on_success()
+            return result
+
+    def stats(self) -> Dict:
+        """Return the limits, current rate and counters."""
+        with self._cond:
+            return {
+                "rps": self.max_rate,
+                "current_rps": round(self.rate, 3),
+                "burst": self.burst,
+                "queued": self.waiting,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+
+# ============================================================
+# Limiter Registry
+# ============================================================
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def model_settings(model_id: str) -> Dict[str, Any]:
+    """Limiter settings for `model_id`: the defaults plus any `BEDROCK_LIMITS` override."""
+    settings = {
+        "rps": BEDROCK_RPS,
+        "burst": BEDROCK_BURST,
+        "max_queue": BEDROCK_MAX_QUEUE,
+        "queue_timeout": BEDROCK_QUEUE_TIMEOUT,
+        "max_attempts": BEDROCK_MAX_ATTEMPTS,
+    }
+    if BEDROCK_LIMITS:
+        settings.update(json.loads(BEDROCK_LIMITS).get(model_id, {}))
+    return settings
+
+
+def get_limiter(model_id: str) -> ModelLimiter:
+    """Return the limiter for `model_id`, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(model_id)
+        if limiter is None:
+            limiter = _limiters[model_id] = ModelLimiter(model_id, **model_settings(model_id))
+        return limiter
+
+
+def configure(model_id: str, **settings: Any) -> ModelLimiter:
+    """Replace the limiter for `model_id` with one using `settings` (e.g. in benchmarks)."""
+    limiter = ModelLimiter(model_id, **{**model_settings(model_id), **settings})
+    with _limiters_lock:
+        _limiters[model_id] = limiter
+    return limiter
+
+
+def call(model_id: str, func: Callable[[], Any]) -> Any:
+    """Run one Bedrock request for `model_id` through its limiter (see `ModelLimiter.call`)."""
+    return get_limiter(model_id).call(func)
+
+
+def stats() -> Dict[str, Dict]:
+    """Per-model limiter stats."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model_id: limiter.stats() for limiter in limiters}
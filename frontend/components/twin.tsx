@@ -14,6 +14,11 @@ interface Message {
     timestamp: Date;
 }
 
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+
+// Streaming endpoint (the Lambda Function URL); without it replies come from /chat in one piece
+const STREAM_URL = process.env.NEXT_PUBLIC_STREAM_URL;
+
 export default function Twin() {
     const [messages, setMessages] = useState<Message[]>([]);
     const [input, setInput] = useState('');
@@ -39,6 +44,88 @@ export default function Twin() {
         scrollToBottom();
     }, [messages]);
 
+    // Show the reply as /chat/stream sends it (Server-Sent Events: start, token..., done or error)
+    const streamReply = async (content: string) => {
+        const response = await fetch(`${STREAM_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: content,
+                session_id: sessionId || undefined,
+            }),
+        });
+
+        if (!response.ok || !response.body) throw new Error('Failed to send message');
+
+        const id = (Date.now() + 1).toString();
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let reply = '';
+
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary: number;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                const event = block.match(/^event: (.*)$/m)?.[1];
+                const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? '{}');
+
+                if (event === 'start' && !sessionId) {
+                    setSessionId(data.session_id);
+                } else if (event === 'token') {
+                    reply += data.text;
+                    const text = reply;
+                    setMessages((prev): Message[] =>
+                        prev.some((m) => m.id === id)
+                            ? prev.map((m) => (m.id === id ? { ...m, content: text } : m))
+                            : [...prev, { id, role: 'assistant', content: text, timestamp: new Date() }]
+                    );
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            }
+        }
+    };
+
+    // Fetch the whole reply from /chat
+    const requestReply = async (content: string) => {
+        const response = await fetch(`${API_URL}/chat`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: content,
+                session_id: sessionId || undefined,
+            }),
+        });
+
+        if (!response.ok) throw new Error('Failed to send message');
+
+        const data = await response.json();
+
+        if (!sessionId) {
+            setSessionId(data.session_id);
+        }
+
+        const assistantMessage: Message = {
+            id: (Date.now() + 1).toString(),
+            role: 'assistant',
+            content: data.response,
+            timestamp: new Date(),
+        };
+
+        setMessages((prev) => [...prev, assistantMessage]);
+    };
+
     const sendMessage = async () => {
         if (!input.trim() || isLoading) return;
 
@@ -54,36 +141,11 @@ export default function Twin() {
         setIsLoading(true);
 
         try {
-            const response = await fetch(
-                `${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/chat`,
-                {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        message: userMessage.content,
-                        session_id: sessionId || undefined,
-                    }),
-                }
-            );
-
-            if (!response.ok) throw new Error('Failed to send message');
-
-            const data = await response.json();
-
-            if (!sessionId) {
-                setSessionId(data.session_id);
+            if (STREAM_URL) {
+                await streamReply(userMessage.content);
+            } else {
+                await requestReply(userMessage.content);
             }
-
-            const assistantMessage: Message = {
-                id: (Date.now() + 1).toString(),
-                role: 'assistant',
-                content: data.response,
-                timestamp: new Date(),
-            };
-
-            setMessages((prev) => [...prev, assistantMessage]);
         } catch (error) {
             console.error('Error:', error);
             const errorMessage: Message = {
@@ -216,7 +278,8 @@ export default function Twin() {
                     </div>
                 ))}
 
-                {isLoading && (
+                {/* Typing indicator until the first streamed token arrives */}
+                {isLoading && messages[messages.length - 1]?.role !== 'assistant' && (
                     <div className="flex gap-3 justify-start">
                         <div className="flex-shrink-0">
                             {hasAvatar ? (
@@ -46,6 +46,7 @@ if ($Environment -eq "prod") {
 
 # Get Terraform outputs
 $ApiUrl         = terraform output -raw api_gateway_url
+$StreamUrl      = terraform output -raw stream_url
 $FrontendBucket = terraform output -raw s3_frontend_bucket
 
 try {
@@ -60,7 +61,7 @@ try {
 Set-Location ..\frontend
 
 Write-Host "📝 Setting API URL for production..." -ForegroundColor Yellow
-"NEXT_PUBLIC_API_URL=$ApiUrl" | Out-File .env.production -Encoding utf8
+"NEXT_PUBLIC_API_URL=$ApiUrl", "NEXT_PUBLIC_STREAM_URL=$StreamUrl" | Out-File .env.production -Encoding utf8
 
 npm install
 npm run build
@@ -83,3 +84,4 @@ if ($CustomUrl) {
 }
 
 Write-Host "📡 API Gateway    : $ApiUrl" -ForegroundColor Cyan
+Write-Host "📶 Stream URL     : $StreamUrl/chat/stream" -ForegroundColor Cyan
@@ -61,6 +61,7 @@ echo "🎯 Applying Terraform..."
 "${TF_APPLY_CMD[@]}"
 
 API_URL=$(terraform output -raw api_gateway_url)
+STREAM_URL=$(terraform output -raw stream_url)
 FRONTEND_BUCKET=$(terraform output -raw s3_frontend_bucket)
 CUSTOM_URL=$(terraform output -raw custom_domain_url 2>/dev/null || true)
 
@@ -70,7 +71,10 @@ CUSTOM_URL=$(terraform output -raw custom_domain_url 2>/dev/null || true)
 cd ../frontend
 
 echo "📝 Setting API URL for production..."
-echo "NEXT_PUBLIC_API_URL=$API_URL" > .env.production
+{
+  echo "NEXT_PUBLIC_API_URL=$API_URL"
+  echo "NEXT_PUBLIC_STREAM_URL=$STREAM_URL"
+} > .env.production
 
 npm install
 npm run build
@@ -90,3 +94,4 @@ if [ -n "$CUSTOM_URL" ]; then
 fi
 
 echo "📡 API Gateway    : $API_URL"
+echo "📶 Stream URL     : $STREAM_URL/chat/stream"
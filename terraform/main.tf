@@ -4,6 +4,9 @@
 # Retrieves the current AWS account ID for dynamic naming
 data "aws_caller_identity" "current" {}
 
+# Region of the default provider (for region-specific layer ARNs)
+data "aws_region" "current" {}
+
 # ------------------------------------------------------------
 # 🧩 Local Values (aliases, naming, tags)
 # ------------------------------------------------------------
@@ -23,6 +26,14 @@ locals {
     Environment = var.environment
     ManagedBy   = "terraform"
   }
+
+  # Environment variables shared by the API and streaming Lambda functions
+  lambda_environment = {
+    CORS_ORIGINS     = var.use_custom_domain ? "https://${var.root_domain},https://www.${var.root_domain}" : "https://${aws_cloudfront_distribution.main.domain_name}"
+    S3_BUCKET        = aws_s3_bucket.memory.id
+    USE_S3           = "true"
+    BEDROCK_MODEL_ID = var.bedrock_model_id
+  }
 }
 
 # ------------------------------------------------------------
@@ -159,18 +170,63 @@ resource "aws_lambda_function" "api" {
 
   # Environment variables passed into Lambda
   environment {
-    variables = {
-      CORS_ORIGINS     = var.use_custom_domain ? "https://${var.root_domain},https://www.${var.root_domain}" : "https://${aws_cloudfront_distribution.main.domain_name}"
-      S3_BUCKET        = aws_s3_bucket.memory.id
-      USE_S3           = "true"
-      BEDROCK_MODEL_ID = var.bedrock_model_id
-    }
+    variables = local.lambda_environment
   }
 
   # Ensure CloudFront exists before Lambda reads its domain
   depends_on = [aws_cloudfront_distribution.main]
 }
 
+# ------------------------------------------------------------
+# 📡 Streaming Lambda Function (POST /chat/stream)
+# ------------------------------------------------------------
+# API Gateway HTTP APIs and Mangum buffer the whole response, so Server-Sent
+# Events would arrive all at once. The same package is served here by uvicorn
+# (`run.sh`) behind the Lambda Web Adapter, whose Function URL streams the
+# response to the client as it is written.
+resource "aws_lambda_function" "stream" {
+  filename         = "${path.module}/../backend/lambda-deployment.zip"
+  function_name    = "${local.name_prefix}-stream"
+  role             = aws_iam_role.lambda_role.arn
+  handler          = "run.sh"
+  source_code_hash = filebase64sha256("${path.module}/../backend/lambda-deployment.zip")
+  runtime          = "python3.12"
+  architectures    = ["x86_64"]
+  timeout          = var.lambda_timeout
+  tags             = local.common_tags
+
+  # Lambda Web Adapter extension (published by AWS in every region)
+  layers = [
+    "arn:aws:lambda:${data.aws_region.current.region}:753240598075:layer:LambdaAdapterLayerX86:${var.lambda_web_adapter_version}"
+  ]
+
+  environment {
+    variables = merge(local.lambda_environment, {
+      AWS_LAMBDA_EXEC_WRAPPER = "/opt/bootstrap"
+      AWS_LWA_INVOKE_MODE     = "response_stream"
+      PORT                    = "8080"
+    })
+  }
+
+  depends_on = [aws_cloudfront_distribution.main]
+}
+
+# Public Function URL with response streaming; CORS is answered by the app
+resource "aws_lambda_function_url" "stream" {
+  function_name      = aws_lambda_function.stream.function_name
+  authorization_type = "NONE"
+  invoke_mode        = "RESPONSE_STREAM"
+}
+
+# Permission allowing anonymous calls through the Function URL
+resource "aws_lambda_permission" "stream_url" {
+  statement_id           = "AllowPublicFunctionUrl"
+  action                 = "lambda:InvokeFunctionUrl"
+  function_name          = aws_lambda_function.stream.function_name
+  principal              = "*"
+  function_url_auth_type = "NONE"
+}
+
 # ------------------------------------------------------------
 # 🌉 API Gateway (HTTP API)
 # ------------------------------------------------------------
@@ -7,6 +7,15 @@ output "api_gateway_url" {
   value       = aws_apigatewayv2_api.main.api_endpoint
 }
 
+# ------------------------------------------------------------
+# 📡 Streaming Function URL
+# ------------------------------------------------------------
+output "stream_url" {
+  # Function URL serving POST /chat/stream with response streaming
+  description = "Function URL of the streaming Lambda (POST /chat/stream)"
+  value       = trimsuffix(aws_lambda_function_url.stream.function_url, "/")
+}
+
 # ------------------------------------------------------------
 # ☁️ CloudFront Distribution URL
 # ------------------------------------------------------------
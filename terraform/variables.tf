@@ -48,6 +48,16 @@ variable "lambda_timeout" {
   default     = 60
 }
 
+# ------------------------------------------------------------
+# 📡 Lambda Web Adapter Layer Version
+# ------------------------------------------------------------
+variable "lambda_web_adapter_version" {
+  # Version of the LambdaAdapterLayerX86 layer used by the streaming function
+  description = "Lambda Web Adapter layer version for response streaming"
+  type        = number
+  default     = 25
+}
+
 # ------------------------------------------------------------
 # 🚦 API Gateway Throttle: Burst Limit
 # ------------------------------------------------------------